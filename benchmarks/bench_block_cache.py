@@ -0,0 +1,66 @@
+"""
+Measure point reads under a skewed, hot key workload with and without the
+block cache. Keys are drawn from a Zipf like distribution so a small set of
+blocks takes most of the reads.
+
+Usage: python benchmarks/bench_block_cache.py --keys 200000 --reads 50000
+"""
+
+import argparse
+import random
+import time
+from itertools import accumulate
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sandb.indexes.block_cache import BlockCache
+from sandb.indexes.lsm_tree import LSMTree
+
+
+def run(keys: int, sample: list[int], cache_size: int) -> None:
+    with TemporaryDirectory() as tmp:
+        lsmtree = LSMTree(
+            10_000,
+            segment_folder_path=Path(tmp),
+            durability="none",
+            block_cache=BlockCache(cache_size),
+        )
+        for first_key in range(0, keys, 1000):
+            lsmtree.write_batch(
+                (key, f"value_{key}") for key in range(first_key, first_key + 1000)
+            )
+        lsmtree.flush_memtable_to_disk()
+        lsmtree.wait_for_compaction()
+
+        start = time.perf_counter()
+        for key in sample:
+            lsmtree.read(key)
+        elapsed = time.perf_counter() - start
+        stats = lsmtree.block_cache_stats()
+        lsmtree.close()
+
+    print(
+        f"cache {cache_size // 1024:>6} KiB: {elapsed / len(sample) * 1e6:7.1f} us/read"
+        f"  hit rate {stats.hit_rate:6.1%}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=200_000)
+    parser.add_argument("--reads", type=int, default=50_000)
+    parser.add_argument("--skew", type=float, default=1.1)
+    args = parser.parse_args()
+
+    weights = list(
+        accumulate(1 / rank**args.skew for rank in range(1, args.keys + 1))
+    )
+    ranked_keys = random.sample(range(args.keys), args.keys)
+    sample = random.choices(ranked_keys, cum_weights=weights, k=args.reads)
+
+    for cache_size in [0, 1024 * 1024, 8 * 1024 * 1024]:
+        run(args.keys, sample, cache_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare the latency of reading keys that are not in the LSMTree with and
+without per segment bloom filters.
+
+Usage: python benchmarks/bench_bloom_filter.py --segments 200
+"""
+import argparse
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sandb.indexes.lsm_tree import LSMTree
+
+
+def build_tree(
+    folder: Path,
+    num_segments: int,
+    keys_per_segment: int,
+    false_positive_rate: float | None,
+) -> LSMTree:
+    lsmtree = LSMTree(
+        keys_per_segment,
+        100,
+        false_positive_rate,
+        segment_folder_path=folder,
+        durability="none",
+    )
+    # Even keys only so odd keys are guaranteed misses.
+    for key in range(0, 2 * num_segments * keys_per_segment, 2):
+        lsmtree.write(key, f"value_{key}")
+    lsmtree.flush_memtable_to_disk()
+    return lsmtree
+
+
+def time_negative_lookups(lsmtree: LSMTree, num_lookups: int, max_key: int) -> float:
+    start = time.perf_counter()
+    for i in range(num_lookups):
+        lsmtree.read((2 * i + 1) % max_key)
+    return (time.perf_counter() - start) / num_lookups
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--segments", type=int, default=200)
+    parser.add_argument("--keys-per-segment", type=int, default=1000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--false-positive-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    max_key = 2 * args.segments * args.keys_per_segment
+    for label, false_positive_rate in [
+        ("without bloom filters", None),
+        ("with bloom filters", args.false_positive_rate),
+    ]:
+        with TemporaryDirectory() as tmp:
+            lsmtree = build_tree(
+                Path(tmp), args.segments, args.keys_per_segment, false_positive_rate
+            )
+            latency = time_negative_lookups(lsmtree, args.lookups, max_key)
+            lsmtree.close()
+        print(f"{label}: {latency * 1e6:.1f} us per negative lookup")
+
+
+if __name__ == "__main__":
+    main()
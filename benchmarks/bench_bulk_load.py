@@ -0,0 +1,73 @@
+"""
+Compare loading rows into a table one write at a time with write_many and
+load_csv, for both storage layouts, with a secondary index on one column.
+
+Usage: python benchmarks/bench_bulk_load.py --rows 200000
+"""
+
+import argparse
+import csv
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sandb.tables.metadata import STORAGE_LAYOUT, Column, TableMetadata
+from sandb.tables.table import close, create, load_csv, write, write_many
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    columns = (
+        Column(name="user_id", dtype=int),
+        Column(name="name", dtype=str),
+        Column(name="age", dtype=int),
+    )
+    rows = [(user_id, f"user_{user_id}", user_id % 100) for user_id in range(args.rows)]
+
+    with TemporaryDirectory() as tmp:
+        source = Path(tmp) / "source.csv"
+        with open(source, "w", newline="") as f:
+            csv.writer(f).writerows(rows)
+
+        storages: list[STORAGE_LAYOUT] = ["row", "columnar"]
+        methods = ["write", "write_many", "load_csv"]
+        for storage in storages:
+            for indexes in [(), ("user_id",)]:
+
+                def table(method: str) -> TableMetadata:
+                    metadata = TableMetadata(
+                        name=f"{storage}_{len(indexes)}_{method}",
+                        columns=columns,
+                        location=Path(tmp),
+                        storage=storage,
+                        indexes=indexes,
+                    )
+                    create(metadata)
+                    return metadata
+
+                timings = []
+                for method in methods:
+                    metadata = table(method)
+                    start = time.perf_counter()
+                    if method == "write":
+                        for row in rows:
+                            write(row, metadata)
+                    elif method == "write_many":
+                        write_many(rows, metadata)
+                    else:
+                        load_csv(source, metadata)
+                    timings.append(args.rows / (time.perf_counter() - start))
+                    close(metadata)
+
+                rates = ", ".join(
+                    f"{method} {rate:>9,.0f} rows/s"
+                    for method, rate in zip(methods, timings)
+                )
+                print(f"{storage:>8}, {len(indexes)} index: {rates}")
+
+
+if __name__ == "__main__":
+    main()
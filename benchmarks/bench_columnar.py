@@ -0,0 +1,62 @@
+"""
+Compare filtering one column of a wide table stored as rows in data.csv and
+stored column by column.
+
+Usage: python benchmarks/bench_columnar.py --rows 200000 --columns 20
+"""
+import argparse
+import random
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sandb.tables import columnar
+from sandb.tables.metadata import STORAGE_LAYOUT, Column, TableMetadata
+from sandb.tables.table import create, read
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=5)
+    args = parser.parse_args()
+
+    columns = tuple(
+        Column(name=f"col_{i}", dtype=int if i % 2 == 0 else str)
+        for i in range(args.columns)
+    )
+    rows = [
+        tuple(
+            random.randrange(1000) if column.dtype is int else f"value_{row}_{i}"
+            for i, column in enumerate(columns)
+        )
+        for row in range(args.rows)
+    ]
+
+    storages: list[STORAGE_LAYOUT] = ["row", "columnar"]
+    with TemporaryDirectory() as tmp:
+        for storage in storages:
+            table = TableMetadata(
+                name=storage, columns=columns, location=Path(tmp), storage=storage
+            )
+            create(table)
+            if storage == "columnar":
+                columnar.append_rows(rows, table)
+            else:
+                with open(table.data_path(), "w") as f:
+                    f.writelines(", ".join(map(str, row)) + "\n" for row in rows)
+
+            for column, predicate in [("col_0", 7), ("col_1", "value_42_1")]:
+                start = time.perf_counter()
+                for _ in range(args.queries):
+                    matches = read(column, predicate, table)
+                elapsed = (time.perf_counter() - start) / args.queries
+                print(
+                    f"{storage:>8} {column} == {predicate!r:<14}: "
+                    f"{elapsed * 1e3:9.2f} ms, {len(matches)} rows"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compare point reads on a HashIndexDB with an LSMTree holding the same keys,
+and time reopening the HashIndexDB from its hint files against rebuilding its
+keydir from the data files.
+
+Usage: python benchmarks/bench_hash_index.py --keys 500000 --reads 100000
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sandb.indexes.hash_index import HashIndexDB
+from sandb.indexes.lsm_tree import LSMTree
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=500_000)
+    parser.add_argument("--reads", type=int, default=100_000)
+    args = parser.parse_args()
+
+    keys = random.sample(range(args.keys), args.reads)
+    with TemporaryDirectory() as tmp:
+        db = HashIndexDB(Path(tmp) / "hash", max_file_size=4 * 1024 * 1024)
+        lsmtree = LSMTree(
+            10_000, segment_folder_path=Path(tmp) / "lsm", durability="none"
+        )
+        for first_key in range(0, args.keys, 1000):
+            batch = [
+                (key, f"value_{key}") for key in range(first_key, first_key + 1000)
+            ]
+            db.write_batch(batch)
+            lsmtree.write_batch(batch)
+        lsmtree.flush_memtable_to_disk()
+        lsmtree.wait_for_compaction()
+
+        for name, index in [("hash index", db), ("lsm tree", lsmtree)]:
+            start = time.perf_counter()
+            for key in keys:
+                index.read(key)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>10}: {elapsed / args.reads * 1e6:6.1f} µs per read")
+        lsmtree.close()
+        db.close()
+
+        start = time.perf_counter()
+        HashIndexDB(Path(tmp) / "hash").close()
+        print(f"reopen from hint files: {time.perf_counter() - start:6.2f} s")
+
+        for hint in (Path(tmp) / "hash").glob("*.hint"):
+            hint.unlink()
+        start = time.perf_counter()
+        HashIndexDB(Path(tmp) / "hash").close()
+        print(f"reopen from data files: {time.perf_counter() - start:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
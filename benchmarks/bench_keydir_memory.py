@@ -0,0 +1,57 @@
+"""
+Measure the memory a HashIndexDB keydir takes per key, as a dict of
+KeyDirEntry and as a CompactKeyDir. Each keydir is built in its own process
+and its resident memory measured once built, so nothing else is counted.
+
+Usage: python benchmarks/bench_keydir_memory.py --keys 10000000 50000000
+           --kinds dict compact
+"""
+
+import argparse
+import multiprocessing
+import time
+from pathlib import Path
+
+from sandb.indexes.keydir import CompactKeyDir, KeyDirEntry
+
+
+def resident_bytes() -> int:
+    """Current resident set size, from /proc so Linux only."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096
+
+
+def build(kind: str, num_keys: int) -> tuple[int, float]:
+    def no_reads(path: Path, offset: int, length: int) -> bytes:
+        raise AssertionError("Distinct int keys never share a hash.")
+
+    paths = [Path(f"{file_id:010d}.data") for file_id in range(num_keys // 500_000 + 1)]
+    before = resident_bytes()
+    start = time.perf_counter()
+    keydir: CompactKeyDir | dict[int, KeyDirEntry] = (
+        CompactKeyDir(no_reads) if kind == "compact" else {}
+    )
+    for key in range(num_keys):
+        keydir[key] = KeyDirEntry(paths[key // 500_000], key * 32 % 2**26, 20)
+    elapsed = time.perf_counter() - start
+    return resident_bytes() - before, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--kinds", nargs="+", default=["dict", "compact"])
+    args = parser.parse_args()
+
+    for num_keys in args.keys:
+        for kind in args.kinds:
+            with multiprocessing.Pool(1) as pool:
+                used, elapsed = pool.apply(build, (kind, num_keys))
+            print(
+                f"{num_keys:>11,} keys, {kind:>7}: {used / 2**20:8.0f} MiB, "
+                f"{used / num_keys:6.1f} bytes per key, built in {elapsed:6.1f} s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Time merge_segment_files for different numbers of input segments.
+
+The same number of keys is spread over every run, so the timings show how
+the per key cost of the merge grows with the number of segments.
+
+Usage: python benchmarks/bench_merge.py --keys 1000000 --segments 2 16 128
+"""
+import argparse
+import random
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sandb.indexes.lsm_tree import merge_segment_files
+from sandb.indexes.sstable import SSTableWriter
+
+
+def write_segments(folder: Path, num_keys: int, num_segments: int) -> list[Path]:
+    """
+    Deal num_keys random keys out to the segments so they overlap, as
+    segments flushed from the same key space would.
+    """
+    keys = random.sample(range(4 * num_keys), num_keys)
+    paths = []
+    for segment_num in range(num_segments):
+        path = folder / f"segment_{segment_num}.sst"
+        writer = SSTableWriter(path, compression="none")
+        for key in sorted(keys[segment_num::num_segments]):
+            writer.add(key, f"value_{key}")
+        writer.finish()
+        paths.append(path)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    parser.add_argument("--segments", type=int, nargs="+", default=[2, 16, 128])
+    args = parser.parse_args()
+
+    for num_segments in args.segments:
+        with TemporaryDirectory() as tmp:
+            paths = write_segments(Path(tmp), args.keys, num_segments)
+            start = time.perf_counter()
+            merge_segment_files(
+                tuple(reversed(paths)), Path(tmp) / "merged.sst", compression="none"
+            )
+            elapsed = time.perf_counter() - start
+        print(
+            f"{num_segments:>4} segments: {elapsed:6.2f} s, "
+            f"{elapsed / args.keys * 1e6:5.2f} us per key"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Compare looking up a batch of keys one read at a time with a single multi_get.
+
+Usage: python benchmarks/bench_multi_get.py --keys 200000 --batch 10000
+"""
+import argparse
+import random
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sandb.indexes.lsm_tree import LSMTree
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tmp:
+        lsmtree = LSMTree(10_000, segment_folder_path=Path(tmp), durability="none")
+        for first_key in range(0, args.keys, 1000):
+            lsmtree.write_batch(
+                (key, f"value_{key}") for key in range(first_key, first_key + 1000)
+            )
+        lsmtree.flush_memtable_to_disk()
+        lsmtree.wait_for_compaction()
+
+        batch = random.sample(range(args.keys), args.batch)
+
+        start = time.perf_counter()
+        one_by_one = [lsmtree.read(key) for key in batch]
+        read_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = lsmtree.multi_get(batch)
+        multi_get_time = time.perf_counter() - start
+        lsmtree.close()
+
+    assert one_by_one == batched
+    print(f"     read: {read_time:6.3f} s")
+    print(f"multi_get: {multi_get_time:6.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Measure how a full scan of data.csv scales with the number of worker
+processes read is given, up to the number of cores.
+
+Usage: python benchmarks/bench_parallel_scan.py --rows 2000000
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sandb.tables.metadata import Column, TableMetadata
+from sandb.tables.table import create, read
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tmp:
+        columns = (
+            Column(name="user_id", dtype=int),
+            Column(name="name", dtype=str),
+            Column(name="age", dtype=int),
+        )
+        table = TableMetadata(name="users", columns=columns, location=Path(tmp))
+        create(table)
+        with open(table.data_path(), "w") as f:
+            for user_id in range(args.rows):
+                f.write(f"{user_id}, user_{user_id}, {user_id % 100}\n")
+
+        workers = 1
+        serial_time = 0.0
+        while workers <= args.max_workers:
+            start = time.perf_counter()
+            matches = read("age", 42, table, workers=workers)
+            elapsed = time.perf_counter() - start
+            serial_time = serial_time or elapsed
+            print(
+                f"{workers:>3} workers: {elapsed:6.2f} s, "
+                f"{serial_time / elapsed:5.1f}x, {len(matches)} rows"
+            )
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
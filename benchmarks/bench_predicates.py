@@ -0,0 +1,72 @@
+"""
+Compare a range query with a projection run by select against fetching every
+row with iter_rows and filtering and projecting it in Python, on a wide table
+stored both as rows and as columns.
+
+Usage: python benchmarks/bench_predicates.py --rows 200000 --columns 20
+"""
+import argparse
+import random
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sandb.tables import columnar
+from sandb.tables.metadata import STORAGE_LAYOUT, Column, TableMetadata
+from sandb.tables.predicates import Between, In
+from sandb.tables.table import create, iter_rows, select
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--columns", type=int, default=20)
+    args = parser.parse_args()
+
+    columns = tuple(
+        Column(name=f"col_{i}", dtype=int if i % 2 == 0 else str)
+        for i in range(args.columns)
+    )
+    rows = [
+        tuple(
+            random.randrange(1000) if column.dtype is int else f"value_{row % 50}"
+            for column in columns
+        )
+        for row in range(args.rows)
+    ]
+    where = Between("col_0", 100, 199) & In("col_1", ("value_1", "value_2"))
+
+    storages: list[STORAGE_LAYOUT] = ["row", "columnar"]
+    with TemporaryDirectory() as tmp:
+        for storage in storages:
+            table = TableMetadata(
+                name=storage, columns=columns, location=Path(tmp), storage=storage
+            )
+            create(table)
+            if storage == "columnar":
+                columnar.append_rows(rows, table)
+            else:
+                with open(table.data_path(), "w") as f:
+                    f.writelines(", ".join(map(str, row)) + "\n" for row in rows)
+
+            start = time.perf_counter()
+            fetched = [
+                (row[0], row[2])
+                for row in iter_rows(table)
+                if 100 <= row[0] <= 199 and row[1] in ("value_1", "value_2")
+            ]
+            fetch_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            selected = list(select(table, where, ["col_0", "col_2"]))
+            select_time = time.perf_counter() - start
+
+            assert fetched == selected
+            print(
+                f"{storage:>8}: fetch and filter {fetch_time * 1e3:9.1f} ms, "
+                f"select {select_time * 1e3:9.1f} ms, {len(selected)} rows"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compare the on disk size and point lookup latency of LSMTree segments
+for each SStable block compression codec, reading segments with pread or
+through mmap. The block cache is disabled so every lookup reads a block.
+
+Usage: python benchmarks/bench_sstable.py --keys 100000
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sandb.indexes.block_cache import BlockCache
+from sandb.indexes.lsm_tree import LSMTree
+from sandb.indexes.sstable import COMPRESSION
+
+
+def build_tree(
+    folder: Path, num_keys: int, compression: COMPRESSION, use_mmap: bool
+) -> LSMTree:
+    lsmtree = LSMTree(
+        10_000,
+        100,
+        None,
+        segment_folder_path=folder,
+        durability="none",
+        compression=compression,
+        block_cache=BlockCache(0),
+        use_mmap=use_mmap,
+    )
+    for key in range(num_keys):
+        lsmtree.write(key, f"value_{key}: {key * 7919 % 1000}")
+    lsmtree.flush_memtable_to_disk()
+    lsmtree.wait_for_compaction()
+    return lsmtree
+
+
+def time_lookups(lsmtree: LSMTree, num_lookups: int, num_keys: int) -> float:
+    keys = [random.randrange(num_keys) for _ in range(num_lookups)]
+    start = time.perf_counter()
+    for key in keys:
+        lsmtree.read(key)
+    return (time.perf_counter() - start) / num_lookups
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    compressions: list[COMPRESSION] = ["none", "zlib", "lzma"]
+    for compression in compressions:
+        for use_mmap in [False, True]:
+            with TemporaryDirectory() as tmp:
+                lsmtree = build_tree(Path(tmp), args.keys, compression, use_mmap)
+                size = sum(path.stat().st_size for path in Path(tmp).glob("*.sst"))
+                latency = time_lookups(lsmtree, args.lookups, args.keys)
+                lsmtree.close()
+            print(
+                f"{compression:>5} {'mmap' if use_mmap else 'pread':>5}: "
+                f"{size / 1024:10.1f} KiB on disk, "
+                f"{latency * 1e6:8.1f} us per lookup"
+            )
+
+
+if __name__ == "__main__":
+    main()
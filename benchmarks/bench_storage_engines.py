@@ -0,0 +1,75 @@
+"""
+Compare tables stored in data.csv, columnar files, an LSMTree and a
+HashIndexDB: loading them with write_many, looking rows up by their user_id
+and a full scan. row and columnar tables are given a secondary index on
+user_id, lsm and hash tables use it as their primary key.
+
+Usage: python benchmarks/bench_storage_engines.py --rows 200000 --lookups 2000
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sandb.tables.metadata import (
+    ENGINE_STORAGE_LAYOUTS,
+    STORAGE_LAYOUT,
+    Column,
+    TableMetadata,
+)
+from sandb.tables.table import close, create, iter_rows, read, write_many
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    columns = (
+        Column(name="user_id", dtype=int),
+        Column(name="name", dtype=str),
+        Column(name="age", dtype=int),
+    )
+    rows = [(user_id, f"user_{user_id}", user_id % 100) for user_id in range(args.rows)]
+    keys = random.Random(0).choices(range(args.rows), k=args.lookups)
+
+    storages: list[STORAGE_LAYOUT] = ["row", "columnar", "lsm", "hash"]
+    with TemporaryDirectory() as tmp:
+        for storage in storages:
+            is_engine = storage in ENGINE_STORAGE_LAYOUTS
+            metadata = TableMetadata(
+                name=storage,
+                columns=columns,
+                location=Path(tmp),
+                storage=storage,
+                indexes=() if is_engine else ("user_id",),
+                primary_key="user_id" if is_engine else None,
+            )
+            create(metadata)
+
+            start = time.perf_counter()
+            write_many(rows, metadata)
+            load_rate = args.rows / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for key in keys:
+                assert read("user_id", key, metadata) == [rows[key]]
+            lookup = (time.perf_counter() - start) / args.lookups
+
+            start = time.perf_counter()
+            for _ in iter_rows(metadata):
+                pass
+            scan_rate = args.rows / (time.perf_counter() - start)
+            close(metadata)
+
+            print(
+                f"{storage:>8}: load {load_rate:>9,.0f} rows/s, "
+                f"lookup {lookup * 1e6:>8.1f} us, scan {scan_rate:>10,.0f} rows/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Compare small queries through the table functions, loading the table's
+metadata.json for each one, against the same queries through the handle a
+Database hands out: single row writes, and reads of one row by a column
+with a secondary index.
+
+Usage: python benchmarks/bench_table_handles.py --rows 20000
+"""
+
+import argparse
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sandb.tables import table
+from sandb.tables.database import Database
+from sandb.tables.metadata import Column, TableMetadata
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    columns = (Column(name="user_id", dtype=int), Column(name="name", dtype=str))
+    rows = [(user_id, f"user_{user_id}") for user_id in range(args.rows)]
+
+    with TemporaryDirectory() as tmp:
+        database = Database(Path(tmp))
+        users = database.create_table("functions", columns, indexes=("user_id",))
+        metadata_path = users.metadata.metadata_path()
+
+        def per_call(method: str) -> None:
+            for row in rows:
+                metadata = TableMetadata.load(metadata_path)
+                if method == "write":
+                    table.write(row, metadata)
+                else:
+                    table.read("user_id", row[0], metadata)
+
+        handle = database.create_table("handle", columns, indexes=("user_id",))
+
+        def with_handle(method: str) -> None:
+            for row in rows:
+                if method == "write":
+                    handle.write(row)
+                else:
+                    handle.read("user_id", row[0])
+
+        for method in ["write", "read"]:
+            for name, run in [("functions", per_call), ("handle", with_handle)]:
+                start = time.perf_counter()
+                run(method)
+                per_row = (time.perf_counter() - start) / args.rows
+                print(f"{method:>5} {name:>9}: {per_row * 1e6:>7.1f} us")
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
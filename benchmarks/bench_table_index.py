@@ -0,0 +1,56 @@
+"""
+Measure point query latency on a table with and without a secondary index on
+the queried column. Rows are appended straight to data.csv and the index is
+built with rebuild_indexes, as writing millions of rows one call at a time
+takes far longer than the queries being measured.
+
+Usage: python benchmarks/bench_table_index.py --rows 10000000 --queries 20
+"""
+import argparse
+import random
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sandb.tables.metadata import Column, TableMetadata
+from sandb.tables.table import close, create, read, rebuild_indexes
+
+
+def time_queries(table: TableMetadata, user_ids: list[int]) -> float:
+    start = time.perf_counter()
+    for user_id in user_ids:
+        assert read("user_id", user_id, table)
+    return (time.perf_counter() - start) / len(user_ids)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tmp:
+        columns = (Column(name="user_id", dtype=int), Column(name="name", dtype=str))
+        table = TableMetadata(name="users", columns=columns, location=Path(tmp))
+        create(table)
+        with open(table.data_path(), "w") as f:
+            for user_id in range(args.rows):
+                f.write(f"{user_id}, user_{user_id}\n")
+
+        user_ids = random.sample(range(args.rows), args.queries)
+        scan_latency = time_queries(table, user_ids)
+
+        indexed = table.model_copy(update={"indexes": ("user_id",)})
+        start = time.perf_counter()
+        rebuild_indexes(indexed)
+        build_time = time.perf_counter() - start
+        index_latency = time_queries(indexed, user_ids)
+        close(indexed)
+
+    print(f"full scan: {scan_latency * 1e3:10.2f} ms per query")
+    print(f"    index: {index_latency * 1e3:10.2f} ms per query")
+    print(f"index built in {build_time:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
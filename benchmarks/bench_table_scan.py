@@ -0,0 +1,47 @@
+"""
+Compare the peak memory of streaming the rows matching a predicate with scan
+against collecting them with read. Half of the rows match, so read holds
+half the table in memory while scan only holds one buffered chunk.
+
+Usage: python benchmarks/bench_table_scan.py --rows 200000
+"""
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable
+
+from sandb.tables.metadata import Column, TableMetadata
+from sandb.tables.table import create, read, scan
+
+
+def measure(label: str, run: Callable[[], int]) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    matches = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>5}: {elapsed:6.2f} s, peak {peak / 2**20:8.1f} MiB, {matches} rows")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tmp:
+        columns = (Column(name="name", dtype=str), Column(name="bucket", dtype=int))
+        table = TableMetadata(name="events", columns=columns, location=Path(tmp))
+        create(table)
+        with open(table.data_path(), "w") as f:
+            for row in range(args.rows):
+                f.write(f"event_{row}, {row % 2}\n")
+
+        measure("read", lambda: len(read("bucket", 1, table)))
+        measure("scan", lambda: sum(1 for _ in scan("bucket", 1, table)))
+
+
+if __name__ == "__main__":
+    main()
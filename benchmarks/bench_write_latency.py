@@ -0,0 +1,46 @@
+"""
+Measure the write latency distribution of LSMTree under sustained writes.
+Memtable flushes happen on a background thread, so the tail should not
+include a full flush.
+
+Usage: python benchmarks/bench_write_latency.py --writes 200000
+"""
+import argparse
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sandb.indexes.lsm_tree import LSMTree
+
+
+def percentile(sorted_latencies: list[float], fraction: float) -> float:
+    return sorted_latencies[
+        min(len(sorted_latencies) - 1, int(fraction * len(sorted_latencies)))
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writes", type=int, default=200_000)
+    parser.add_argument("--memtable-max-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tmp:
+        lsmtree = LSMTree(
+            args.memtable_max_size, segment_folder_path=Path(tmp), durability="none"
+        )
+        latencies = []
+        for key in range(args.writes):
+            start = time.perf_counter()
+            lsmtree.write(key, f"value_{key}")
+            latencies.append(time.perf_counter() - start)
+        lsmtree.close()
+
+    latencies.sort()
+    for label, fraction in [("p50", 0.5), ("p99", 0.99), ("p99.9", 0.999)]:
+        print(f"{label:>6}: {percentile(latencies, fraction) * 1e6:10.1f} us")
+    print(f"{'max':>6}: {latencies[-1] * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
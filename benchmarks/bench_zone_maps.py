@@ -0,0 +1,76 @@
+"""
+Compare queries on a time ordered row table with its zone map, which lets
+them skip the zones of data.csv that can't hold a matching row, against the
+same queries after the zone map is deleted.
+
+Usage: python benchmarks/bench_zone_maps.py --rows 1000000 --queries 20
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sandb.tables.metadata import Column, TableMetadata
+from sandb.tables.predicates import Between
+from sandb.tables.table import create, read, select, write_many
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = (
+        (timestamp, f"event_{timestamp % 1000}", timestamp % 97)
+        for timestamp in range(args.rows)
+    )
+    timestamps = random.Random(0).choices(range(args.rows), k=args.queries)
+
+    with TemporaryDirectory() as tmp:
+        metadata = TableMetadata(
+            name="events",
+            columns=(
+                Column(name="timestamp", dtype=int),
+                Column(name="name", dtype=str),
+                Column(name="code", dtype=int),
+            ),
+            location=Path(tmp),
+        )
+        create(metadata)
+        start = time.perf_counter()
+        write_many(rows, metadata)
+        load_rate = args.rows / (time.perf_counter() - start)
+        print(f"load {load_rate:,.0f} rows/s")
+
+        for zone_map in ["with", "without"]:
+            if zone_map == "without":
+                metadata.zone_map_path().unlink()
+
+            start = time.perf_counter()
+            for timestamp in timestamps:
+                assert len(read("timestamp", timestamp, metadata)) == 1
+            point = (time.perf_counter() - start) / args.queries
+
+            start = time.perf_counter()
+            for timestamp in timestamps:
+                where = Between("timestamp", timestamp, timestamp + 999)
+                list(select(metadata, where))
+            window = (time.perf_counter() - start) / args.queries
+
+            start = time.perf_counter()
+            for code in range(args.queries):
+                read("code", code, metadata)
+            unordered = (time.perf_counter() - start) / args.queries
+
+            print(
+                f"{zone_map:>7} zone map: read by timestamp {point * 1e3:>7.2f} ms, "
+                f"select 1000 timestamps {window * 1e3:>7.2f} ms, "
+                f"read by code {unordered * 1e3:>7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, Protocol
+from typing import Any, Iterable, Iterator, Protocol, Tuple
 
 
 class Comparable(Protocol):
@@ -17,3 +17,26 @@ class Index(ABC):
     @abstractmethod
     def write(self, key: Comparable, value: Any) -> None:
         ...
+
+    @abstractmethod
+    def delete(self, key: Comparable) -> None:
+        ...
+
+    @abstractmethod
+    def multi_get(self, keys: Iterable[Comparable]) -> list[str | None]:
+        """Read every key, returning what read would for each, in order."""
+        ...
+
+    @abstractmethod
+    def write_batch(self, items: Iterable[Tuple[Comparable, Any]]) -> None:
+        """Write every key value pair, all or nothing."""
+        ...
+
+    @abstractmethod
+    def scan(
+        self,
+        start: Comparable | None = None,
+        end: Comparable | None = None,
+        limit: int | None = None,
+    ) -> Iterator[Tuple[Comparable, Any]]:
+        ...
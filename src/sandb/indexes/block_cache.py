@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Tuple
+
+BlockKey = Tuple[Path, int]
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    capacity: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class BlockCache:
+    """
+    Least recently used cache of decompressed SStable blocks, keyed by the
+    segment path and the offset of the block in it. The cache is bounded by
+    the total size of the blocks it holds in bytes rather than their number,
+    as blocks vary in size. It is thread safe so one cache can be shared by
+    every segment, and by several trees.
+
+    A capacity of 0 disables caching while still counting misses.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 0:
+            raise ValueError(f"Block cache capacity can't be negative. Got {capacity}")
+
+        self.capacity = capacity
+        self._blocks: OrderedDict[BlockKey, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: BlockKey) -> bytes | None:
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None:
+                self._misses += 1
+                return None
+            self._blocks.move_to_end(key)
+            self._hits += 1
+            return block
+
+    def put(self, key: BlockKey, block: bytes) -> None:
+        if len(block) > self.capacity:
+            return
+
+        with self._lock:
+            previous = self._blocks.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._blocks[key] = block
+            self._size += len(block)
+            while self._size > self.capacity:
+                _, evicted = self._blocks.popitem(last=False)
+                self._size -= len(evicted)
+                self._evictions += 1
+
+    def discard(self, path: Path) -> None:
+        """Drop every block of a segment, i.e. once it has been compacted away."""
+        with self._lock:
+            for key in [key for key in self._blocks if key[0] == path]:
+                self._size -= len(self._blocks.pop(key))
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                self._hits, self._misses, self._evictions, self._size, self.capacity
+            )
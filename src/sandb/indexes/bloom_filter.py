@@ -0,0 +1,127 @@
+import math
+import struct
+from hashlib import blake2b
+from pathlib import Path
+from typing import Iterable, Tuple
+
+from sandb.indexes.abc import Comparable
+
+BLOOM_FILTER_MAGIC = b"BLM1"
+# magic, number of bits, number of hash functions
+BLOOM_FILTER_HEADER = struct.Struct(">4sQI")
+
+
+def hash_key(key: Comparable) -> Tuple[int, int]:
+    """
+    Hash a key into the two 64 bit values used for double hashing.
+    This uses blake2b rather than the builtin hash as the filters are
+    saved to disk, and the builtin hash for strings changes between processes.
+
+    The pair only depends on the key so when probing many filters (one per
+    segment) it only needs calculating once.
+    """
+    digest = blake2b(str(key).encode(), digest_size=16).digest()
+    first, second = struct.unpack(">QQ", digest)
+    # An even second hash could cycle through only part of the bit array.
+    return first, second | 1
+
+
+class BloomFilter:
+    """
+    Probabilistic set membership. A key that was added will always be reported
+    as possibly present, a key that was never added will be reported as present
+    with roughly the false positive rate the filter was sized for.
+
+    The bit positions for a key are calculated with double hashing:
+    position_i = (h1 + i * h2) mod num_bits.
+    """
+
+    def __init__(
+        self, num_bits: int, num_hashes: int, bits: bytearray | None = None
+    ) -> None:
+        if num_bits <= 0 or num_hashes <= 0:
+            raise ValueError("A bloom filter needs at least one bit and one hash.")
+
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, false_positive_rate: float) -> "BloomFilter":
+        """
+        Create a filter sized to hold capacity keys at the requested
+        false positive rate using the standard optimal sizing formulas:
+        m = -n * ln(p) / ln(2)^2 and k = m / n * ln(2)
+        """
+        if not 0 < false_positive_rate < 1:
+            raise ValueError(
+                "false_positive_rate must be between 0 and 1. "
+                f"Got {false_positive_rate}"
+            )
+
+        capacity = max(capacity, 1)
+        num_bits = math.ceil(
+            -capacity * math.log(false_positive_rate) / (math.log(2) ** 2)
+        )
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    @classmethod
+    def from_hashes(
+        cls,
+        hashes: Iterable[Tuple[int, int]],
+        capacity: int,
+        false_positive_rate: float,
+    ) -> "BloomFilter":
+        bloom_filter = cls.for_capacity(capacity, false_positive_rate)
+        for first, second in hashes:
+            bloom_filter.add_hashes(first, second)
+        return bloom_filter
+
+    def add(self, key: Comparable) -> None:
+        self.add_hashes(*hash_key(key))
+
+    def add_hashes(self, first: int, second: int) -> None:
+        bits = self.bits
+        num_bits = self.num_bits
+        for i in range(self.num_hashes):
+            position = (first + i * second) % num_bits
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def might_contain(self, key: Comparable) -> bool:
+        return self.might_contain_hashes(*hash_key(key))
+
+    def might_contain_hashes(self, first: int, second: int) -> bool:
+        bits = self.bits
+        num_bits = self.num_bits
+        for i in range(self.num_hashes):
+            position = (first + i * second) % num_bits
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __contains__(self, key: Comparable) -> bool:
+        return self.might_contain(key)
+
+    def save(self, path: Path) -> None:
+        with open(path, "wb") as f:
+            f.write(
+                BLOOM_FILTER_HEADER.pack(
+                    BLOOM_FILTER_MAGIC, self.num_bits, self.num_hashes
+                )
+            )
+            f.write(self.bits)
+
+    @classmethod
+    def load(cls, path: Path) -> "BloomFilter":
+        with open(path, "rb") as f:
+            header = f.read(BLOOM_FILTER_HEADER.size)
+            magic, num_bits, num_hashes = BLOOM_FILTER_HEADER.unpack(header)
+            if magic != BLOOM_FILTER_MAGIC:
+                raise ValueError(f"{path} is not a bloom filter file.")
+            bits = bytearray(f.read())
+
+        if len(bits) != (num_bits + 7) // 8:
+            raise ValueError(f"Bloom filter file {path} is truncated.")
+
+        return cls(num_bits, num_hashes, bits)
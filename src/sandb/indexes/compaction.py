@@ -0,0 +1,161 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Literal, Mapping, NamedTuple, Sequence, Type
+
+COMPACTION_STRATEGY = Literal["size_tiered", "leveled"]
+
+
+class SegmentSummary(NamedTuple):
+    """What a strategy needs to know about a segment to pick compactions."""
+
+    path: Path
+    level: int
+    size: int
+
+
+@dataclass(frozen=True)
+class CompactionJob:
+    """
+    Segments to merge, ordered oldest to newest, and the level of the result.
+    The inputs are always a contiguous run of LSMTree.segments so the merged
+    segment can take their place without changing which value is newest.
+    """
+
+    inputs: tuple[Path, ...]
+    output_level: int
+
+
+@dataclass
+class CompactionMetrics:
+    """
+    bytes_compacted is the size of the segments read by compactions.
+    Write amplification is every byte written to segments, by flushes and
+    compactions, over the bytes flushed from the memtable.
+    """
+
+    segments_per_level: dict[int, int] = field(default_factory=dict)
+    compactions: int = 0
+    bytes_flushed: int = 0
+    bytes_compacted: int = 0
+    bytes_written_by_compaction: int = 0
+
+    @property
+    def write_amplification(self) -> float:
+        if not self.bytes_flushed:
+            return 0.0
+        return (
+            self.bytes_flushed + self.bytes_written_by_compaction
+        ) / self.bytes_flushed
+
+
+class CompactionStrategy(ABC):
+    @abstractmethod
+    def pick(self, segments: Sequence[SegmentSummary]) -> CompactionJob | None:
+        """
+        Choose the next compaction given the live segments ordered oldest to
+        newest, or None if nothing needs compacting.
+        """
+        ...
+
+
+class SizeTieredStrategy(CompactionStrategy):
+    """
+    Merge runs of adjacent segments of a similar size. A segment joins the
+    current run if its size is between bucket_low and bucket_high times the
+    average size of the run. Once a run holds min_threshold segments (capped at
+    max_threshold) it is merged into one segment a tier up from them. A run
+    mixing tiers, such as a merged segment that overwrites kept from growing
+    and the flushes after it, stays at the highest of them, so the tier of a
+    segment only grows with the number of times its data has been merged.
+    """
+
+    def __init__(
+        self,
+        min_threshold: int = 4,
+        max_threshold: int = 32,
+        bucket_low: float = 0.5,
+        bucket_high: float = 1.5,
+    ) -> None:
+        if min_threshold < 2 or max_threshold < min_threshold:
+            raise ValueError(
+                "Need 2 <= min_threshold <= max_threshold. "
+                f"Got {min_threshold} and {max_threshold}"
+            )
+        self.min_threshold = min_threshold
+        self.max_threshold = max_threshold
+        self.bucket_low = bucket_low
+        self.bucket_high = bucket_high
+
+    def pick(self, segments: Sequence[SegmentSummary]) -> CompactionJob | None:
+        run: list[SegmentSummary] = []
+        run_size = 0
+        for segment in segments:
+            if run:
+                average = run_size / len(run)
+                low, high = average * self.bucket_low, average * self.bucket_high
+                if not low <= segment.size <= high:
+                    if len(run) >= self.min_threshold:
+                        break
+                    run, run_size = [], 0
+
+            run.append(segment)
+            run_size += segment.size
+            if len(run) == self.max_threshold:
+                break
+
+        if len(run) < self.min_threshold:
+            return None
+        levels = {segment.level for segment in run}
+        output_level = max(levels) + 1 if len(levels) == 1 else max(levels)
+        return CompactionJob(tuple(segment.path for segment in run), output_level)
+
+
+class LeveledStrategy(CompactionStrategy):
+    """
+    Flushed segments land in level 0. Every level below that is a single
+    sorted run held in one segment, with level n allowed to grow to
+    base_level_size * level_size_multiplier ** (n - 1) bytes.
+
+    Once level 0 holds level0_max_segments segments they are all merged into
+    level 1. A level that grows past its limit is merged into the next one.
+    As each level is older than the ones above it, the inputs are always
+    adjacent in the tree.
+    """
+
+    def __init__(
+        self,
+        level0_max_segments: int = 4,
+        base_level_size: int = 10 * 1024 * 1024,
+        level_size_multiplier: int = 10,
+    ) -> None:
+        self.level0_max_segments = level0_max_segments
+        self.base_level_size = base_level_size
+        self.level_size_multiplier = level_size_multiplier
+
+    def max_level_size(self, level: int) -> int:
+        return self.base_level_size * int(self.level_size_multiplier ** (level - 1))
+
+    def pick(self, segments: Sequence[SegmentSummary]) -> CompactionJob | None:
+        level0 = [segment for segment in segments if segment.level == 0]
+        levels = {segment.level: segment for segment in segments if segment.level}
+
+        if len(level0) >= self.level0_max_segments:
+            inputs = ([levels[1]] if 1 in levels else []) + level0
+            return CompactionJob(tuple(segment.path for segment in inputs), 1)
+
+        for level, segment in sorted(levels.items()):
+            if segment.size > self.max_level_size(level):
+                below = levels.get(level + 1)
+                inputs = ([below] if below else []) + [segment]
+                return CompactionJob(
+                    tuple(segment.path for segment in inputs), level + 1
+                )
+
+        return None
+
+
+COMPACTION_STRATEGIES: Mapping[COMPACTION_STRATEGY, Type[CompactionStrategy]] = {
+    "size_tiered": SizeTieredStrategy,
+    "leveled": LeveledStrategy,
+}
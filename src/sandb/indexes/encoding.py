@@ -0,0 +1,114 @@
+import pickle
+import struct
+from typing import Any
+
+# Every encoded object starts with a single byte tag saying how to decode it.
+STR_TAG = b"s"
+INT_TAG = b"i"
+FLOAT_TAG = b"f"
+BYTES_TAG = b"b"
+NONE_TAG = b"n"
+PICKLE_TAG = b"p"
+TOMBSTONE_TAG = b"t"
+
+INT64 = struct.Struct(">q")
+FLOAT64 = struct.Struct(">d")
+INT64_MIN = -(2**63)
+INT64_MAX = 2**63 - 1
+
+# Length prefix used wherever a key or value is written into a record.
+LENGTH_PREFIX = struct.Struct(">I")
+
+
+class _Tombstone:
+    """Type of TOMBSTONE. Unpickles to the same object so `is` checks work."""
+
+    def __repr__(self) -> str:
+        return "TOMBSTONE"
+
+    def __reduce__(self) -> str:
+        return "TOMBSTONE"
+
+
+# Stored as the value of a deleted key. It hides older values of the key until
+# compaction reaches the oldest segment and drops it.
+TOMBSTONE: Any = _Tombstone()
+
+
+def to_str(value: Any) -> str:
+    """Values are read back as str, with "" meaning the key is not there."""
+    return "" if value is TOMBSTONE else str(value)
+
+
+def encode(obj: Any) -> bytes:
+    """
+    Encode a key or value so it can be written to disk and decoded back
+    to the same type. The common types (str, int, float, bytes, None) get a
+    compact encoding, anything else falls back to pickle.
+
+    Equal str, int, float and bytes objects always encode to equal bytes,
+    which means lookups can compare encoded keys without decoding them.
+    """
+    obj_type = type(obj)
+    if obj_type is str:
+        encoded: bytes = obj.encode()
+        return STR_TAG + encoded
+    if obj_type is int and INT64_MIN <= obj <= INT64_MAX:
+        return INT_TAG + INT64.pack(obj)
+    if obj_type is float:
+        return FLOAT_TAG + FLOAT64.pack(obj)
+    if obj_type is bytes:
+        return BYTES_TAG + bytes(obj)
+    if obj is None:
+        return NONE_TAG
+    if obj is TOMBSTONE:
+        return TOMBSTONE_TAG
+    return PICKLE_TAG + pickle.dumps(obj)
+
+
+def decode(buf: bytes | memoryview) -> Any:
+    tag = bytes(buf[:1])
+    if tag == STR_TAG:
+        return bytes(buf[1:]).decode()
+    if tag == INT_TAG:
+        return INT64.unpack_from(buf, 1)[0]
+    if tag == FLOAT_TAG:
+        return FLOAT64.unpack_from(buf, 1)[0]
+    if tag == BYTES_TAG:
+        return bytes(buf[1:])
+    if tag == NONE_TAG:
+        return None
+    if tag == PICKLE_TAG:
+        return pickle.loads(buf[1:])
+    if tag == TOMBSTONE_TAG:
+        return TOMBSTONE
+    raise ValueError(f"Unknown encoding tag {tag!r}")
+
+
+def encode_entry(key: Any, value: Any) -> bytes:
+    """Length prefixed key followed by length prefixed value."""
+    encoded_key = encode(key)
+    encoded_value = encode(value)
+    return b"".join(
+        (
+            LENGTH_PREFIX.pack(len(encoded_key)),
+            encoded_key,
+            LENGTH_PREFIX.pack(len(encoded_value)),
+            encoded_value,
+        )
+    )
+
+
+def decode_entry(buf: bytes | memoryview, offset: int) -> tuple[Any, Any, int]:
+    """
+    Decode the key value pair written by encode_entry starting at offset.
+    Returns the key, the value and the offset of the next entry.
+    """
+    (key_length,) = LENGTH_PREFIX.unpack_from(buf, offset)
+    offset += LENGTH_PREFIX.size
+    key = decode(buf[offset : offset + key_length])
+    offset += key_length
+    (value_length,) = LENGTH_PREFIX.unpack_from(buf, offset)
+    offset += LENGTH_PREFIX.size
+    value = decode(buf[offset : offset + value_length])
+    return key, value, offset + value_length
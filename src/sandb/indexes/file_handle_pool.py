@@ -0,0 +1,92 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+
+@dataclass
+class _Handle:
+    fd: int
+    users: int = 0
+    discarded: bool = False
+
+
+class FileHandlePool:
+    """
+    Keeps read only file descriptors open between lookups so reading a block
+    does not cost an open and close. Descriptors are used with os.pread, which
+    takes the offset with every read, so one descriptor can be shared by many
+    threads at once.
+
+    At most max_open descriptors are kept, closing the least recently used
+    idle one when a new file is opened. A descriptor in use is never closed,
+    so the cap can be exceeded while every open file is being read.
+    """
+
+    def __init__(self, max_open: int = 64) -> None:
+        if max_open < 1:
+            raise ValueError(f"max_open must be at least 1. Got {max_open}")
+
+        self.max_open = max_open
+        self._handles: OrderedDict[Path, _Handle] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def open(self, path: Path) -> Iterator[int]:
+        """Yield a descriptor for path, opening it if it is not in the pool."""
+        with self._lock:
+            handle = self._handles.get(path)
+            if handle is None:
+                handle = _Handle(os.open(path, os.O_RDONLY), users=1)
+                self._handles[path] = handle
+                self._close_idle()
+            else:
+                self._handles.move_to_end(path)
+                handle.users += 1
+
+        try:
+            yield handle.fd
+        finally:
+            with self._lock:
+                handle.users -= 1
+                if handle.discarded and not handle.users:
+                    os.close(handle.fd)
+                else:
+                    self._close_idle()
+
+    def discard(self, path: Path) -> None:
+        """Close the descriptor for path, once nobody is reading it."""
+        with self._lock:
+            handle = self._handles.pop(path, None)
+            if handle is None:
+                return
+            if handle.users:
+                handle.discarded = True
+            else:
+                os.close(handle.fd)
+
+    def close(self) -> None:
+        with self._lock:
+            for handle in self._handles.values():
+                if handle.users:
+                    handle.discarded = True
+                else:
+                    os.close(handle.fd)
+            self._handles.clear()
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+    def _close_idle(self) -> None:
+        """Must hold _lock."""
+        if len(self._handles) <= self.max_open:
+            return
+        for path in [
+            path for path, handle in self._handles.items() if not handle.users
+        ]:
+            os.close(self._handles.pop(path).fd)
+            if len(self._handles) <= self.max_open:
+                return
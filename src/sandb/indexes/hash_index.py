@@ -1,32 +1,566 @@
+import logging
 import os
 import random
+import struct
+import threading
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator, Tuple
 
 from num2words import num2words
 
-DB_PATH = Path(os.getcwd()) / "hash_index_db.txt"
+from sandb.config import ROOT_DIR
+from sandb.indexes.abc import Comparable, Index
+from sandb.indexes.encoding import (
+    LENGTH_PREFIX,
+    TOMBSTONE,
+    TOMBSTONE_TAG,
+    decode,
+    encode,
+    to_str,
+)
+from sandb.indexes.file_handle_pool import FileHandlePool
+from sandb.indexes.keydir import CompactKeyDir, KeyDirEntry
+from sandb.indexes.wal import ENTRY_COUNT, RECORD_HEADER
 
+DEFAULT_MAX_FILE_SIZE = 64 * 1024 * 1024
+# Offset and length of a value in its data file. A length of 0 marks a
+# tombstone, as every encoded value is at least its one byte tag.
+HINT_ENTRY = struct.Struct(">QI")
 
-class HashIndexDB:
-    def __init__(self) -> None:
-        self.hash_index: dict[str, int] = {}
 
-    def insert_into_db(self, key: str, value: int) -> None:
-        with open(DB_PATH, "a") as f:
-            index = f.tell()
-            self.hash_index.update({key: index})
-            f.write(f"{key}: {value}\n")
+class HashIndexDB(Index):
+    """
+    Bitcask style key value store. Every write is appended to the active data
+    file and an in memory hash map, the keydir, maps every key to the offset
+    and length of its newest value. A read is a single dict lookup and a
+    single pread of exactly the value's bytes, whatever the size of the store.
+    The keydir holds every key so they all have to fit in memory, and keys
+    are not kept in order, so scan has to sort them.
 
-    def read_from_db(self, key_to_retrieve: str) -> str:
-        with open(DB_PATH, "r") as f:
-            f.seek(self.hash_index[key_to_retrieve])
-            return next(f).split(":")[1].strip()
+    Data files are named <id>.data and hold records in the write ahead log
+    format, a crc32 and length followed by one or more entries, so a batch
+    is replayed all or nothing. Once the active file reaches max_file_size
+    a new one is started. Files that are no longer active never change, and
+    each gets a <id>.hint file listing the keys in it and where their values
+    are, so reopening the store rebuilds the keydir from the hint files
+    without reading any values.
+
+    Overwritten and deleted values are left in the files. Once they make up
+    merge_fragmentation of the inactive files, a background merge copies the
+    live values of every inactive file into new files and deletes the old
+    ones. Merge outputs are named <id>_<n>.data after the newest file they
+    replace, so files always sort oldest to newest by name and reopening
+    the store reads them in the order they were written.
+
+    With compact_keydir the keydir is a CompactKeyDir rather than a dict,
+    which takes a fraction of the memory per key but reads a key back from
+    disk to confirm every lookup that finds it.
+    """
+
+    def __init__(
+        self,
+        folder_path: Path | None = None,
+        max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+        merge_fragmentation: float | None = 0.5,
+        sync_writes: bool = False,
+        file_pool: FileHandlePool | None = None,
+        compact_keydir: bool = False,
+    ) -> None:
+        self.folder_path = folder_path or ROOT_DIR / "hash_index"
+        self.folder_path.mkdir(parents=True, exist_ok=True)
+        self.max_file_size = max_file_size
+        # Set to None to only merge when merge is called.
+        self.merge_fragmentation = merge_fragmentation
+        # fsync the active file after every write.
+        self.sync_writes = sync_writes
+        # Read handles for the data files are kept open in the pool.
+        self._owns_file_pool = file_pool is None
+        self.file_pool = FileHandlePool() if file_pool is None else file_pool
+
+        self.keydir: dict[Comparable, KeyDirEntry] | CompactKeyDir = (
+            CompactKeyDir(self._read_bytes) if compact_keydir else {}
+        )
+        # The inactive data files, oldest first. Copy on write, like keydir
+        # entries they are swapped under _lock.
+        self.files: list[Path] = []
+        # Total and dead (overwritten or deleted) bytes of every data file,
+        # to decide when to merge.
+        self._file_sizes: dict[Path, int] = {}
+        self._dead_bytes: dict[Path, int] = {}
+        self._lock = threading.Lock()
+        self._load()
+        # Reopening the store always starts a new active file.
+        self._next_file_id = _file_key(self.files[-1])[0] + 1 if self.files else 0
+        self._active = self._new_active_file()
+
+        self._merge_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="hash-index-merge"
+        )
+        self._merge_running = False
+        self._merge_idle = threading.Condition(self._lock)
+        self._closed = False
+        self.schedule_merge()
+
+    def read(self, key: Comparable) -> str | None:
+        """The value of key as a str, or "" if it is not in the store."""
+        value = self._read_value(key)
+        return "" if value is None else to_str(value)
+
+    def multi_get(self, keys: Iterable[Comparable]) -> list[str | None]:
+        """Read every key, reading each file's values in the order they are in it."""
+        keys = list(keys)
+        entries = {key: self.keydir.get(key) for key in set(keys)}
+        found: dict[Comparable, Any] = {}
+        for key, entry in sorted(
+            ((key, entry) for key, entry in entries.items() if entry is not None),
+            key=lambda item: (item[1].path, item[1].offset),
+        ):
+            value = self._read_value(key, entry)
+            if value is not None:
+                found[key] = value
+        return [to_str(found[key]) if key in found else "" for key in keys]
+
+    def scan(
+        self,
+        start: Comparable | None = None,
+        end: Comparable | None = None,
+        limit: int | None = None,
+    ) -> Iterator[Tuple[Comparable, Any]]:
+        """
+        Lazily yield the value of every key with start <= key < end in key
+        order, stopping after limit pairs if given. The keydir is not ordered,
+        so every key in the range is sorted before the first is yielded.
+        """
+        keys = sorted(
+            key
+            for key in list(self.keydir)
+            if (start is None or not key < start) and (end is None or key < end)
+        )
+        return islice(self._scan(keys), limit)
+
+    def write(self, key: Comparable, value: Any) -> None:
+        self.write_batch([(key, value)])
+
+    def delete(self, key: Comparable) -> None:
+        """Write a tombstone for key, which merging drops along with its values."""
+        self.write(key, TOMBSTONE)
+
+    def write_batch(self, items: Iterable[Tuple[Comparable, Any]]) -> None:
+        """Append every pair as a single record, so a crash keeps all or none."""
+        encoded = [(key, encode(key), encode(value)) for key, value in items]
+        if not encoded:
+            return
+
+        with self._lock:
+            size_after = self._active.size + _record_size(encoded)
+            rolled = self._active.size > 0 and size_after > self.max_file_size
+            if rolled:
+                self._active.close(write_hint=True)
+                self.files = self.files + [self._active.path]
+                self._active = self._new_active_file()
+            offsets = self._active.append(
+                [(encoded_key, value) for _, encoded_key, value in encoded]
+            )
+            if self.sync_writes:
+                self._active.sync()
+            self._file_sizes[self._active.path] = self._active.size
+            for (key, encoded_key, value), offset in zip(encoded, offsets):
+                if value == TOMBSTONE_TAG:
+                    self._mark_dead(self.keydir.pop(key, None))
+                    # The tombstone itself is only needed until merging.
+                    self._dead_bytes[self._active.path] += _entry_size(
+                        encoded_key, len(value)
+                    )
+                else:
+                    self._mark_dead(self.keydir.get(key))
+                    self.keydir[key] = KeyDirEntry(
+                        self._active.path, offset, len(value)
+                    )
+        if rolled:
+            self.schedule_merge()
+
+    def merge(self) -> None:
+        """Merge every inactive data file now, and wait for it to finish."""
+        with self._lock:
+            while self._merge_running:
+                self._merge_idle.wait()
+            inputs = self.files
+            self._merge_running = bool(inputs)
+        if inputs:
+            self._start_merge(inputs)
+        self.wait_for_merge()
+
+    def schedule_merge(self) -> None:
+        """
+        Start merging the inactive data files in the background if enough of
+        them is dead. Called whenever a new active file is started, and after
+        every merge as files may have been added while it ran.
+        """
+        with self._lock:
+            if self._merge_running:
+                return
+            inputs = self._pick_merge()
+
+        if inputs is not None:
+            self._start_merge(inputs)
+
+    def wait_for_merge(self) -> None:
+        """Block until there is no merge running."""
+        with self._lock:
+            while self._merge_running:
+                self._merge_idle.wait()
+
+    def close(self) -> None:
+        """
+        Finish any running merge and write the hint file of the active data
+        file, so reopening the store does not have to read it.
+        """
+        with self._lock:
+            self._closed = True
+        self.wait_for_merge()
+        self._merge_executor.shutdown()
+        with self._lock:
+            self._active.close(write_hint=True)
+        if self._owns_file_pool:
+            self.file_pool.close()
+
+    def _read_value(
+        self, key: Comparable, entry: KeyDirEntry | None = None
+    ) -> Any | None:
+        """Decode the newest value of key, or return None if there is none."""
+        while True:
+            if entry is None:
+                entry = self.keydir.get(key)
+                if entry is None:
+                    return None
+            try:
+                return decode(self._read_bytes(entry.path, entry.offset, entry.length))
+            except FileNotFoundError:
+                # A merge moved the value and deleted the file we were about
+                # to read. The keydir points at its new place by now.
+                if self.keydir.get(key) == entry:
+                    raise
+                entry = None
+
+    def _read_bytes(self, path: Path, offset: int, length: int) -> bytes:
+        with self.file_pool.open(path) as fd:
+            return os.pread(fd, length, offset)
+
+    def _scan(self, keys: list[Comparable]) -> Iterator[Tuple[Comparable, Any]]:
+        for key in keys:
+            value = self._read_value(key)
+            # Skip keys deleted since the scan started.
+            if value is not None:
+                yield key, value
+
+    def _mark_dead(self, entry: KeyDirEntry | None) -> None:
+        """Must hold _lock. Count the value at entry as overwritten."""
+        if entry is not None:
+            # The key is not to hand, so its length is left out.
+            self._dead_bytes[entry.path] += _entry_size(b"", entry.length)
+
+    def _new_active_file(self) -> "_DataFileWriter":
+        """Must hold _lock, other than when opening the store."""
+        path = self.folder_path / _file_name(self._next_file_id, None)
+        self._next_file_id += 1
+        self._file_sizes[path] = 0
+        self._dead_bytes[path] = 0
+        return _DataFileWriter(path, buffered=False)
+
+    def _start_merge(self, inputs: list[Path]) -> None:
+        future = self._merge_executor.submit(self._merge_files, inputs)
+        future.add_done_callback(self._merge_done)
+
+    def _merge_files(self, inputs: list[Path]) -> None:
+        """
+        Copy the values the keydir points to in inputs, which must be the
+        oldest data files, into new files, point the keydir at the copies
+        and delete inputs. Tombstones are dropped as no file older than the
+        inputs could still hold a value they hide.
+        """
+        file_id, sub = _file_key(inputs[-1])
+        outputs: list[_DataFileWriter] = []
+        moved: list[tuple[Comparable, KeyDirEntry, KeyDirEntry]] = []
+
+        for path in inputs:
+            for encoded_key, offset, value in _read_entries(path):
+                if value == TOMBSTONE_TAG:
+                    continue
+                key = decode(encoded_key)
+                old = KeyDirEntry(path, offset, len(value))
+                if self.keydir.get(key) != old:
+                    continue
+
+                if not outputs or outputs[-1].size >= self.max_file_size:
+                    sub += 1
+                    outputs.append(
+                        _DataFileWriter(
+                            self.folder_path / f"{_file_name(file_id, sub)}.tmp",
+                            buffered=True,
+                        )
+                    )
+                (new_offset,) = outputs[-1].append([(encoded_key, value)])
+                moved.append(
+                    (key, old, KeyDirEntry(outputs[-1].path, new_offset, len(value)))
+                )
+
+        # The outputs only get their final names once they are complete.
+        # Until the inputs are deleted below both are read when reopening
+        # the store, which is fine as the outputs only hold copies of values
+        # in the inputs.
+        output_paths = []
+        for output in outputs:
+            output.close(write_hint=False)
+            path = output.path.with_suffix("")
+            os.replace(output.path, path)
+            _write_hint(path, output.hint)
+            output_paths.append(path)
+
+        renamed = dict(zip([output.path for output in outputs], output_paths))
+        with self._lock:
+            for path in output_paths:
+                self._file_sizes[path] = path.stat().st_size
+                self._dead_bytes[path] = 0
+            for key, old, new in moved:
+                new = new._replace(path=renamed[new.path])
+                if self.keydir.get(key) == old:
+                    self.keydir[key] = new
+                else:
+                    # Overwritten while we were copying it.
+                    self._dead_bytes[new.path] += _entry_size(b"", new.length)
+            self.files = output_paths + self.files[len(inputs) :]
+            for path in inputs:
+                del self._file_sizes[path]
+                del self._dead_bytes[path]
+
+        for path in inputs:
+            self.file_pool.discard(path)
+            path.unlink()
+            _hint_path(path).unlink(missing_ok=True)
+
+    def _pick_merge(self) -> list[Path] | None:
+        """
+        Must hold _lock. Marks a merge as running if the inactive files need
+        one and returns them, otherwise marks merging as idle.
+        """
+        inputs = None
+        if self.merge_fragmentation is not None and not self._closed and self.files:
+            total = sum(self._file_sizes[path] for path in self.files)
+            dead = sum(self._dead_bytes[path] for path in self.files)
+            if total and dead / total >= self.merge_fragmentation:
+                inputs = self.files
+
+        self._merge_running = inputs is not None
+        if inputs is None:
+            self._merge_idle.notify_all()
+        return inputs
+
+    def _merge_done(self, future: Future[None]) -> None:
+        """Start the next merge if there is one. Runs on the merge thread."""
+        with self._lock:
+            if future.exception() is not None:
+                logging.error("Merge failed", exc_info=future.exception())
+                self._merge_running = False
+                self._merge_idle.notify_all()
+                return
+            inputs = self._pick_merge()
+        if inputs is not None:
+            self._start_merge(inputs)
+
+    def _load(self) -> None:
+        """Rebuild the keydir from the data files, oldest first."""
+        for path in self.folder_path.glob("*.tmp"):
+            # Left by a merge or a hint file that did not finish.
+            path.unlink()
+
+        paths = sorted(self.folder_path.glob("*.data"), key=_file_key)
+        for path in paths:
+            size = path.stat().st_size
+            if not size:
+                path.unlink()
+                _hint_path(path).unlink(missing_ok=True)
+                continue
+
+            self._file_sizes[path] = size
+            self._dead_bytes[path] = 0
+            self.files.append(path)
+            if _hint_path(path).exists():
+                entries: Iterable[tuple[bytes, int, int]] = _read_hint(path)
+            else:
+                # The active file when the store was last open, which may end
+                # in a torn record. Give it a hint file for next time.
+                hint = [
+                    (encoded_key, offset, 0 if value == TOMBSTONE_TAG else len(value))
+                    for encoded_key, offset, value in _read_entries(path, truncate=True)
+                ]
+                _write_hint(path, hint)
+                self._file_sizes[path] = path.stat().st_size
+                entries = hint
+
+            for encoded_key, offset, length in entries:
+                key = decode(encoded_key)
+                if length:
+                    self._mark_dead(self.keydir.get(key))
+                    self.keydir[key] = KeyDirEntry(path, offset, length)
+                else:
+                    self._mark_dead(self.keydir.pop(key, None))
+                    self._dead_bytes[path] += _entry_size(encoded_key, 1)
+
+
+class _DataFileWriter:
+    """
+    Appends records to a data file and keeps the hint entries for them,
+    which are written next to it when it is closed.
+    """
+
+    def __init__(self, path: Path, buffered: bool) -> None:
+        self.path = path
+        # The active file is unbuffered so every record can be read with
+        # pread as soon as it has been appended.
+        self._file: BinaryIO = open(path, "ab", buffering=-1 if buffered else 0)
+        self.size = self._file.tell()
+        self.hint: list[tuple[bytes, int, int]] = []
+
+    def append(self, entries: list[tuple[bytes, bytes]]) -> list[int]:
+        """Append encoded key value pairs as one record, return the value offsets."""
+        payload = [ENTRY_COUNT.pack(len(entries))]
+        offsets = []
+        position = self.size + RECORD_HEADER.size + ENTRY_COUNT.size
+        for encoded_key, value in entries:
+            payload += [
+                LENGTH_PREFIX.pack(len(encoded_key)),
+                encoded_key,
+                LENGTH_PREFIX.pack(len(value)),
+                value,
+            ]
+            position += 2 * LENGTH_PREFIX.size + len(encoded_key)
+            offsets.append(position)
+            self.hint.append(
+                (encoded_key, position, 0 if value == TOMBSTONE_TAG else len(value))
+            )
+            position += len(value)
+
+        data = b"".join(payload)
+        self._file.write(RECORD_HEADER.pack(zlib.crc32(data), len(data)) + data)
+        self.size = position
+        return offsets
+
+    def sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self, write_hint: bool) -> None:
+        self.sync()
+        self._file.close()
+        if write_hint and self.size:
+            _write_hint(self.path, self.hint)
+        elif not self.size:
+            self.path.unlink()
+
+
+def _read_entries(
+    path: Path, truncate: bool = False
+) -> Iterator[tuple[bytes, int, bytes]]:
+    """
+    Yield the encoded key, value offset and encoded value of every entry in a
+    data file, in order. Stops at the first incomplete or corrupt record, and
+    if truncate cuts the file off there.
+    """
+    valid_length = 0
+    with open(path, "rb") as f:
+        while header := f.read(RECORD_HEADER.size):
+            if len(header) < RECORD_HEADER.size:
+                break
+            checksum, length = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+
+            (count,) = ENTRY_COUNT.unpack_from(payload, 0)
+            offset = ENTRY_COUNT.size
+            for _ in range(count):
+                (key_length,) = LENGTH_PREFIX.unpack_from(payload, offset)
+                offset += LENGTH_PREFIX.size
+                encoded_key = payload[offset : offset + key_length]
+                offset += key_length
+                (value_length,) = LENGTH_PREFIX.unpack_from(payload, offset)
+                offset += LENGTH_PREFIX.size
+                value = payload[offset : offset + value_length]
+                yield encoded_key, valid_length + RECORD_HEADER.size + offset, value
+                offset += value_length
+            valid_length += RECORD_HEADER.size + length
+
+    if truncate and path.stat().st_size > valid_length:
+        logging.warning(f"Dropping corrupt tail of {path} after byte {valid_length}")
+        os.truncate(path, valid_length)
+
+
+def _read_hint(path: Path) -> Iterator[tuple[bytes, int, int]]:
+    """Yield the encoded key, value offset and value length (0 for a tombstone)."""
+    with open(_hint_path(path), "rb") as f:
+        hint = f.read()
+    offset = 0
+    while offset < len(hint):
+        (key_length,) = LENGTH_PREFIX.unpack_from(hint, offset)
+        offset += LENGTH_PREFIX.size
+        encoded_key = hint[offset : offset + key_length]
+        offset += key_length
+        value_offset, value_length = HINT_ENTRY.unpack_from(hint, offset)
+        offset += HINT_ENTRY.size
+        yield encoded_key, value_offset, value_length
+
+
+def _write_hint(path: Path, entries: Iterable[tuple[bytes, int, int]]) -> None:
+    """Write the hint file for a data file, renaming it into place when complete."""
+    hint_path = _hint_path(path)
+    tmp_path = hint_path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(b"".join(_hint_entry(*entry) for entry in entries))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, hint_path)
+
+
+def _hint_entry(encoded_key: bytes, offset: int, length: int) -> bytes:
+    key_length = LENGTH_PREFIX.pack(len(encoded_key))
+    return key_length + encoded_key + HINT_ENTRY.pack(offset, length)
+
+
+def _hint_path(path: Path) -> Path:
+    return path.with_suffix(".hint")
+
+
+def _file_name(file_id: int, sub: int | None) -> str:
+    if sub is None:
+        return f"{file_id:010d}.data"
+    return f"{file_id:010d}_{sub:04d}.data"
+
+
+def _file_key(path: Path) -> tuple[int, int]:
+    """Sorts data files oldest to newest, merge outputs after the file they follow."""
+    file_id, _, sub = path.name.split(".")[0].partition("_")
+    return int(file_id), int(sub) if sub else -1
+
+
+def _entry_size(encoded_key: bytes, value_length: int) -> int:
+    return 2 * LENGTH_PREFIX.size + len(encoded_key) + value_length
+
+
+def _record_size(encoded: list[tuple[Any, bytes, bytes]]) -> int:
+    entries_size = sum(
+        _entry_size(encoded_key, len(value)) for _, encoded_key, value in encoded
+    )
+    return RECORD_HEADER.size + ENTRY_COUNT.size + entries_size
 
 
 if __name__ == "__main__":
     db = HashIndexDB()
     for i in range(1, 100):
         value = random.randint(1, 100)
-        db.insert_into_db(str(value), num2words(value))
+        db.write(str(value), num2words(value))
 
-    print(f"my_value is: {db.read_from_db(str(value))}")
+    print(f"my_value is: {db.read(str(value))}")
+    db.close()
@@ -0,0 +1,236 @@
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterator, NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+
+from sandb.indexes.abc import Comparable
+from sandb.indexes.encoding import LENGTH_PREFIX, decode, encode
+
+# Slots of the hash table that are empty, or held a key that has been removed.
+EMPTY = -1
+DUMMY = -2
+# Knuth's multiplicative hash, spreading sequential hashes (i.e. of ints)
+# across the table.
+FIBONACCI = 0x9E3779B97F4A7C15
+UINT64_MASK = 2**64 - 1
+MIN_CAPACITY = 8
+
+
+class KeyDirEntry(NamedTuple):
+    """Where the newest value of a key is: the data file, offset and length."""
+
+    path: Path
+    offset: int
+    length: int
+
+
+# Reads length bytes from a data file starting at an offset.
+ReadBytes = Callable[[Path, int, int], bytes]
+
+
+class CompactKeyDir:
+    """
+    Keydir for HashIndexDB that keeps no key objects in memory. It has the
+    parts of the dict interface HashIndexDB uses.
+
+    Entries are kept in parallel NumPy arrays, 28 bytes per key: the hash of
+    the key, the number of its data file, the offset and length of its value
+    and the length of the encoded key. An open addressing table of int32
+    positions in those arrays finds them by hash, with linear probing, like
+    CPython's own compact dicts. The table is at most two thirds full, which
+    adds at most 6 bytes per key, against well over 100 bytes per key for a
+    dict of KeyDirEntry.
+
+    As the keys are not in memory, an entry whose hash matches is only
+    returned after reading its key back from the data file, where it sits
+    just before the value, with read_bytes, and comparing it to the encoded
+    key looked up. Looking up a key that is in the store so costs a pread
+    more than a dict does. Iterating reads every key back from disk.
+    """
+
+    def __init__(self, read_bytes: ReadBytes) -> None:
+        self._read_bytes = read_bytes
+        # Data files are stored by their number in _paths.
+        self._paths: list[Path] = []
+        self._path_numbers: dict[Path, int] = {}
+        # Entry arrays. Entries 0 to _used are in use, the ones with a file
+        # number of EMPTY have been removed.
+        self._hashes: npt.NDArray[np.int64] = np.empty(0, dtype=np.int64)
+        self._files: npt.NDArray[np.int32] = np.empty(0, dtype=np.int32)
+        self._offsets: npt.NDArray[np.int64] = np.empty(0, dtype=np.int64)
+        self._lengths: npt.NDArray[np.uint32] = np.empty(0, dtype=np.uint32)
+        self._key_lengths: npt.NDArray[np.uint32] = np.empty(0, dtype=np.uint32)
+        self._used = 0
+        self._live = 0
+        self._allocate(MIN_CAPACITY)
+        self._lock = threading.Lock()
+
+    def get(self, key: Comparable, default: Any = None) -> KeyDirEntry | Any:
+        with self._lock:
+            position, _ = self._find(key, encode(key))
+            return default if position < 0 else self._entry(position)
+
+    def __getitem__(self, key: Comparable) -> KeyDirEntry:
+        entry = self.get(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry
+
+    def __setitem__(self, key: Comparable, entry: KeyDirEntry) -> None:
+        encoded_key = encode(key)
+        with self._lock:
+            file_number = self._path_numbers.get(entry.path)
+            if file_number is None:
+                file_number = len(self._paths)
+                self._paths.append(entry.path)
+                self._path_numbers[entry.path] = file_number
+
+            position, slot = self._find(key, encoded_key)
+            if position < 0:
+                if self._used == len(self._hashes):
+                    self._allocate(max(MIN_CAPACITY, self._live * 3 // 2 + 1))
+                    position, slot = self._find(key, encoded_key)
+                position = self._used
+                self._used += 1
+                self._live += 1
+                self._hashes[position] = hash(key)
+                self._key_lengths[position] = len(encoded_key)
+                self._index[slot] = position
+
+            self._files[position] = file_number
+            self._offsets[position] = entry.offset
+            self._lengths[position] = entry.length
+
+    def pop(self, key: Comparable, default: Any = None) -> KeyDirEntry | Any:
+        with self._lock:
+            position, slot = self._find(key, encode(key))
+            if position < 0:
+                return default
+            entry = self._entry(position)
+            self._files[position] = EMPTY
+            self._index[slot] = DUMMY
+            self._live -= 1
+            return entry
+
+    def __len__(self) -> int:
+        return self._live
+
+    def __iter__(self) -> Iterator[Comparable]:
+        """Yield every key, reading each back from its data file."""
+        position = 0
+        while True:
+            with self._lock:
+                if position >= self._used:
+                    return
+                file_number = self._files.item(position)
+                if file_number == EMPTY:
+                    position += 1
+                    continue
+                key_start = self._key_start(position)
+                path = self._paths[file_number]
+                key_length = self._key_lengths.item(position)
+            yield decode(self._read_bytes(path, key_start, key_length))
+            position += 1
+
+    def _find(self, key: Comparable, encoded_key: bytes) -> tuple[int, int]:
+        """
+        Must hold _lock. Return the position of key's entry and its slot, or
+        -1 and the slot to insert it into.
+        """
+        key_hash = hash(key)
+        mask = len(self._index) - 1
+        slot = _home_slot(key_hash, self._bits)
+        insert_at = -1
+        while True:
+            position = self._index.item(slot)
+            if position == EMPTY:
+                return -1, slot if insert_at < 0 else insert_at
+            if position == DUMMY:
+                if insert_at < 0:
+                    insert_at = slot
+            elif self._hashes.item(position) == key_hash:
+                if self._key_matches(position, encoded_key):
+                    return position, slot
+            slot = (slot + 1) & mask
+
+    def _entry(self, position: int) -> KeyDirEntry:
+        return KeyDirEntry(
+            self._paths[self._files.item(position)],
+            self._offsets.item(position),
+            self._lengths.item(position),
+        )
+
+    def _key_matches(self, position: int, encoded_key: bytes) -> bool:
+        """Whether the entry at position, whose hash matches, is for encoded_key."""
+        if self._key_lengths.item(position) != len(encoded_key):
+            return False
+        stored_key = self._read_bytes(
+            self._paths[self._files.item(position)],
+            self._key_start(position),
+            len(encoded_key),
+        )
+        return stored_key == encoded_key
+
+    def _key_start(self, position: int) -> int:
+        # The key is followed by the length prefix of the value.
+        key_length = self._key_lengths.item(position)
+        return int(self._offsets.item(position) - LENGTH_PREFIX.size - key_length)
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        Move the live entries into arrays with room for capacity entries and
+        rebuild the table, dropping removed entries and DUMMY slots.
+        """
+        live = np.flatnonzero(self._files[: self._used] != EMPTY)
+        self._hashes = _resized(self._hashes, live, capacity)
+        self._files = _resized(self._files, live, capacity)
+        self._offsets = _resized(self._offsets, live, capacity)
+        self._lengths = _resized(self._lengths, live, capacity)
+        self._key_lengths = _resized(self._key_lengths, live, capacity)
+        self._used = self._live = len(live)
+
+        # At most two thirds of the slots are ever in use.
+        self._bits = max(3, (capacity * 3 // 2 - 1).bit_length())
+        self._index: npt.NDArray[np.int32] = np.full(
+            2**self._bits, EMPTY, dtype=np.int32
+        )
+        _place(self._index, self._hashes[: self._used], self._bits)
+
+
+def _resized(
+    values: npt.NDArray[Any], live: npt.NDArray[np.int64], capacity: int
+) -> npt.NDArray[Any]:
+    """The live values at the start of an array that holds capacity."""
+    resized = np.empty(capacity, dtype=values.dtype)
+    resized[: len(live)] = values[live]
+    return resized
+
+
+def _home_slot(key_hash: int, bits: int) -> int:
+    return ((key_hash & UINT64_MASK) * FIBONACCI & UINT64_MASK) >> (64 - bits)
+
+
+def _place(
+    index: npt.NDArray[np.int32], hashes: npt.NDArray[np.int64], bits: int
+) -> None:
+    """
+    Insert positions 0 to len(hashes) into an empty table all at once. Every
+    round each position still to place tries its current slot, the lowest
+    position wins each free slot and the rest move on to the next slot, so
+    like one by one insertion no position ends up past an empty slot.
+    """
+    mask = len(index) - 1
+    pending = np.arange(len(hashes))
+    slots = (hashes.astype(np.uint64) * np.uint64(FIBONACCI)) >> np.uint64(64 - bits)
+    slots = slots.astype(np.int64)
+    while len(pending):
+        free = index[slots] == EMPTY
+        candidates, candidate_slots = pending[free], slots[free]
+        taken, first = np.unique(candidate_slots, return_index=True)
+        index[taken] = candidates[first]
+
+        placed = np.zeros(len(pending), dtype=bool)
+        placed[np.flatnonzero(free)[first]] = True
+        pending, slots = pending[~placed], (slots[~placed] + 1) & mask
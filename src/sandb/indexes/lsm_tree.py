@@ -1,38 +1,207 @@
 import logging
+import os
+import threading
+from array import array
 from collections import OrderedDict
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from functools import cached_property, partial
+from itertools import islice, takewhile
 from pathlib import Path
-from typing import Any, Tuple, TypeVar
+from typing import Any, Iterable, Iterator, Tuple, TypeVar
 
-from numpy import inf
 from sortedcontainers import SortedDict
 
 from sandb.config import ROOT_DIR
 from sandb.indexes.abc import Comparable, Index
+from sandb.indexes.block_cache import BlockCache, CacheStats
+from sandb.indexes.bloom_filter import BloomFilter, hash_key
+from sandb.indexes.compaction import (
+    COMPACTION_STRATEGIES,
+    COMPACTION_STRATEGY,
+    CompactionJob,
+    CompactionMetrics,
+    CompactionStrategy,
+    SegmentSummary,
+)
+from sandb.indexes.encoding import TOMBSTONE, to_str
+from sandb.indexes.file_handle_pool import FileHandlePool
+from sandb.indexes.manifest import Manifest, SegmentRecord
+from sandb.indexes.merge import merge_newest_first
+from sandb.indexes.sstable import COMPRESSION, MISSING, SSTableReader, SSTableWriter
+from sandb.indexes.wal import DURABILITY_MODE, WriteAheadLog
 
 T = TypeVar("T")
 
+DEFAULT_BLOCK_CACHE_SIZE = 8 * 1024 * 1024
+
+
+@dataclass
+class Segment:
+    """
+    In memory state kept for each SStable on disk. The reader holds the
+    block index from the SStable footer, the bloom filter (if enabled) lets
+    reads skip the segment entirely when the key is definitely not in it.
+    level and size (in bytes) are what compaction strategies pick segments by.
+
+    The reader and bloom filter are loaded the first time they are used, so
+    reopening a tree only reads the manifest. Flushes and compactions already
+    have them in memory and assign them directly.
+    """
+
+    path: Path
+    level: int = 0
+    size: int = 0
+    has_bloom_filter: bool = False
+    block_cache: BlockCache | None = field(default=None, compare=False, repr=False)
+    file_pool: FileHandlePool | None = field(default=None, compare=False, repr=False)
+    use_mmap: bool = field(default=False, compare=False, repr=False)
+
+    @cached_property
+    def sstable(self) -> SSTableReader:
+        return SSTableReader.open(
+            self.path,
+            block_cache=self.block_cache,
+            file_pool=self.file_pool,
+            use_mmap=self.use_mmap,
+        )
+
+    @cached_property
+    def bloom_filter(self) -> BloomFilter | None:
+        if not self.has_bloom_filter:
+            return None
+        return BloomFilter.load(bloom_filter_path(self.path))
+
+
+@dataclass(frozen=True)
+class ImmutableMemtable:
+    """
+    A full memtable waiting to be flushed to a segment. It is never written to
+    again, and its write ahead log is kept until the flush has finished.
+    """
+
+    entries: SortedDict[Comparable, Any]
+    wal_path: Path
+
+
+def bloom_filter_path(segment_path: Path) -> Path:
+    """The bloom filter for a segment is saved next to it with a .bloom suffix."""
+    return segment_path.with_suffix(".bloom")
+
 
 class LSMTree(Index):
     def __init__(
-        self, memtable_max_size: int = 1000, segment_chunk_size_for_indexing: int = 100
+        self,
+        memtable_max_size: int = 1000,
+        segment_chunk_size_for_indexing: int = 100,
+        bloom_filter_false_positive_rate: float | None = 0.01,
+        segment_folder_path: Path | None = None,
+        durability: DURABILITY_MODE = "batched",
+        group_commit_interval: float = 0.0,
+        block_size: int = 4096,
+        compression: COMPRESSION = "zlib",
+        compaction_strategy: (
+            COMPACTION_STRATEGY | CompactionStrategy | None
+        ) = "size_tiered",
+        compaction_executor: Executor | None = None,
+        max_immutable_memtables: int = 2,
+        block_cache: BlockCache | None = None,
+        file_pool: FileHandlePool | None = None,
+        use_mmap: bool = False,
     ):
         self.memtable: SortedDict[Comparable, Any] = SortedDict()
         self.memtable_max_size = memtable_max_size
-
+        # Full memtables are frozen and queued here, oldest first, and a
+        # background thread flushes them to segments while writes carry on in
+        # a fresh memtable. Like self.segments this list is copy on write.
+        # Writers stall once max_immutable_memtables are waiting for a flush.
+        self.immutable_memtables: list[ImmutableMemtable] = []
+        self.max_immutable_memtables = max_immutable_memtables
+
+        # SStable data blocks are closed after this many keys or block_size
+        # bytes, whichever comes first. Each block gets one sparse index entry.
         self.segment_chunk_size_for_indexing = segment_chunk_size_for_indexing
+        self.block_size = block_size
+        self.compression = compression
+        # Set to None to disable bloom filters on new segments.
+        self.bloom_filter_false_positive_rate = bloom_filter_false_positive_rate
+        # Decompressed blocks read by point lookups are kept in the block cache
+        # and segment files are kept open in the file pool. Pass the same cache
+        # and pool to several trees to bound their memory and open files together.
+        if block_cache is None:
+            block_cache = BlockCache(DEFAULT_BLOCK_CACHE_SIZE)
+        self.block_cache = block_cache
+        self._owns_file_pool = file_pool is None
+        self.file_pool = FileHandlePool() if file_pool is None else file_pool
+        # Map segment files into memory instead, see SSTableReader.
+        self.use_mmap = use_mmap
         # This is the SStable storage. First value is file path, second value is the
-        # sparse index for the SStable. This is ordered such that we can look through
-        # newest to oldest segments.
-        self.segments: OrderedDict[Path, SortedDict[Comparable, Any]] = OrderedDict()
+        # reader and bloom filter for the SStable. This is ordered oldest to
+        # newest, so reads iterate over it in reverse.
+        # It is copy on write: flushes and compactions build a new dict and swap
+        # it in under _segments_lock, so a read can iterate the dict it started
+        # with while segments change underneath it.
+        self.segments: OrderedDict[Path, Segment] = OrderedDict()
+        self._segments_lock = threading.Lock()
 
         self.segment_index = 0
 
-        self.segment_folder_path = ROOT_DIR / "lsm_segments"
-        self.segment_folder_path.mkdir(exist_ok=True)
+        self.segment_folder_path = segment_folder_path or ROOT_DIR / "lsm_segments"
+        self.segment_folder_path.mkdir(parents=True, exist_ok=True)
+        # Records the live segments so reopening the tree does not have to
+        # look at the segment files.
+        self.manifest_path = self.segment_folder_path / "MANIFEST"
+        self._load_manifest()
+
+        # Every write goes to the write ahead log before the memtable so the
+        # memtable can be rebuilt if we crash before it is flushed to a segment.
+        # When the memtable is frozen its log is renamed to wal_<n>.log and
+        # deleted once the memtable is in a segment.
+        self.durability = durability
+        self.group_commit_interval = group_commit_interval
+        self._wal_index = 0
+        self._recover_immutable_memtables()
+        self.wal = self._open_wal()
+        for entries in self.wal.replay():
+            self.memtable.update(entries)
+
+        # Keeps the order of records in the WAL the same as the order they are
+        # applied to the memtable when there are concurrent writers.
+        self._write_lock = threading.Lock()
+
+        self._flush_lock = threading.Lock()
+        self._flush_condition = threading.Condition(self._flush_lock)
+        self._flush_error: BaseException | None = None
+        self._stop_flushing = False
+        self._flush_thread = threading.Thread(
+            target=self._flush_loop,
+            name=f"lsm-flush-{self.segment_folder_path}",
+            daemon=True,
+        )
+
+        # Compactions run one at a time on the executor, a single background
+        # thread unless one is passed in. merge_segment_files only takes paths
+        # so a ProcessPoolExecutor works too. Set the strategy to None to
+        # disable compaction.
+        if isinstance(compaction_strategy, str):
+            compaction_strategy = COMPACTION_STRATEGIES[compaction_strategy]()
+        self.compaction_strategy = compaction_strategy
+        self._owns_compaction_executor = compaction_executor is None
+        self._compaction_executor = compaction_executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="lsm-compaction"
+        )
+        self._compaction_running = False
+        self._compaction_idle = threading.Condition(self._segments_lock)
+        self._metrics = CompactionMetrics()
+        self._closed = False
+
+        self._flush_thread.start()
+        self.schedule_compaction()
 
     def read(self, key: Comparable) -> str | None:
         """
-        First try and read from the in-memory memtable.
+        First try and read from the in-memory memtable, then the memtables
+        waiting to be flushed from newest to oldest.
         If the key does not exist in there
         look at the segments stored on disk from latest to oldest.
         As the segments are stored in time order and an append of a
@@ -46,158 +215,669 @@ class LSMTree(Index):
         """
 
         try:
-            return str(self.memtable[key])
+            return to_str(self.memtable[key])
 
         except KeyError:
             logging.info(f"key: {key} not in in memory memtable")
 
+        # A frozen memtable is added here before it stops being self.memtable
+        # and only removed once its segment is in self.segments, so reading
+        # them in this order never misses a write.
+        for immutable in reversed(self.immutable_memtables):
+            if key in immutable.entries:
+                return to_str(immutable.entries[key])
+
         value = self.search_segments_on_disk(key)
 
         return value
 
     def search_segments_on_disk(self, key: Comparable) -> str | None:
-        value = ""
-        for filepath, index in self.segments.items():
-            floor_offset, ceil_offset = self.get_floor_ceil_of_key_in_index(key, index)
-            with open(filepath, "r") as current_segment:
-                current_segment.seek(floor_offset)
-                curr_offset = floor_offset
-                for line in current_segment:
-                    curr_offset += len(line)
-                    stored_key, value = line.split(":")
-                    if stored_key == str(key):
-                        return value.strip()
-                    if ceil_offset and curr_offset >= ceil_offset:
-                        value = ""
+        # Only hash the key once, every segment's filter probes the same pair.
+        key_hashes = hash_key(key)
+        while True:
+            segments = self.segments
+            try:
+                for filepath, segment in reversed(segments.items()):
+                    bloom_filter = segment.bloom_filter
+                    if bloom_filter and not bloom_filter.might_contain_hashes(
+                        *key_hashes
+                    ):
+                        continue
+
+                    value = segment.sstable.get(key)
+                    if value is not MISSING:
+                        return to_str(value)
+
+                return ""
+            except FileNotFoundError:
+                # A compaction swapped in a merged segment and deleted the one we
+                # were about to read. The merged segment has its data so retry.
+                if self.segments is segments:
+                    raise
+
+    def multi_get(self, keys: Iterable[Comparable]) -> list[str | None]:
+        """
+        Read many keys at once. Keys found in the memtables are answered from
+        there. The rest are sorted and looked up segment by segment from newest
+        to oldest, with each segment file opened once and each of its blocks
+        read at most once. Returns what read would for each key, in order.
+        """
+        keys = list(keys)
+        found: dict[Comparable, Any] = {}
+        remaining = []
+        memtables = [self.memtable] + [
+            immutable.entries for immutable in reversed(self.immutable_memtables)
+        ]
+        for key in set(keys):
+            for memtable in memtables:
+                if key in memtable:
+                    found[key] = memtable[key]
+                    break
+            else:
+                remaining.append(key)
+
+        remaining.sort()
+        found.update(self._multi_get_segments(remaining))
+        return [to_str(found[key]) if key in found else "" for key in keys]
+
+    def _multi_get_segments(self, keys: list[Comparable]) -> dict[Comparable, Any]:
+        key_hashes = [hash_key(key) for key in keys]
+        while True:
+            segments = self.segments
+            found: dict[Comparable, Any] = {}
+            remaining = list(zip(keys, key_hashes))
+            try:
+                for segment in reversed(segments.values()):
+                    if not remaining:
                         break
+                    bloom_filter = segment.bloom_filter
+                    if bloom_filter is None:
+                        candidates = [key for key, _ in remaining]
+                    else:
+                        candidates = [
+                            key
+                            for key, hashes in remaining
+                            if bloom_filter.might_contain_hashes(*hashes)
+                        ]
+                    if not candidates:
+                        continue
+                    segment_found = segment.sstable.multi_get(candidates)
+                    if segment_found:
+                        found.update(segment_found)
+                        remaining = [
+                            (key, hashes)
+                            for key, hashes in remaining
+                            if key not in segment_found
+                        ]
+                return found
+            except FileNotFoundError:
+                # A compaction replaced a segment before we read it, start again
+                # with the new segments.
+                if self.segments is segments:
+                    raise
+
+    def scan(
+        self,
+        start: Comparable | None = None,
+        end: Comparable | None = None,
+        limit: int | None = None,
+    ) -> Iterator[Tuple[Comparable, Any]]:
+        """
+        Lazily yield the newest value of every key with start <= key < end in
+        key order, stopping after limit pairs if given. A bound of None leaves
+        that side of the range open.
 
-        return value
+        The memtables and every segment are merged as they are read, and each
+        segment seeks straight to the start of the range with its sparse
+        index, so memory use does not grow with the size of the range.
+        """
+        return islice(self._scan(start, end, reverse=False), limit)
+
+    def reverse_scan(
+        self,
+        start: Comparable | None = None,
+        end: Comparable | None = None,
+        limit: int | None = None,
+    ) -> Iterator[Tuple[Comparable, Any]]:
+        """The same as scan but in descending key order, starting from end."""
+        return islice(self._scan(start, end, reverse=True), limit)
+
+    def scan_prefix(
+        self, prefix: str | bytes, limit: int | None = None
+    ) -> Iterator[Tuple[Comparable, Any]]:
+        """Lazily yield every str or bytes key starting with prefix in key order."""
+        # Keys starting with prefix sort straight after it, so the first key
+        # that does not start with it ends the scan.
+        matching = takewhile(
+            lambda item: item[0].startswith(prefix),  # type: ignore
+            self._scan(prefix, None, reverse=False),
+        )
+        return islice(matching, limit)
+
+    def _scan(
+        self, start: Comparable | None, end: Comparable | None, reverse: bool
+    ) -> Iterator[Tuple[Comparable, Any]]:
+        # The active memtable is still being written to, so copy the part in
+        # range. It is at most memtable_max_size entries. Frozen memtables are
+        # never written to again so can be read lazily.
+        with self._write_lock:
+            memtable = self.memtable
+            active = [
+                (key, memtable[key])
+                for key in memtable.irange(
+                    start, end, inclusive=(True, False), reverse=reverse
+                )
+            ]
+            immutable_memtables = self.immutable_memtables
+
+        runs: list[Iterator[Tuple[Comparable, Any]]] = [iter(active)]
+        for immutable in reversed(immutable_memtables):
+            runs.append(_irange_items(immutable.entries, start, end, reverse))
+
+        while True:
+            segments = self.segments
+            try:
+                segment_runs: list[Iterator[Tuple[Comparable, Any]]] = [
+                    segment.sstable.scan(start, end, reverse)
+                    for segment in reversed(segments.values())
+                ]
+                break
+            except FileNotFoundError:
+                # A compaction replaced a segment before we opened it.
+                if self.segments is segments:
+                    raise
+
+        for item in merge_newest_first(runs + segment_runs, reverse=reverse):
+            if item[1] is not TOMBSTONE:
+                yield item
 
     def write(self, key: Comparable, value: Any) -> None:
-        if len(self.memtable) >= self.memtable_max_size:
-            self.flush_memtable_to_disk()
-        self.memtable.update({key: value})
+        with self._write_lock:
+            if len(self.memtable) >= self.memtable_max_size:
+                self._freeze_memtable()
+            self._check_keys([key])
+            wal = self.wal
+            sequence = wal.append([(key, value)])
+            self.memtable[key] = value
+
+        # Wait for the group commit outside the lock so other writers can
+        # join the same fsync.
+        wal.sync(sequence)
+
+    def delete(self, key: Comparable) -> None:
+        """
+        Write a tombstone for key. It hides the older values of the key from
+        reads and scans, and compaction drops it and the values it hides once
+        it reaches the oldest segment.
+        """
+        self.write(key, TOMBSTONE)
+
+    def write_batch(self, items: Iterable[Tuple[Comparable, Any]]) -> None:
+        """
+        Write all the pairs as one write ahead log record and one memtable
+        update, so after a crash either all of them or none of them are
+        replayed. The batch always goes into a single memtable, and so a
+        single segment, which may take it past memtable_max_size.
+        """
+        items = list(items)
+        if not items:
+            return
+
+        with self._write_lock:
+            if len(self.memtable) >= self.memtable_max_size:
+                self._freeze_memtable()
+            self._check_keys([key for key, _ in items])
+            wal = self.wal
+            sequence = wal.append(items)
+            self.memtable.update(items)
+
+        wal.sync(sequence)
+
+    def _check_keys(self, keys: list[Comparable]) -> None:
+        """
+        Must hold _write_lock. Raise the TypeError the memtable would for keys
+        that can't be compared with each other or with its keys, before they
+        are written to the log, where they would break every replay of it.
+        """
+        self.memtable.bisect_left(min(keys))
+
+    def close(self) -> None:
+        """
+        Finish flushing the frozen memtables and any running compaction. The
+        active memtable is left in the write ahead log.
+        """
+        self.wait_for_flush()
+        with self._flush_lock:
+            self._stop_flushing = True
+            self._flush_condition.notify_all()
+        self._flush_thread.join()
+
+        with self._segments_lock:
+            self._closed = True
+        self.wait_for_compaction()
+        if self._owns_compaction_executor:
+            self._compaction_executor.shutdown()
+        if self._owns_file_pool:
+            self.file_pool.close()
+        self.wal.close()
+
+    def wait_for_flush(self) -> None:
+        """Block until every frozen memtable has been flushed to a segment."""
+        with self._flush_lock:
+            while self.immutable_memtables and self._flush_error is None:
+                self._flush_condition.wait()
+            self._raise_flush_error()
+
+    def wait_for_compaction(self) -> None:
+        """Block until there is no compaction running."""
+        with self._segments_lock:
+            while self._compaction_running:
+                self._compaction_idle.wait()
+
+    def compaction_metrics(self) -> CompactionMetrics:
+        with self._segments_lock:
+            segments_per_level: dict[int, int] = {}
+            for segment in self.segments.values():
+                segments_per_level[segment.level] = (
+                    segments_per_level.get(segment.level, 0) + 1
+                )
+            return replace(self._metrics, segments_per_level=segments_per_level)
+
+    def block_cache_stats(self) -> CacheStats:
+        return self.block_cache.stats()
 
     def flush_memtable_to_disk(self) -> None:
-        index_counter = self.segment_chunk_size_for_indexing
-        segment_file_name = (
-            self.segment_folder_path / f"segment_{self.segment_index}.txt"
+        """Freeze the memtable and wait until it has been flushed to a segment."""
+        with self._write_lock:
+            if self.memtable:
+                self._freeze_memtable()
+        self.wait_for_flush()
+
+    def _freeze_memtable(self) -> None:
+        """
+        Must hold _write_lock. Queue the memtable for the flush thread and
+        start a new memtable and write ahead log. Blocks while the queue is
+        full so a flush that cannot keep up slows writers down rather than
+        letting memory grow without bound.
+        """
+        with self._flush_lock:
+            while len(self.immutable_memtables) >= self.max_immutable_memtables:
+                if self._flush_error is not None:
+                    break
+                self._flush_condition.wait()
+            self._raise_flush_error()
+
+        # Closing the log syncs it and releases writers waiting on it.
+        self.wal.close()
+        wal_path = self.segment_folder_path / f"wal_{self._wal_index}.log"
+        self._wal_index += 1
+        os.replace(self.wal.path, wal_path)
+        immutable = ImmutableMemtable(self.memtable, wal_path)
+
+        with self._flush_lock:
+            self.immutable_memtables = self.immutable_memtables + [immutable]
+            self._flush_condition.notify_all()
+        self.memtable = SortedDict()
+        self.wal = self._open_wal()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._flush_lock:
+                while not self.immutable_memtables and not self._stop_flushing:
+                    self._flush_condition.wait()
+                if not self.immutable_memtables:
+                    return
+                immutable = self.immutable_memtables[0]
+
+            try:
+                self._write_segment(immutable.entries)
+            except BaseException as e:
+                logging.exception("Flushing the memtable failed")
+                with self._flush_lock:
+                    self._flush_error = e
+                    self._flush_condition.notify_all()
+                return
+
+            immutable.wal_path.unlink(missing_ok=True)
+            # Schedule before dequeuing so once wait_for_flush returns
+            # wait_for_compaction covers any compaction this flush started.
+            self.schedule_compaction()
+
+            with self._flush_lock:
+                self.immutable_memtables = self.immutable_memtables[1:]
+                self._flush_condition.notify_all()
+
+    def _raise_flush_error(self) -> None:
+        if self._flush_error is not None:
+            raise RuntimeError(
+                "The background memtable flush failed."
+            ) from self._flush_error
+
+    def _write_segment(self, memtable: SortedDict[Comparable, Any]) -> None:
+        segment_file_name = self._next_segment_path()
+        bloom_filter = None
+        if self.bloom_filter_false_positive_rate is not None:
+            bloom_filter = BloomFilter.for_capacity(
+                len(memtable), self.bloom_filter_false_positive_rate
+            )
+
+        writer = SSTableWriter(
+            segment_file_name,
+            block_size=self.block_size,
+            block_entries=self.segment_chunk_size_for_indexing,
+            compression=self.compression,
         )
-        index: SortedDict[Comparable, int] = SortedDict()
+        for key, value in memtable.items():
+            writer.add(key, value)
+            if bloom_filter is not None:
+                bloom_filter.add(key)
+        sstable = writer.finish(fsync=self.durability != "none")
+
+        if bloom_filter is not None:
+            bloom_filter.save(bloom_filter_path(segment_file_name))
+
+        sstable.block_cache = self.block_cache
+        sstable.file_pool = self.file_pool
+        sstable.use_mmap = self.use_mmap
+        segment = Segment(
+            segment_file_name,
+            size=segment_file_name.stat().st_size,
+            has_bloom_filter=bloom_filter is not None,
+            block_cache=self.block_cache,
+            file_pool=self.file_pool,
+            use_mmap=self.use_mmap,
+        )
+        segment.sstable = sstable
+        segment.bloom_filter = bloom_filter
+
+        with self._segments_lock:
+            segments = OrderedDict(self.segments)
+            segments[segment_file_name] = segment
+            self.segments = segments
+            self._save_manifest()
+            self._metrics.bytes_flushed += segment.size
 
-        with open(segment_file_name, "a") as f:
-            for key, value in self.memtable.items():
-                if index_counter == 0:
-                    offset = f.tell()
-                    index.update({key: offset})
-                    index_counter = self.segment_chunk_size_for_indexing
+    def schedule_compaction(self) -> None:
+        """
+        Ask the compaction strategy whether any segments need merging and if
+        so start merging them in the background. Called after every flush and
+        after every compaction, as one compaction can make room for another.
+        """
+        if self.compaction_strategy is None:
+            return
 
-                f.write(f"{key}: {value}\n")
-                index_counter -= 1
+        with self._segments_lock:
+            if self._compaction_running:
+                return
+            job = self._pick_compaction()
 
-        self.memtable = SortedDict()
-        self.segments.update({segment_file_name: index})
-        self.segment_index += 1
-
-    def get_floor_ceil_of_key_in_index(
-        self, inputted_key: Comparable, index: SortedDict[Comparable, int]
-    ) -> Tuple[int, int | None]:
-        """
-        Not very performant algorithm for looping through our SortedDict index
-        to find the boundary where the key to search for is.
-
-        I.e. if our tree looks something like:
-        {a: 100
-        h: 200
-        q: 300
-        z: 400}
-        then the boundaries if we try and find key j would be a and h.
-        """
-        floor = 0
-        ceil = None
-        prev_value = 0
-        value = 0
-        for key, value in index.items():
-            value = int(value)
-            if key == inputted_key:
-                return (value, value)
-            elif inputted_key < key:
-                floor, ceil = prev_value, value
-                break
-            prev_value = value
+        if job is not None:
+            self._start_compaction(job)
+
+    def _pick_compaction(self) -> CompactionJob | None:
+        """
+        Must hold _segments_lock. Marks a compaction as running if there is
+        one to do, otherwise marks compaction as idle.
+        """
+        job = None
+        if self.compaction_strategy is not None and not self._closed:
+            job = self.compaction_strategy.pick(
+                [
+                    SegmentSummary(path, segment.level, segment.size)
+                    for path, segment in self.segments.items()
+                ]
+            )
+
+        self._compaction_running = job is not None
+        if job is None:
+            self._compaction_idle.notify_all()
+        return job
+
+    def _start_compaction(self, job: CompactionJob) -> None:
+        output_path = self._next_segment_path()
+        # Nothing older than the oldest segment can be hidden by a tombstone,
+        # so a merge that includes it can drop them. Flushes only add newer
+        # segments so it stays the oldest until the merge is installed.
+        drop_tombstones = job.inputs[0] == next(iter(self.segments))
+        future = self._compaction_executor.submit(
+            merge_segment_files,
+            tuple(reversed(job.inputs)),
+            output_path,
+            self.bloom_filter_false_positive_rate,
+            self.block_size,
+            self.compression,
+            drop_tombstones,
+        )
+        future.add_done_callback(partial(self._install_compaction, job, output_path))
+
+    def _install_compaction(
+        self, job: CompactionJob, output_path: Path, future: Future[Path]
+    ) -> None:
+        """
+        Swap the merged segment in for its inputs, delete the input files and
+        start the next compaction if there is one. Runs on the thread that
+        finished the merge.
+        """
+        try:
+            future.result()
+            sstable = SSTableReader.open(
+                output_path,
+                block_cache=self.block_cache,
+                file_pool=self.file_pool,
+                use_mmap=self.use_mmap,
+            )
+            bloom_filter = None
+            if self.bloom_filter_false_positive_rate is not None:
+                bloom_filter = BloomFilter.load(bloom_filter_path(output_path))
+        except Exception:
+            logging.exception(f"Compaction of {job.inputs} failed")
+            output_path.unlink(missing_ok=True)
+            bloom_filter_path(output_path).unlink(missing_ok=True)
+            with self._segments_lock:
+                self._compaction_running = False
+                self._compaction_idle.notify_all()
+            return
+
+        size = output_path.stat().st_size
+        merged = Segment(
+            output_path,
+            job.output_level,
+            size,
+            bloom_filter is not None,
+            self.block_cache,
+            self.file_pool,
+            self.use_mmap,
+        )
+        merged.sstable = sstable
+        merged.bloom_filter = bloom_filter
+        with self._segments_lock:
+            segments: OrderedDict[Path, Segment] = OrderedDict()
+            for path, segment in self.segments.items():
+                if path in job.inputs:
+                    # The inputs are adjacent so the merged segment takes the
+                    # place of the newest one.
+                    if path == job.inputs[-1]:
+                        segments[output_path] = merged
+                    continue
+                segments[path] = segment
+
+            self._metrics.compactions += 1
+            self._metrics.bytes_compacted += sum(
+                self.segments[path].size for path in job.inputs
+            )
+            self._metrics.bytes_written_by_compaction += size
+            self.segments = segments
+            self._save_manifest()
+
+        for path in job.inputs:
+            path.unlink(missing_ok=True)
+            bloom_filter_path(path).unlink(missing_ok=True)
+            # Segment paths are never reused, so a block a concurrent read puts
+            # back after this only wastes space until it is evicted.
+            self.block_cache.discard(path)
+            self.file_pool.discard(path)
+
+        with self._segments_lock:
+            next_job = self._pick_compaction()
+        if next_job is not None:
+            self._start_compaction(next_job)
+
+    def _open_wal(self) -> WriteAheadLog:
+        return WriteAheadLog(
+            self.segment_folder_path / "wal.log",
+            durability=self.durability,
+            group_commit_interval=self.group_commit_interval,
+        )
+
+    def _recover_immutable_memtables(self) -> None:
+        """
+        Logs of frozen memtables that had not been flushed when the tree was
+        closed or crashed are replayed, oldest first, and queued for the flush
+        thread again.
+        """
+        frozen_wal_indexes = sorted(
+            int(name.removeprefix("wal_").removesuffix(".log"))
+            for name in os.listdir(self.segment_folder_path)
+            if name.startswith("wal_") and name.endswith(".log")
+        )
+        for wal_index in frozen_wal_indexes:
+            wal_path = self.segment_folder_path / f"wal_{wal_index}.log"
+            wal = WriteAheadLog(wal_path, durability="none")
+            entries: SortedDict[Comparable, Any] = SortedDict()
+            for record in wal.replay():
+                entries.update(record)
+            wal.close()
+            self.immutable_memtables.append(ImmutableMemtable(entries, wal_path))
+            self._wal_index = wal_index + 1
+
+    def _load_manifest(self) -> None:
+        """
+        Rebuild self.segments from the manifest. Segment files that are not
+        in it are left over from a flush or compaction that crashed before
+        the manifest was updated, or compaction inputs that were not deleted,
+        so they are removed.
+        """
+        segment_files = [
+            name
+            for name in os.listdir(self.segment_folder_path)
+            if name.startswith("segment_")
+        ]
+        if not self.manifest_path.exists():
+            # Never overwrite segment files written without a manifest.
+            segment_numbers = [
+                name.removeprefix("segment_").partition(".")[0]
+                for name in segment_files
+            ]
+            self.segment_index = 1 + max(
+                (int(number) for number in segment_numbers if number.isdigit()),
+                default=-1,
+            )
+            return
+
+        manifest = Manifest.load(self.manifest_path)
+        self.segment_index = manifest.next_segment_index
+        live_files = set()
+        for record in manifest.segments:
+            path = self.segment_folder_path / record.name
+            self.segments[path] = Segment(
+                path,
+                record.level,
+                record.size,
+                record.bloom_filter is not None,
+                self.block_cache,
+                self.file_pool,
+                self.use_mmap,
+            )
+            live_files.add(record.name)
+            if record.bloom_filter is not None:
+                live_files.add(record.bloom_filter)
+
+        for name in segment_files:
+            if name not in live_files:
+                path = self.segment_folder_path / name
+                logging.warning(f"Removing segment file {path} not in the manifest")
+                path.unlink()
+
+    def _save_manifest(self) -> None:
+        """Must hold _segments_lock."""
+        Manifest(
+            self.segment_index,
+            [
+                SegmentRecord(
+                    path.name,
+                    segment.level,
+                    segment.size,
+                    bloom_filter_path(path).name if segment.has_bloom_filter else None,
+                )
+                for path, segment in self.segments.items()
+            ],
+        ).save(self.manifest_path, fsync=self.durability != "none")
+
+    def _next_segment_path(self) -> Path:
+        with self._segments_lock:
+            segment_index = self.segment_index
+            self.segment_index += 1
+        return self.segment_folder_path / f"segment_{segment_index}.sst"
 
-        # Value either not in segment, or in final section.
-        if ceil is None:
-            floor = value
 
-        return floor, ceil
+def _irange_items(
+    entries: SortedDict[Comparable, Any],
+    start: Comparable | None,
+    end: Comparable | None,
+    reverse: bool,
+) -> Iterator[Tuple[Comparable, Any]]:
+    for key in entries.irange(start, end, inclusive=(True, False), reverse=reverse):
+        yield key, entries[key]
 
 
 def merge_segment_files(
     segment_file_paths: Tuple[Path, ...],
     merged_file_path: Path,
+    bloom_filter_false_positive_rate: float | None = None,
+    block_size: int = 4096,
+    compression: COMPRESSION = "zlib",
+    drop_tombstones: bool = False,
 ) -> Path:
-    # TODO: Need to test whether this is actually more
-    # efficient than merging two files over and over.
-
-    def turn_line_into_key_value(line: str) -> Tuple[int, str]:
-        key_value = [x.strip() for x in line.split(":")]
-        if len(key_value) != 2:
-            raise Exception(
-                (
-                    "Line was parsed incorrectly.\n"
-                    "Expected a key value pair seperated by a colon.\n"
-                    f"Received: {line}"
-                )
-            )
-        return int(key_value[0]), key_value[1]
-
-    segment_files = []  # Initialising to avoid possible unbound errors in finally block
-    with open(merged_file_path, "a") as output_file:
-        try:
-            segment_files = [file.open("r") for file in segment_file_paths]
-            lines = [file.readline() for file in segment_files]
-            keys = [turn_line_into_key_value(line)[0] if line else "" for line in lines]
-
-            while any(keys):
-                # This gets us the value we need to add to the merged file provided the
-                # segment_files_list is in order of newest file to oldest.
+    """
+    Merge segments, ordered newest to oldest, into a single segment keeping
+    only the newest value for each key. If bloom_filter_false_positive_rate is
+    given a bloom filter for the merged segment is saved next to it.
+
+    drop_tombstones leaves deleted keys out of the merged segment entirely,
+    which is only correct when no older segment could still hold the key.
+    """
+    # All inputs are merged in one pass, rather than two at a time, so every
+    # key is read and written once however many segments there are.
+
+    # The number of keys in the merged segment is only known at the end so keep
+    # the hashes of the written keys and size the filter once we are done.
+    first_hashes: array[int] = array("Q")
+    second_hashes: array[int] = array("Q")
+
+    writer = SSTableWriter(
+        merged_file_path, block_size=block_size, compression=compression
+    )
+    # Each input is read and decoded a block at a time and the output is
+    # buffered into blocks by the writer, so memory use does not depend on the
+    # size of the segments.
+    for key, value in merge_newest_first(
+        [SSTableReader.open(path) for path in segment_file_paths]
+    ):
+        if drop_tombstones and value is TOMBSTONE:
+            continue
+        writer.add(key, value)
+        if bloom_filter_false_positive_rate is not None:
+            first, second = hash_key(key)
+            first_hashes.append(first)
+            second_hashes.append(second)
+
+    writer.finish()
+
+    if bloom_filter_false_positive_rate is not None:
+        BloomFilter.from_hashes(
+            zip(first_hashes, second_hashes),
+            len(first_hashes),
+            bloom_filter_false_positive_rate,
+        ).save(bloom_filter_path(merged_file_path))
 
-                # TODO: This will only work with integer keys
-                min_value_index = keys.index(
-                    min(keys, key=lambda x: inf if x == "" else x)  # type: ignore
-                )
-                key = keys[min_value_index]
-
-                output_file.write(lines[min_value_index])
-
-                lines[min_value_index] = segment_files[min_value_index].readline()
-
-                if lines[min_value_index]:
-                    keys[min_value_index] = turn_line_into_key_value(
-                        lines[min_value_index]
-                    )[0]
-                else:
-                    keys[min_value_index] = ""
-
-                breakout = False
-
-                while not breakout:
-                    try:
-                        next_index = keys.index(key)
-                        lines[next_index] = segment_files[next_index].readline()
-                        if lines[next_index]:
-                            keys[next_index] = turn_line_into_key_value(
-                                lines[next_index]
-                            )[0]
-                        else:
-                            keys[next_index] = ""
-
-                    except ValueError:
-                        breakout = True
-        except Exception as e:
-            raise e
-        finally:
-            for file in segment_files:
-                file.close()
     return merged_file_path
@@ -0,0 +1,73 @@
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+
+
+@dataclass(frozen=True)
+class SegmentRecord:
+    """
+    A live segment as recorded in the manifest. Names are relative to the
+    segment folder so the folder can be moved. The sparse index of a segment
+    is in its SStable footer, so the SStable and bloom filter file names are
+    all that is needed to load it.
+    """
+
+    name: str
+    level: int
+    size: int
+    bloom_filter: str | None = None
+
+
+@dataclass
+class Manifest:
+    """
+    The set of live segments of an LSMTree, ordered oldest to newest, and the
+    index to give the next segment file. Saving writes the whole manifest to
+    a temporary file and renames it over the old one, so a crash leaves
+    either the old or the new manifest and never a mix of the two.
+    """
+
+    next_segment_index: int = 0
+    segments: list[SegmentRecord] = field(default_factory=list)
+
+    def save(self, path: Path, fsync: bool = True) -> None:
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "version": MANIFEST_VERSION,
+                    "next_segment_index": self.next_segment_index,
+                    "segments": [asdict(segment) for segment in self.segments],
+                },
+                f,
+            )
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        if fsync:
+            # Make the rename itself durable.
+            directory = os.open(path.parent, os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+
+    @classmethod
+    def load(cls, path: Path) -> "Manifest":
+        with open(path, "r") as f:
+            contents = json.load(f)
+
+        if contents.get("version") != MANIFEST_VERSION:
+            raise ValueError(
+                f"Unsupported manifest version {contents.get('version')} in {path}."
+            )
+
+        return cls(
+            contents["next_segment_index"],
+            [SegmentRecord(**segment) for segment in contents["segments"]],
+        )
@@ -0,0 +1,64 @@
+from heapq import heapify, heappop, heapreplace
+from typing import Any, Iterable, Iterator, Sequence, Tuple
+
+from sandb.indexes.abc import Comparable
+
+
+class _Descending:
+    """Wraps a key so a min heap pops the largest key first."""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key: Comparable) -> None:
+        self.key = key
+
+    def __lt__(self, other: "_Descending") -> bool:
+        return other.key < self.key
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Descending) and self.key == other.key
+
+
+def merge_newest_first(
+    runs: Sequence[Iterable[Tuple[Comparable, Any]]],
+    reverse: bool = False,
+) -> Iterator[Tuple[Comparable, Any]]:
+    """
+    Merge sorted runs of key value pairs, ordered newest to oldest, into one
+    sorted stream holding only the newest value for each key. If reverse is
+    True the runs, and the output, are in descending key order.
+
+    The heap holds one (key, rank, value) entry per run, where rank is the
+    position of the run in runs. Ties on key are broken by rank so the newest
+    value for a key is always popped first and the older ones are skipped.
+    Values are never compared as ranks are unique. Each output costs
+    O(log k) for k runs.
+    """
+    if reverse:
+        runs = [((_Descending(key), value) for key, value in run) for run in runs]
+
+    iterators = [iter(run) for run in runs]
+    heap: list[Tuple[Comparable, int, Any]] = []
+    for rank, iterator in enumerate(iterators):
+        entry = next(iterator, None)
+        if entry is not None:
+            heap.append((entry[0], rank, entry[1]))
+    heapify(heap)
+
+    has_last_key = False
+    last_key: Comparable | None = None
+    while heap:
+        key, rank, value = heap[0]
+        entry = next(iterators[rank], None)
+        if entry is None:
+            heappop(heap)
+        else:
+            heapreplace(heap, (entry[0], rank, entry[1]))
+        if reverse:
+            key = key.key  # type: ignore
+
+        if has_last_key and key == last_key:
+            continue
+        has_last_key = True
+        last_key = key
+        yield key, value
@@ -0,0 +1,42 @@
+from array import array
+from typing import Iterator, Mapping, Tuple
+
+from sandb.indexes.abc import Comparable
+
+
+class SparseIndex:
+    """
+    Sparse index for a single SStable. Holds every nth key of the segment along
+    with the byte offset of that key in the segment file.
+
+    Keys are kept in a sorted list and the offsets in a parallel signed 64 bit
+    array, rather than a SortedDict of boxed ints, so the index stays compact
+    and a lookup is a single bisect over keys.
+    """
+
+    def __init__(self) -> None:
+        self.keys: list[Comparable] = []
+        self.offsets: array[int] = array("q")
+
+    @classmethod
+    def from_mapping(cls, mapping: Mapping[Comparable, int]) -> "SparseIndex":
+        index = cls()
+        for key in sorted(mapping):
+            index.append(key, mapping[key])
+        return index
+
+    def append(self, key: Comparable, offset: int) -> None:
+        """Keys have to be appended in sorted order, as they are during a flush."""
+        if self.keys and not self.keys[-1] < key:
+            raise ValueError(
+                f"Keys must be appended in sorted order. {key} came after "
+                f"{self.keys[-1]}"
+            )
+        self.keys.append(key)
+        self.offsets.append(offset)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def items(self) -> Iterator[Tuple[Comparable, int]]:
+        return zip(self.keys, self.offsets)
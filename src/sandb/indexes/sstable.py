@@ -0,0 +1,497 @@
+import lzma
+import mmap
+import os
+import struct
+import zlib
+from bisect import bisect_left, bisect_right
+from functools import cached_property
+from pathlib import Path
+from typing import IO, Any, Callable, Iterator, Literal, Mapping, Sequence, Tuple
+
+from sandb.indexes.abc import Comparable
+from sandb.indexes.block_cache import BlockCache
+from sandb.indexes.encoding import (
+    LENGTH_PREFIX,
+    PICKLE_TAG,
+    decode,
+    decode_entry,
+    encode,
+    encode_entry,
+)
+from sandb.indexes.file_handle_pool import FileHandlePool
+from sandb.indexes.sparse_index import SparseIndex
+
+COMPRESSION = Literal["none", "zlib", "lzma"]
+
+SSTABLE_MAGIC = b"SST1"
+SSTABLE_VERSION = 1
+# footer offset, footer length, crc32 of the footer, format version, magic
+TRAILER = struct.Struct(">QIIH4s")
+# compression codec id, number of entries, number of blocks
+FOOTER_HEADER = struct.Struct(">BQI")
+BLOCK_OFFSET = struct.Struct(">Q")
+# Full scans read the file sequentially so read ahead by more than a block.
+SCAN_BUFFER_SIZE = 256 * 1024
+
+CODEC_IDS: Mapping[COMPRESSION, int] = {"none": 0, "zlib": 1, "lzma": 2}
+CODEC_NAMES: Mapping[int, COMPRESSION] = {v: k for k, v in CODEC_IDS.items()}
+COMPRESSORS: Mapping[COMPRESSION, Callable[[bytes], bytes]] = {
+    "none": bytes,
+    "zlib": zlib.compress,
+    "lzma": lzma.compress,
+}
+DECOMPRESSORS: Mapping[COMPRESSION, Callable[[bytes], bytes]] = {
+    "none": bytes,
+    "zlib": zlib.decompress,
+    "lzma": lzma.decompress,
+}
+
+# Returned by SSTableReader.get when the key is not in the table, as None is
+# a valid value.
+MISSING: Any = object()
+
+
+class SSTableWriter:
+    """
+    Writes sorted key value pairs to a binary SStable. The file is laid out as
+
+        [block 0][block 1]...[block n][footer][trailer]
+
+    Each block holds length prefixed key value pairs (see encode_entry) and is
+    compressed on its own, so a lookup only has to read and decompress one block.
+    A block is closed once it holds block_size bytes before compression, or
+    block_entries entries if that is given.
+
+    The footer holds the compression codec, the number of entries, the last key
+    and the first key and offset of every block. The fixed size trailer at the
+    end of the file points to the footer.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        block_size: int = 4096,
+        block_entries: int | None = None,
+        compression: COMPRESSION = "zlib",
+    ) -> None:
+        if compression not in CODEC_IDS:
+            raise ValueError(f"Unknown compression {compression}")
+
+        self.path = path
+        self.block_size = block_size
+        self.block_entries = block_entries
+        self.compression = compression
+
+        self.index = SparseIndex()
+        self.entry_count = 0
+        self.last_key: Comparable | None = None
+
+        self._file = open(path, "wb")
+        self._compress = COMPRESSORS[compression]
+        self._block: list[bytes] = []
+        self._block_bytes = 0
+
+    def add(self, key: Comparable, value: Any) -> None:
+        """Keys have to be added in sorted order."""
+        if not self._block:
+            # Raises if the key is out of order.
+            self.index.append(key, self._file.tell())
+
+        entry = encode_entry(key, value)
+        self._block.append(entry)
+        self._block_bytes += len(entry)
+        self.entry_count += 1
+        self.last_key = key
+
+        if self._block_bytes >= self.block_size or (
+            self.block_entries is not None and len(self._block) >= self.block_entries
+        ):
+            self._flush_block()
+
+    def finish(self, fsync: bool = False) -> "SSTableReader":
+        """Write the footer and close the file. Returns a reader for the table."""
+        self._flush_block()
+        data_end = self._file.tell()
+
+        footer = [
+            FOOTER_HEADER.pack(
+                CODEC_IDS[self.compression], self.entry_count, len(self.index)
+            )
+        ]
+        if self.entry_count:
+            encoded_last_key = encode(self.last_key)
+            footer.append(LENGTH_PREFIX.pack(len(encoded_last_key)))
+            footer.append(encoded_last_key)
+        for first_key, offset in self.index.items():
+            encoded_key = encode(first_key)
+            footer.append(BLOCK_OFFSET.pack(offset))
+            footer.append(LENGTH_PREFIX.pack(len(encoded_key)))
+            footer.append(encoded_key)
+        footer_bytes = b"".join(footer)
+
+        self._file.write(footer_bytes)
+        self._file.write(
+            TRAILER.pack(
+                data_end,
+                len(footer_bytes),
+                zlib.crc32(footer_bytes),
+                SSTABLE_VERSION,
+                SSTABLE_MAGIC,
+            )
+        )
+        if fsync:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._file.close()
+
+        return SSTableReader(
+            self.path,
+            self.index,
+            data_end,
+            self.compression,
+            self.entry_count,
+            self.last_key,
+        )
+
+    def _flush_block(self) -> None:
+        if not self._block:
+            return
+        self._file.write(self._compress(b"".join(self._block)))
+        self._block = []
+        self._block_bytes = 0
+
+
+class SSTableReader:
+    """
+    Read side of an SStable. Only the footer is kept in memory: the first key
+    and offset of every block in a SparseIndex, plus the last key so lookups
+    outside the key range of the table never touch the file.
+
+    A block runs from its offset to the offset of the next block, or to the
+    start of the footer for the last block.
+
+    Point lookups check the block cache, if given, before reading a block and
+    read through the file handle pool, if given, instead of opening the file.
+    Scans read the file in order with their own handle and skip the cache, so
+    one large scan does not evict every hot block.
+
+    With use_mmap the file is mapped into memory on the first lookup and
+    blocks are read from the mapping rather than with a read call. SStables
+    are never written to after finish so this is safe. Uncompressed blocks are
+    searched in place in the mapping, so only the value of the matching entry
+    is ever copied, and are not put in the block cache as the page cache
+    already holds them. The mapping is released with the reader, and stays
+    valid after the file is deleted by a compaction.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        index: SparseIndex,
+        data_end: int,
+        compression: COMPRESSION,
+        entry_count: int,
+        last_key: Comparable | None,
+        *,
+        block_cache: BlockCache | None = None,
+        file_pool: FileHandlePool | None = None,
+        use_mmap: bool = False,
+    ) -> None:
+        self.path = path
+        self.index = index
+        self.data_end = data_end
+        self.compression = compression
+        self.entry_count = entry_count
+        self.last_key = last_key
+        self.block_cache = block_cache
+        self.file_pool = file_pool
+        self.use_mmap = use_mmap
+        self._decompress = DECOMPRESSORS[compression]
+
+    @classmethod
+    def open(
+        cls,
+        path: Path,
+        *,
+        block_cache: BlockCache | None = None,
+        file_pool: FileHandlePool | None = None,
+        use_mmap: bool = False,
+    ) -> "SSTableReader":
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < TRAILER.size:
+                raise ValueError(f"{path} is too short to be an SStable.")
+            f.seek(-TRAILER.size, os.SEEK_END)
+            data_end, footer_length, checksum, version, magic = TRAILER.unpack(
+                f.read(TRAILER.size)
+            )
+            if magic != SSTABLE_MAGIC:
+                raise ValueError(f"{path} is not an SStable.")
+            if version != SSTABLE_VERSION:
+                raise ValueError(f"Unsupported SStable version {version} in {path}.")
+
+            f.seek(data_end)
+            footer = f.read(footer_length)
+
+        if len(footer) != footer_length or zlib.crc32(footer) != checksum:
+            raise ValueError(f"SStable footer in {path} is corrupt.")
+
+        codec_id, entry_count, block_count = FOOTER_HEADER.unpack_from(footer, 0)
+        offset = FOOTER_HEADER.size
+
+        last_key = None
+        if entry_count:
+            last_key, offset = _decode_length_prefixed(footer, offset)
+
+        index = SparseIndex()
+        for _ in range(block_count):
+            (block_offset,) = BLOCK_OFFSET.unpack_from(footer, offset)
+            first_key, offset = _decode_length_prefixed(
+                footer, offset + BLOCK_OFFSET.size
+            )
+            index.append(first_key, block_offset)
+
+        return cls(
+            path,
+            index,
+            data_end,
+            CODEC_NAMES[codec_id],
+            entry_count,
+            last_key,
+            block_cache=block_cache,
+            file_pool=file_pool,
+            use_mmap=use_mmap,
+        )
+
+    def get(self, key: Comparable) -> Any:
+        """Return the value stored for key, or MISSING if it is not in the table."""
+        keys = self.index.keys
+        if not keys or key < keys[0] or self.last_key < key:  # type: ignore
+            return MISSING
+
+        block, start, end = self._load_block(bisect_right(keys, key) - 1)
+        return _search_block(block, key, start, end)
+
+    def multi_get(self, keys: Sequence[Comparable]) -> dict[Comparable, Any]:
+        """
+        Look up many keys, given in sorted order, reading each block at most
+        once. Returns the keys that were found mapped to their values.
+        """
+        index_keys = self.index.keys
+        if not index_keys:
+            return {}
+
+        found: dict[Comparable, Any] = {}
+        position = -1
+        block_keys: list[Comparable] = []
+        for key in keys:
+            if key < index_keys[0] or self.last_key < key:  # type: ignore
+                continue
+            key_position = bisect_right(index_keys, key) - 1
+            if key_position != position and block_keys:
+                found.update(self._search_block_for_keys(position, block_keys))
+                block_keys = []
+            position = key_position
+            block_keys.append(key)
+        if block_keys:
+            found.update(self._search_block_for_keys(position, block_keys))
+
+        return found
+
+    def _search_block_for_keys(
+        self, position: int, keys: list[Comparable]
+    ) -> Iterator[Tuple[Comparable, Any]]:
+        block, start, end = self._load_block(position)
+        if len(keys) == 1:
+            value = _search_block(block, keys[0], start, end)
+            if value is not MISSING:
+                yield keys[0], value
+            return
+
+        # Many keys in one block: find each entry by its encoded key.
+        values = _block_value_offsets(block, start, end)
+        for key in keys:
+            encoded_key = encode(key)
+            if encoded_key.startswith(PICKLE_TAG):
+                value = _search_block(block, key, start, end)
+                if value is not MISSING:
+                    yield key, value
+            elif encoded_key in values:
+                value_start, value_end = values[encoded_key]
+                yield key, decode(block[value_start:value_end])
+
+    def __iter__(self) -> Iterator[Tuple[Any, Any]]:
+        """Yield every key value pair in key order, decoding a block at a time."""
+        return self.scan()
+
+    def scan(
+        self,
+        start: Comparable | None = None,
+        end: Comparable | None = None,
+        reverse: bool = False,
+    ) -> Iterator[Tuple[Any, Any]]:
+        """
+        Yield the key value pairs with start <= key < end, in key order or in
+        reverse key order, decoding a block at a time. A bound of None leaves
+        that side of the range open.
+
+        The sparse index is used to seek straight to the first block in range.
+        The file is opened before returning, so the scan can carry on reading
+        it after the segment has been deleted by a compaction.
+        """
+        keys = self.index.keys
+        if not keys:
+            return iter(())
+        after_range = start is not None and self.last_key < start  # type: ignore
+        before_range = end is not None and not keys[0] < end
+        if after_range or before_range:
+            return iter(())
+
+        if reverse:
+            return self._scan_backward(open(self.path, "rb"), start, end)
+        return self._scan_forward(
+            open(self.path, "rb", buffering=SCAN_BUFFER_SIZE), start, end
+        )
+
+    def __len__(self) -> int:
+        return self.entry_count
+
+    def _scan_forward(
+        self, f: IO[bytes], start: Comparable | None, end: Comparable | None
+    ) -> Iterator[Tuple[Any, Any]]:
+        with f:
+            first = 0 if start is None else bisect_right(self.index.keys, start) - 1
+            for position in range(max(first, 0), len(self.index)):
+                for key, value in _decode_block(self._read_block(f, position)):
+                    if end is not None and not key < end:
+                        return
+                    if start is None or not key < start:
+                        yield key, value
+
+    def _scan_backward(
+        self, f: IO[bytes], start: Comparable | None, end: Comparable | None
+    ) -> Iterator[Tuple[Any, Any]]:
+        with f:
+            last = len(self.index) if end is None else bisect_left(self.index.keys, end)
+            for position in range(last - 1, -1, -1):
+                entries = list(_decode_block(self._read_block(f, position)))
+                for key, value in reversed(entries):
+                    if end is not None and not key < end:
+                        continue
+                    if start is not None and key < start:
+                        return
+                    yield key, value
+
+    def _load_block(self, position: int) -> Tuple[bytes | mmap.mmap, int, int]:
+        """
+        Read a block for a point lookup, through the cache and file pool.
+        Returns a buffer and the start and end of the block in it.
+        """
+        start, end = self._block_bounds(position)
+        if self.use_mmap and self.compression == "none":
+            return self._mapped, start, end
+
+        block_cache = self.block_cache
+        if block_cache is not None:
+            block = block_cache.get((self.path, start))
+            if block is not None:
+                return block, 0, len(block)
+
+        if self.use_mmap:
+            raw: bytes | memoryview = memoryview(self._mapped)[start:end]
+        elif self.file_pool is not None:
+            with self.file_pool.open(self.path) as fd:
+                raw = os.pread(fd, end - start, start)
+        else:
+            with open(self.path, "rb") as f:
+                f.seek(start)
+                raw = f.read(end - start)
+
+        block = self._decompress(raw)
+        if block_cache is not None:
+            block_cache.put((self.path, start), block)
+        return block, 0, len(block)
+
+    @cached_property
+    def _mapped(self) -> mmap.mmap:
+        with open(self.path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _read_block(self, f: Any, position: int) -> bytes:
+        start, end = self._block_bounds(position)
+        f.seek(start)
+        return self._decompress(f.read(end - start))
+
+    def _block_bounds(self, position: int) -> Tuple[int, int]:
+        offsets = self.index.offsets
+        start = offsets[position]
+        end = offsets[position + 1] if position + 1 < len(offsets) else self.data_end
+        return start, end
+
+
+def _decode_length_prefixed(buf: bytes, offset: int) -> Tuple[Any, int]:
+    (length,) = LENGTH_PREFIX.unpack_from(buf, offset)
+    offset += LENGTH_PREFIX.size
+    return decode(buf[offset : offset + length]), offset + length
+
+
+def _decode_block(block: bytes) -> Iterator[Tuple[Any, Any]]:
+    offset = 0
+    while offset < len(block):
+        key, value, offset = decode_entry(block, offset)
+        yield key, value
+
+
+def _block_value_offsets(
+    block: bytes | mmap.mmap, offset: int, end: int
+) -> dict[bytes, Tuple[int, int]]:
+    """Map the encoded key of every entry in a block to where its value is."""
+    offsets = {}
+    prefix_size = LENGTH_PREFIX.size
+    while offset < end:
+        (key_length,) = LENGTH_PREFIX.unpack_from(block, offset)
+        offset += prefix_size
+        encoded_key = block[offset : offset + key_length]
+        offset += key_length
+        (value_length,) = LENGTH_PREFIX.unpack_from(block, offset)
+        offset += prefix_size
+        offsets[encoded_key] = (offset, offset + value_length)
+        offset += value_length
+    return offsets
+
+
+def _search_block(
+    block: bytes | mmap.mmap, key: Comparable, offset: int, end: int
+) -> Any:
+    """
+    Scan the decompressed block between offset and end of a buffer for key.
+    Equal keys encode to equal bytes so the stored keys are compared in their
+    encoded form, in place, and only the value of the matching entry is
+    decoded. Pickled keys have no such guarantee so they are decoded and
+    compared.
+    """
+    encoded_key = encode(key)
+    key_length = len(encoded_key)
+    compare_decoded = encoded_key.startswith(PICKLE_TAG)
+    prefix_size = LENGTH_PREFIX.size
+    unpack_length = LENGTH_PREFIX.unpack_from
+    find = block.find
+
+    while offset < end:
+        (stored_key_length,) = unpack_length(block, offset)
+        offset += prefix_size
+        if compare_decoded:
+            found = decode(block[offset : offset + stored_key_length]) == key
+        else:
+            found = stored_key_length == key_length
+            if found:
+                found = find(encoded_key, offset, offset + key_length) == offset
+        offset += stored_key_length
+
+        (value_length,) = unpack_length(block, offset)
+        offset += prefix_size
+        if found:
+            return decode(block[offset : offset + value_length])
+        offset += value_length
+
+    return MISSING
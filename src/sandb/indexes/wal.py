@@ -0,0 +1,183 @@
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Iterator, Literal, Sequence, Tuple
+
+from sandb.indexes.encoding import decode_entry, encode_entry
+
+DURABILITY_MODE = Literal["none", "per_write", "batched"]
+
+# crc32 of the payload, payload length
+RECORD_HEADER = struct.Struct(">II")
+# number of key value pairs in the record
+ENTRY_COUNT = struct.Struct(">I")
+
+
+class WriteAheadLog:
+    """
+    Append only log of every write applied to the memtable, so the memtable
+    can be rebuilt after a crash. Each append is a single record holding one
+    or more key value pairs, protected by a crc32 so a torn write at the end
+    of the log is detected and dropped on replay.
+
+    Durability modes:
+        none: every append is flushed to the OS but never fsynced, so it
+            survives the process exiting or crashing, not the OS crashing.
+        per_write: every append is flushed and fsynced before returning.
+        batched: group commit. A background thread fsyncs everything appended
+            since the last sync in one go, and writers block in sync() until a
+            sync covering their record has finished. The thread waits up to
+            group_commit_interval seconds, or until group_commit_max_records
+            records are pending, before syncing.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        durability: DURABILITY_MODE = "batched",
+        group_commit_interval: float = 0.0,
+        group_commit_max_records: int = 1024,
+    ) -> None:
+        self.path = path
+        self.durability = durability
+        self.group_commit_interval = group_commit_interval
+        self.group_commit_max_records = group_commit_max_records
+
+        self._file = open(path, "ab")
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._pending = threading.Condition(self._lock)
+        # Sequence number of the last record appended and the last one fsynced.
+        self._written_sequence = 0
+        self._synced_sequence = 0
+        self._first_pending_at = 0.0
+        self._closed = False
+
+        self._sync_thread: threading.Thread | None = None
+        if durability == "batched":
+            self._sync_thread = threading.Thread(
+                target=self._group_commit_loop, name=f"wal-sync-{path}", daemon=True
+            )
+            self._sync_thread.start()
+
+    def replay(self) -> Iterator[list[Tuple[Any, Any]]]:
+        """
+        Yield the key value pairs of each record in the log in the order they
+        were written. Stops at the first incomplete or corrupt record and
+        truncates the log there so new records are not appended after garbage.
+        """
+        valid_length = 0
+        with open(self.path, "rb") as f:
+            while header := f.read(RECORD_HEADER.size):
+                if len(header) < RECORD_HEADER.size:
+                    break
+                checksum, length = RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    break
+
+                (count,) = ENTRY_COUNT.unpack_from(payload, 0)
+                offset = ENTRY_COUNT.size
+                entries = []
+                for _ in range(count):
+                    key, value, offset = decode_entry(payload, offset)
+                    entries.append((key, value))
+
+                valid_length += RECORD_HEADER.size + length
+                yield entries
+
+        if self.path.stat().st_size > valid_length:
+            logging.warning(
+                f"Dropping corrupt tail of write ahead log {self.path} "
+                f"after byte {valid_length}"
+            )
+            with self._lock:
+                self._file.truncate(valid_length)
+
+    def append(self, entries: Sequence[Tuple[Any, Any]]) -> int:
+        """
+        Append all the entries as a single record, so they are replayed
+        all or nothing. Returns the sequence number to pass to sync().
+        """
+        payload = ENTRY_COUNT.pack(len(entries)) + b"".join(
+            encode_entry(key, value) for key, value in entries
+        )
+        record = RECORD_HEADER.pack(zlib.crc32(payload), len(payload)) + payload
+
+        with self._lock:
+            self._file.write(record)
+            self._written_sequence += 1
+            if self.durability == "none":
+                self._file.flush()
+            elif self.durability == "per_write":
+                self._fsync()
+                self._synced_sequence = self._written_sequence
+            elif self.durability == "batched":
+                if self._written_sequence == self._synced_sequence + 1:
+                    self._first_pending_at = time.monotonic()
+                self._pending.notify()
+            return self._written_sequence
+
+    def sync(self, sequence: int) -> None:
+        """Block until the record with the given sequence number is durable."""
+        if self.durability != "batched":
+            return
+
+        with self._lock:
+            while self._synced_sequence < sequence and not self._closed:
+                self._synced.wait()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            if self.durability != "none":
+                self._fsync()
+            self._synced_sequence = self._written_sequence
+            self._closed = True
+            self._pending.notify_all()
+            self._synced.notify_all()
+
+        if self._sync_thread is not None:
+            self._sync_thread.join()
+        self._file.close()
+
+    def _fsync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _group_commit_loop(self) -> None:
+        while True:
+            with self._lock:
+                while (
+                    self._written_sequence == self._synced_sequence and not self._closed
+                ):
+                    self._pending.wait()
+                if self._closed:
+                    return
+
+                deadline = self._first_pending_at + self.group_commit_interval
+                while not self._closed:
+                    pending = self._written_sequence - self._synced_sequence
+                    remaining = deadline - time.monotonic()
+                    if pending >= self.group_commit_max_records or remaining <= 0:
+                        break
+                    self._pending.wait(remaining)
+                if self._closed:
+                    return
+
+                # Move the buffered records to the OS while holding the lock, then
+                # fsync without it so writers can keep appending to the next batch.
+                self._file.flush()
+                target = self._written_sequence
+                fileno = self._file.fileno()
+
+            os.fsync(fileno)
+
+            with self._lock:
+                self._synced_sequence = max(self._synced_sequence, target)
+                self._synced.notify_all()
@@ -0,0 +1,64 @@
+from functools import lru_cache
+from typing import Any, Callable, Sequence
+
+# The separator between the fields of a data.csv line.
+FIELD_SEPARATOR = ", "
+
+
+class RowCodec:
+    """
+    Converts the rows of a table with the given column dtypes to and from
+    data.csv lines. Each function is generated once for the dtypes, with one
+    expression per column, so converting a row is a single call that does not
+    loop over or zip the dtypes.
+
+        cast: a sequence of values to a tuple of the column types.
+        decode: a line of data.csv to a tuple of the column types.
+        encode: a row of the column types to a line of data.csv, as bytes.
+
+    cast and decode raise ValueError if there are too few or too many values,
+    or if a value can't be cast to the type of its column.
+
+    Build them with row_codec, which reuses the codec of tables with the same
+    dtypes.
+    """
+
+    def __init__(self, dtypes: tuple[type, ...]) -> None:
+        self.dtypes = dtypes
+        namespace: dict[str, Any] = {
+            f"_dtype_{i}": dtype for i, dtype in enumerate(dtypes)
+        }
+        # A trailing comma so a single column still unpacks and builds a tuple.
+        names = "".join(f"_{i}, " for i in range(len(dtypes)))
+        casts = "".join(f"_dtype_{i}(_{i}), " for i in range(len(dtypes)))
+        # Every field of a line is already a str, so str columns are not cast.
+        field_casts = "".join(
+            f"_{i}, " if dtype is str else f"_dtype_{i}(_{i}), "
+            for i, dtype in enumerate(dtypes)
+        )
+        line = FIELD_SEPARATOR.join(f"{{_{i}}}" for i in range(len(dtypes)))
+        exec(
+            f"def cast(row):\n"
+            f"    {names} = row\n"
+            f"    return ({casts})\n"
+            f"def decode(line):\n"
+            f"    {names} = line.strip().split({FIELD_SEPARATOR!r})\n"
+            f"    return ({field_casts})\n"
+            f"def encode(row):\n"
+            f"    {names} = row\n"
+            f"    return f{line + chr(10)!r}.encode()\n",
+            namespace,
+        )
+        self.cast: Callable[[Sequence[Any]], tuple[Any, ...]] = namespace["cast"]
+        self.decode: Callable[[str], tuple[Any, ...]] = namespace["decode"]
+        self.encode: Callable[[Sequence[Any]], bytes] = namespace["encode"]
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # The generated functions can't be pickled, i.e. to send a table to a
+        # worker process, so the codec is rebuilt from its dtypes instead.
+        return row_codec, (self.dtypes,)
+
+
+@lru_cache(maxsize=None)
+def row_codec(dtypes: tuple[type, ...]) -> RowCodec:
+    return RowCodec(dtypes)
@@ -0,0 +1,239 @@
+import os
+from pathlib import Path
+from typing import Any, Iterable, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from sandb.tables.metadata import Column, TableMetadata
+
+INT64 = np.dtype("<i8")
+INT64_MIN, INT64_MAX = np.iinfo(INT64).min, np.iinfo(INT64).max
+# Strings are compared this many candidate rows at a time, to bound the size
+# of the window gathered from the data file.
+STR_COMPARE_CHUNK = 65_536
+
+
+def create(table: TableMetadata) -> None:
+    """
+    Columnar tables keep each column in its own files under <table>/columns,
+    so a filter only reads the column it filters on.
+
+        int columns: <column>.i64, every value as a little endian int64.
+        str columns: <column>.offsets, the end offset of every value as a
+            little endian int64, and <column>.data, the utf-8 encoded values
+            back to back. Value i runs from the end of value i - 1 (or 0) to
+            its own end offset.
+
+    Row i of the table is value i of every column.
+    """
+    table.columns_path().mkdir()
+    for column in table.columns:
+        for path in _column_files(table, column):
+            path.touch()
+
+
+def append_rows(rows: Sequence[Sequence[Any]], table: TableMetadata) -> None:
+    """
+    Append validated rows to every column. Columns are written one after the
+    other, so a crash can leave some columns a few rows longer than others.
+    Those rows never count towards row_count and are truncated away here
+    before the next append.
+
+    Raises OverflowError, before writing anything, if an int does not fit in
+    an int64.
+    """
+    for position, column in enumerate(table.columns):
+        if column.dtype is int and any(
+            not INT64_MIN <= row[position] <= INT64_MAX for row in rows
+        ):
+            raise OverflowError(f"Column {column.name} only holds 64 bit ints.")
+
+    num_rows = row_count(table)
+    for position, column in enumerate(table.columns):
+        values = [row[position] for row in rows]
+        if column.dtype is int:
+            _append_ints(_int_path(table, column), values, num_rows)
+        else:
+            _append_strs(table, column, values, num_rows)
+
+
+def row_count(table: TableMetadata) -> int:
+    """The number of rows that have been written to every column."""
+    return min(
+        _column_files(table, column)[0].stat().st_size // int(INT64.itemsize)
+        for column in table.columns
+    )
+
+
+def filter_equal(
+    column_to_query: str,
+    predicate: Any,
+    table: TableMetadata,
+    start: int = 0,
+    stop: int | None = None,
+) -> npt.NDArray[np.int64]:
+    """
+    Return the row numbers from start up to stop (or the last row) where
+    column_to_query == predicate, in order. Only the files of that column are
+    read, only for those rows, and the comparison is a NumPy mask.
+    """
+    column = table.columns[table.col_names.index(column_to_query)]
+    stop = row_count(table) if stop is None else stop
+    if start >= stop:
+        return np.empty(0, dtype=INT64)
+
+    if column.dtype is int:
+        # Anything other than a number can never be equal to an int.
+        if not isinstance(predicate, (int, float)):
+            return np.empty(0, dtype=INT64)
+        values = _read_int64s(_int_path(table, column), start, stop)
+        return start + np.flatnonzero(values == predicate)
+
+    if not isinstance(predicate, str):
+        return np.empty(0, dtype=INT64)
+    target = np.frombuffer(predicate.encode(), dtype=np.uint8)
+    bounds = _str_bounds(table, column, start, stop)
+    starts, ends = bounds[:-1], bounds[1:]
+    # Only values of the same length can match, and only those are gathered
+    # from the data file and compared byte by byte.
+    candidates = np.flatnonzero(ends - starts == len(target))
+    if not len(target) or not len(candidates):
+        return start + candidates
+
+    data = np.memmap(_data_path(table, column), dtype=np.uint8, mode="r")
+    window = np.arange(len(target))
+    matches = []
+    for chunk_start in range(0, len(candidates), STR_COMPARE_CHUNK):
+        chunk = candidates[chunk_start : chunk_start + STR_COMPARE_CHUNK]
+        gathered = data[starts[chunk, None] + window]
+        matches.append(chunk[(gathered == target).all(axis=1)])
+    return start + np.concatenate(matches)
+
+
+def read_column(
+    column_name: str, table: TableMetadata, start: int, stop: int
+) -> npt.NDArray[Any]:
+    """
+    The values of one column from row start up to stop, as an int64 array or
+    an object array of str.
+    """
+    column = table.columns[table.col_names.index(column_name)]
+    if column.dtype is int:
+        return _read_int64s(_int_path(table, column), start, stop)
+
+    bounds = _str_bounds(table, column, start, stop)
+    with open(_data_path(table, column), "rb") as f:
+        f.seek(bounds[0])
+        data = f.read(bounds[-1] - bounds[0])
+    relative = (bounds - bounds[0]).tolist()
+    values = np.empty(stop - start, dtype=object)
+    values[:] = [
+        data[value_start:value_end].decode()
+        for value_start, value_end in zip(relative, relative[1:])
+    ]
+    return values
+
+
+def read_rows(
+    row_numbers: npt.NDArray[np.int64],
+    table: TableMetadata,
+    columns: Sequence[str] | None = None,
+) -> list[tuple[Any, ...]]:
+    """
+    Gather the rows with the given row numbers from every column, or only
+    from columns, in that order, if given.
+    """
+    if not len(row_numbers):
+        return []
+    if columns is None:
+        columns = table.col_names
+    return list(
+        zip(
+            *(
+                _gather(table, table.columns[table.col_names.index(name)], row_numbers)
+                for name in columns
+            )
+        )
+    )
+
+
+def _gather(
+    table: TableMetadata, column: Column, row_numbers: npt.NDArray[np.int64]
+) -> list[Any]:
+    if column.dtype is int:
+        values = np.memmap(_int_path(table, column), dtype=INT64, mode="r")
+        return values[row_numbers].tolist()  # type: ignore
+
+    offsets = np.memmap(_offsets_path(table, column), dtype=INT64, mode="r")
+    ends = offsets[row_numbers]
+    starts = np.where(row_numbers > 0, offsets[np.maximum(row_numbers - 1, 0)], 0)
+    with open(_data_path(table, column), "rb") as f:
+        out = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            f.seek(start)
+            out.append(f.read(end - start).decode())
+    return out
+
+
+def _str_bounds(
+    table: TableMetadata, column: Column, start: int, stop: int
+) -> npt.NDArray[np.int64]:
+    """Offsets in the data file where the values start, then where the last ends."""
+    # Each value starts where the one before it ends.
+    if start:
+        return _read_int64s(_offsets_path(table, column), start - 1, stop)
+    return np.concatenate(([0], _read_int64s(_offsets_path(table, column), 0, stop)))
+
+
+def _read_int64s(path: Path, start: int, stop: int) -> npt.NDArray[np.int64]:
+    return np.fromfile(
+        path, dtype=INT64, count=stop - start, offset=start * INT64.itemsize
+    )
+
+
+def _append_ints(path: Path, values: Iterable[int], num_rows: int) -> None:
+    os.truncate(path, num_rows * INT64.itemsize)
+    with open(path, "ab") as f:
+        f.write(np.array(list(values), dtype=INT64).tobytes())
+
+
+def _append_strs(
+    table: TableMetadata, column: Column, values: Iterable[str], num_rows: int
+) -> None:
+    offsets_path = _offsets_path(table, column)
+    data_path = _data_path(table, column)
+    os.truncate(offsets_path, num_rows * INT64.itemsize)
+    data_end = 0
+    if num_rows:
+        with open(offsets_path, "rb") as f:
+            f.seek(-INT64.itemsize, os.SEEK_END)
+            data_end = int(np.frombuffer(f.read(INT64.itemsize), dtype=INT64)[0])
+    os.truncate(data_path, data_end)
+
+    encoded = [value.encode() for value in values]
+    ends = data_end + np.cumsum([len(value) for value in encoded], dtype=INT64)
+    # The data goes first so an offset never points past the end of it.
+    with open(data_path, "ab") as f:
+        f.write(b"".join(encoded))
+    with open(offsets_path, "ab") as f:
+        f.write(ends.tobytes())
+
+
+def _column_files(table: TableMetadata, column: Column) -> tuple[Path, ...]:
+    """The first file holds an int64 for every row."""
+    if column.dtype is int:
+        return (_int_path(table, column),)
+    return _offsets_path(table, column), _data_path(table, column)
+
+
+def _int_path(table: TableMetadata, column: Column) -> Path:
+    return table.columns_path() / f"{column.name}.i64"
+
+
+def _offsets_path(table: TableMetadata, column: Column) -> Path:
+    return table.columns_path() / f"{column.name}.offsets"
+
+
+def _data_path(table: TableMetadata, column: Column) -> Path:
+    return table.columns_path() / f"{column.name}.data"
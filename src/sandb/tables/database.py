@@ -0,0 +1,140 @@
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator, Sequence
+
+from sandb.tables import predicates, table
+from sandb.tables.metadata import STORAGE_LAYOUT, Column, TableMetadata
+
+
+class Database:
+    """
+    A catalog of the tables in one folder, which is created if it does not
+    exist. The metadata.json of every table is loaded once, when the
+    database is opened, and the handles it hands out keep their
+    TableMetadata, with its cached dtypes and codec, and their files open,
+    so reading and writing through them skips the setup the functions in
+    sandb.tables.table redo on every call.
+
+    Tables created or changed through the table functions directly, rather
+    than through a Database, are not picked up by a database that is
+    already open.
+    """
+
+    def __init__(self, location: Path) -> None:
+        location.mkdir(parents=True, exist_ok=True)
+        self.location = location
+        self._tables: dict[str, TableMetadata] = {}
+        self._handles: dict[str, TableHandle] = {}
+        for metadata_path in sorted(location.glob("*/metadata.json")):
+            # The folder is where the table is now, even if the database has
+            # been moved since the table was created.
+            metadata = TableMetadata.load(metadata_path).model_copy(
+                update={"location": location}
+            )
+            self._tables[metadata.name] = metadata
+
+    def create_table(
+        self,
+        name: str,
+        columns: Sequence[Column],
+        storage: STORAGE_LAYOUT = "row",
+        indexes: Sequence[str] = (),
+        primary_key: str | None = None,
+    ) -> "TableHandle":
+        """
+        Create a table in the database, see sandb.tables.table.create.
+
+        Raises:
+            TableExistsError: If the database already has a table called name.
+        """
+        metadata = TableMetadata(
+            name=name,
+            columns=tuple(columns),
+            location=self.location,
+            indexes=tuple(indexes),
+            storage=storage,
+            primary_key=primary_key,
+        )
+        table.create(metadata)
+        self._tables[name] = metadata
+        return self.table(name)
+
+    def table(self, name: str) -> "TableHandle":
+        """
+        The handle of the table called name, the same one every time until
+        the database is closed.
+
+        Raises:
+            KeyError: If there is no table called name.
+        """
+        handle = self._handles.get(name)
+        if handle is None:
+            handle = TableHandle(self._tables[name])
+            self._handles[name] = handle
+        return handle
+
+    def table_names(self) -> list[str]:
+        return sorted(self._tables)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tables
+
+    def close(self) -> None:
+        """Close the files of every table handle handed out."""
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
+
+
+class TableHandle:
+    """
+    One table of a Database. Its methods are the functions of
+    sandb.tables.table with the table filled in. Row tables append through
+    data.csv opened once, unbuffered so every written row can be read
+    straight away.
+    """
+
+    def __init__(self, metadata: TableMetadata) -> None:
+        self.metadata = metadata
+        self._data_file: BinaryIO | None = None
+
+    def write(self, row: Sequence[Any]) -> None:
+        if self._data_file is None and self.metadata.storage == "row":
+            self._data_file = open(self.metadata.data_path(), "ab", buffering=0)
+        table.write(row, self.metadata, self._data_file)
+
+    def write_many(
+        self, rows: Iterable[Sequence[Any]], batch_size: int = table.WRITE_BATCH_ROWS
+    ) -> int:
+        return table.write_many(rows, self.metadata, batch_size)
+
+    def read(
+        self, column_to_query: str, predicate: Any, workers: int = 1
+    ) -> list[tuple[Any, ...]]:
+        return table.read(column_to_query, predicate, self.metadata, workers)
+
+    def scan(
+        self,
+        column_to_query: str,
+        predicate: Any,
+        limit: int | None = None,
+        workers: int = 1,
+    ) -> Iterator[tuple[Any, ...]]:
+        return table.scan(column_to_query, predicate, self.metadata, limit, workers)
+
+    def select(
+        self,
+        where: predicates.Expression | None = None,
+        columns: Sequence[str] | None = None,
+        limit: int | None = None,
+    ) -> Iterator[tuple[Any, ...]]:
+        return table.select(self.metadata, where, columns, limit)
+
+    def iter_rows(self, limit: int | None = None) -> Iterator[tuple[Any, ...]]:
+        return table.iter_rows(self.metadata, limit)
+
+    def close(self) -> None:
+        """Close data.csv, if open, and the indexes and engine of the table."""
+        if self._data_file is not None:
+            self._data_file.close()
+            self._data_file = None
+        table.close(self.metadata)
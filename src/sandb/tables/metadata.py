@@ -1,12 +1,25 @@
+import json
 from functools import cached_property
 from pathlib import Path
-from typing import Literal, Mapping, Type, Union, get_args
-
-from pydantic import BaseModel, ConfigDict, Field, field_serializer
+from typing import Any, Literal, Mapping, Self, Type, Union, get_args
+
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    field_serializer,
+    field_validator,
+    model_validator,
+)
 
-from sandb.indexes.abc import Index
+from sandb.tables.codec import RowCodec, row_codec
 
 VALID_DTYPE_ALIAS = Literal[0, 1]
+# row: every row is a line of data.csv. columnar: see sandb.tables.columnar.
+# lsm and hash: every row is the value of its primary key in an LSMTree or a
+# HashIndexDB.
+STORAGE_LAYOUT = Literal["row", "columnar", "lsm", "hash"]
+ENGINE_STORAGE_LAYOUTS = ("lsm", "hash")
 VALID_DTYPE = Union[str, int]
 
 VALID_DTYPE_MAPPING: Mapping[VALID_DTYPE, VALID_DTYPE_ALIAS] = dict(
@@ -42,10 +55,22 @@ class Column(BaseModel):
         """
         return VALID_DTYPE_MAPPING[dtype]
 
+    @field_validator("dtype", mode="before")
+    @classmethod
+    def deserialize_dtype(cls, dtype: Any) -> Any:
+        """Turn the integer alias a dtype is saved as back into the dtype."""
+        if isinstance(dtype, int):
+            return REVERSE_DTYPE_MAPPING.get(dtype, dtype)  # type: ignore
+        return dtype
+
 
 class TableMetadata(BaseModel):
     """
     Holds metadata about a given table.
+    indexes holds the names of the columns with a secondary index and storage
+    how the rows are laid out on disk. Tables stored in an lsm or hash
+    storage engine need a primary_key column, the key their rows are stored
+    under, and only those tables have one.
     """
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -53,7 +78,57 @@ class TableMetadata(BaseModel):
     name: str
     columns: tuple[Column, ...]
     location: Path
-    indexes: None | tuple[Index, ...] = Field(default=None)
+    indexes: tuple[str, ...] = Field(default=())
+    storage: STORAGE_LAYOUT = "row"
+    primary_key: str | None = None
+
+    @model_validator(mode="after")
+    def check_indexes_are_columns(self) -> "TableMetadata":
+        for column in self.indexes:
+            if column not in self.col_names:
+                raise ValueError(f"Can't index {column}, it is not a column.")
+        return self
+
+    @model_validator(mode="after")
+    def check_primary_key(self) -> "TableMetadata":
+        if self.storage in ENGINE_STORAGE_LAYOUTS:
+            if self.primary_key not in self.col_names:
+                raise ValueError(
+                    f"{self.storage} tables need a primary key column. "
+                    f"Got {self.primary_key}"
+                )
+            if self.indexes:
+                raise ValueError(f"{self.storage} tables can't have secondary indexes.")
+        elif self.primary_key is not None:
+            raise ValueError(f"{self.storage} tables don't have a primary key.")
+        return self
+
+    @classmethod
+    def load(cls, path: Path) -> "TableMetadata":
+        """
+        Load the metadata.json at path. Tables created before it was saved
+        as a JSON object hold the same JSON encoded again as a string.
+        """
+        with open(path) as f:
+            saved = json.load(f)
+        if isinstance(saved, str):
+            saved = json.loads(saved)
+        return cls.model_validate(saved)
+
+    def model_copy(
+        self, *, update: Mapping[str, Any] | None = None, deep: bool = False
+    ) -> Self:
+        """
+        pydantic copies the instance dict as it is, cached properties
+        included, so those worked out from the old fields are dropped from a
+        copy with new ones, to be worked out again from them.
+        """
+        copy = super().model_copy(update=update, deep=deep)
+        if update:
+            for name, attribute in vars(TableMetadata).items():
+                if isinstance(attribute, cached_property):
+                    copy.__dict__.pop(name, None)
+        return copy
 
     @cached_property
     def dtypes(self) -> tuple[Type[VALID_DTYPE], ...]:
@@ -63,8 +138,42 @@ class TableMetadata(BaseModel):
     def col_names(self) -> tuple[str, ...]:
         return tuple(column.name for column in self.columns)
 
+    @cached_property
+    def codec(self) -> RowCodec:
+        return row_codec(self.dtypes)
+
+    # Paths are built once per table, as joining them costs more than a
+    # small query does otherwise.
+    @cached_property
+    def _paths(self) -> dict[str, Path]:
+        table_path = self.location / self.name
+        return {
+            "metadata": table_path / "metadata.json",
+            "data": table_path / "data.csv",
+            "zone_map": table_path / "zones.jsonl",
+            "columns": table_path / "columns",
+            "engine": table_path / "engine",
+            "indexes": table_path / "indexes",
+        }
+
+    @cached_property
+    def _index_paths(self) -> dict[str, Path]:
+        return {column: self._paths["indexes"] / column for column in self.indexes}
+
     def metadata_path(self) -> Path:
-        return self.location / self.name / "metadata.json"
+        return self._paths["metadata"]
 
     def data_path(self) -> Path:
-        return self.location / self.name / "data.csv"
+        return self._paths["data"]
+
+    def zone_map_path(self) -> Path:
+        return self._paths["zone_map"]
+
+    def columns_path(self) -> Path:
+        return self._paths["columns"]
+
+    def engine_path(self) -> Path:
+        return self._paths["engine"]
+
+    def index_path(self, column: str) -> Path:
+        return self._index_paths[column]
@@ -0,0 +1,259 @@
+import operator
+from dataclasses import dataclass
+from typing import Any, Callable, Literal, Mapping, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from sandb.tables.metadata import TableMetadata
+from sandb.tables.zone_map import Zone, ZoneFilter
+
+COMPARISON_OPERATOR = Literal["==", "!=", "<", "<=", ">", ">="]
+
+OPERATORS: Mapping[COMPARISON_OPERATOR, Callable[[Any, Any], Any]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+# Compiled row filters and projections take the fields of a data.csv line,
+# still as strings.
+RowFilter = Callable[[Sequence[str]], bool]
+RowProjection = Callable[[Sequence[str]], tuple[Any, ...]]
+
+
+class Expression:
+    """
+    Base of the predicates tables can be filtered by. Combine them with
+    & (and), | (or) and ~ (not), e.g.
+
+        (Comparison("age", ">=", 18) & In("country", ("SE", "CY"))) | ~Between(...)
+    """
+
+    def __and__(self, other: "Expression") -> "And":
+        return And(self, other)
+
+    def __or__(self, other: "Expression") -> "Or":
+        return Or(self, other)
+
+    def __invert__(self) -> "Not":
+        return Not(self)
+
+
+@dataclass(frozen=True)
+class Comparison(Expression):
+    column: str
+    op: COMPARISON_OPERATOR
+    value: Any
+
+
+@dataclass(frozen=True)
+class In(Expression):
+    column: str
+    values: tuple[Any, ...]
+
+
+@dataclass(frozen=True)
+class Between(Expression):
+    """low <= column <= high, inclusive at both ends like SQL's BETWEEN."""
+
+    column: str
+    low: Any
+    high: Any
+
+
+@dataclass(frozen=True)
+class And(Expression):
+    left: Expression
+    right: Expression
+
+
+@dataclass(frozen=True)
+class Or(Expression):
+    left: Expression
+    right: Expression
+
+
+@dataclass(frozen=True)
+class Not(Expression):
+    operand: Expression
+
+
+def check(expression: Expression, table: TableMetadata) -> None:
+    """
+    Raise ValueError for columns that are not in table or unknown operators,
+    and TypeError for values that can't be compared to their column.
+    """
+    if isinstance(expression, (And, Or)):
+        check(expression.left, table)
+        check(expression.right, table)
+    elif isinstance(expression, Not):
+        check(expression.operand, table)
+    elif isinstance(expression, Comparison):
+        if expression.op not in OPERATORS:
+            raise ValueError(f"Unknown comparison operator {expression.op}")
+        _check_values(expression.column, [expression.value], table)
+    elif isinstance(expression, In):
+        _check_values(expression.column, expression.values, table)
+    elif isinstance(expression, Between):
+        _check_values(expression.column, [expression.low, expression.high], table)
+    else:
+        raise TypeError(f"{expression!r} is not a predicate.")
+
+
+def compile_row_filter(expression: Expression, table: TableMetadata) -> RowFilter:
+    """
+    Compile expression into one Python function over the fields of a data.csv
+    line, so nothing is interpreted per row. Only the columns the expression
+    uses are cast, each where it is compared, and and/or short-circuit.
+    """
+    check(expression, table)
+    namespace: dict[str, Any] = {}
+    source = _row_source(expression, table, namespace)
+    return eval(f"lambda fields: {source}", namespace)  # type: ignore
+
+
+def compile_projection(columns: Sequence[str], table: TableMetadata) -> RowProjection:
+    """Compile a function casting just columns of a data.csv line, in order."""
+    namespace: dict[str, Any] = {}
+    fields = "".join(
+        f"{_field_source(column, table, namespace)}, " for column in columns
+    )
+    return eval(f"lambda fields: ({fields})", namespace)  # type: ignore
+
+
+def zone_may_match(expression: Expression, table: TableMetadata) -> ZoneFilter:
+    """
+    Compile expression into a function of a zone of data.csv that is False
+    only if none of its rows can match, going by the smallest and largest
+    value of each column in the zone. Not can never rule a zone out, as that
+    would take knowing every value in it.
+    """
+    check(expression, table)
+    return _zone_filter(expression, table)
+
+
+def evaluate_mask(
+    expression: Expression, load_column: Callable[[str], npt.NDArray[Any]]
+) -> npt.NDArray[np.bool_]:
+    """
+    Evaluate expression over whole arrays of column values at once. Each
+    column is loaded the first time it is needed, and the right hand side of
+    and/or is not evaluated at all when the left hand side decides it.
+    """
+    columns: dict[str, npt.NDArray[Any]] = {}
+
+    def column_values(column: str) -> npt.NDArray[Any]:
+        if column not in columns:
+            columns[column] = load_column(column)
+        return columns[column]
+
+    def evaluate(expression: Expression) -> npt.NDArray[np.bool_]:
+        if isinstance(expression, And):
+            left = evaluate(expression.left)
+            return left & evaluate(expression.right) if left.any() else left
+        if isinstance(expression, Or):
+            left = evaluate(expression.left)
+            return left | evaluate(expression.right) if not left.all() else left
+        if isinstance(expression, Not):
+            return ~evaluate(expression.operand)
+        if isinstance(expression, Comparison):
+            values = column_values(expression.column)
+            return np.asarray(OPERATORS[expression.op](values, expression.value))
+        if isinstance(expression, In):
+            return np.isin(column_values(expression.column), list(expression.values))
+        if isinstance(expression, Between):
+            values = column_values(expression.column)
+            return (values >= expression.low) & (values <= expression.high)
+        raise TypeError(f"{expression!r} is not a predicate.")
+
+    return evaluate(expression)
+
+
+def _check_values(column: str, values: Sequence[Any], table: TableMetadata) -> None:
+    try:
+        dtype = table.dtypes[table.col_names.index(column)]
+    except ValueError as e:
+        raise ValueError(f"{column} not in {table}") from e
+
+    allowed = (int, float) if dtype is int else (dtype,)
+    for value in values:
+        if not isinstance(value, allowed):
+            raise TypeError(f"Can't compare {column} of type {dtype} to {value!r}")
+
+
+def _row_source(
+    expression: Expression, table: TableMetadata, namespace: dict[str, Any]
+) -> str:
+    if isinstance(expression, And):
+        left = _row_source(expression.left, table, namespace)
+        return f"({left} and {_row_source(expression.right, table, namespace)})"
+    if isinstance(expression, Or):
+        left = _row_source(expression.left, table, namespace)
+        return f"({left} or {_row_source(expression.right, table, namespace)})"
+    if isinstance(expression, Not):
+        return f"(not {_row_source(expression.operand, table, namespace)})"
+
+    # Values are passed in through the namespace rather than written into the
+    # source, so any value is safe to compile.
+    field = _field_source(expression.column, table, namespace)  # type: ignore
+    if isinstance(expression, Comparison):
+        value = _bind(expression.value, namespace)
+        return f"({field} {expression.op} {value})"
+    if isinstance(expression, In):
+        return f"({field} in {_bind(frozenset(expression.values), namespace)})"
+    if isinstance(expression, Between):
+        low = _bind(expression.low, namespace)
+        return f"({low} <= {field} <= {_bind(expression.high, namespace)})"
+    raise TypeError(f"{expression!r} is not a predicate.")
+
+
+def _zone_filter(expression: Expression, table: TableMetadata) -> ZoneFilter:
+    if isinstance(expression, (And, Or)):
+        left = _zone_filter(expression.left, table)
+        right = _zone_filter(expression.right, table)
+        if isinstance(expression, And):
+            return lambda zone: left(zone) and right(zone)
+        return lambda zone: left(zone) or right(zone)
+    if isinstance(expression, Not):
+        return lambda zone: True
+
+    position = table.col_names.index(expression.column)  # type: ignore
+    if isinstance(expression, Comparison):
+        value, op = expression.value, expression.op
+        in_range: Callable[[Zone], bool] = {
+            "==": lambda zone: zone.mins[position] <= value <= zone.maxes[position],
+            "!=": lambda zone: not zone.mins[position] == zone.maxes[position] == value,
+            "<": lambda zone: zone.mins[position] < value,
+            "<=": lambda zone: zone.mins[position] <= value,
+            ">": lambda zone: zone.maxes[position] > value,
+            ">=": lambda zone: zone.maxes[position] >= value,
+        }[op]
+        return in_range
+    if isinstance(expression, In):
+        values = expression.values
+        return lambda zone: any(
+            zone.mins[position] <= value <= zone.maxes[position] for value in values
+        )
+    if isinstance(expression, Between):
+        low, high = expression.low, expression.high
+        return lambda zone: zone.mins[position] <= high and low <= zone.maxes[position]
+    raise TypeError(f"{expression!r} is not a predicate.")
+
+
+def _field_source(column: str, table: TableMetadata, namespace: dict[str, Any]) -> str:
+    position = table.col_names.index(column)
+    dtype = table.dtypes[position]
+    # Fields are already strings so str columns need no cast.
+    if dtype is str:
+        return f"fields[{position}]"
+    return f"{_bind(dtype, namespace)}(fields[{position}])"
+
+
+def _bind(value: Any, namespace: dict[str, Any]) -> str:
+    name = f"_{len(namespace)}"
+    namespace[name] = value
+    return name
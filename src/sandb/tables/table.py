@@ -1,7 +1,43 @@
-import json
-from typing import Any, Sequence
+import atexit
+import csv
+import math
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator, Sequence, cast
 
-from sandb.tables.metadata import TableMetadata
+import numpy as np
+
+from sandb.indexes.hash_index import HashIndexDB
+from sandb.indexes.lsm_tree import LSMTree
+from sandb.tables import columnar, predicates, zone_map
+from sandb.tables.metadata import ENGINE_STORAGE_LAYOUTS, TableMetadata
+
+INDEX_MEMTABLE_SIZE = 10_000
+ENGINE_MEMTABLE_SIZE = 10_000
+# data.csv is read this many bytes at a time, and columnar tables and index
+# lookups this many rows at a time, so memory use does not grow with the table.
+READ_BUFFER_SIZE = 1024 * 1024
+READ_CHUNK_ROWS = 65_536
+# write_many validates and appends this many rows at a time, through a buffer
+# of WRITE_BUFFER_SIZE bytes.
+WRITE_BATCH_ROWS = 10_000
+WRITE_BUFFER_SIZE = 1024 * 1024
+# Parallel scans split data.csv into this many byte ranges per worker, so a
+# worker that finishes early picks up another range.
+RANGES_PER_WORKER = 4
+
+# Secondary indexes and the storage engines of lsm and hash tables are kept
+# open between calls, keyed by their folder, and closed when the process exits.
+_open_indexes: dict[Path, LSMTree] = {}
+_open_engines: dict[Path, LSMTree | HashIndexDB] = {}
+# How far each open index covers its table, as a byte offset into data.csv or
+# a row count of a columnar table. Saved to the indexed_up_to file in the
+# folder of the index when it is closed, so the rows written after that, by
+# a process that never closed it, can be indexed when it is opened again.
+_indexed_up_to: dict[Path, int] = {}
 
 
 class TableExistsError(Exception):
@@ -21,7 +57,9 @@ def create(metadata: TableMetadata) -> None:
     the metadata TableMetadata object and tell us how to access the other file.
     The other file is called data.csv. It is a csv that we can get the type info
     for from the metadata file. Each row in the csv will correspond to a row in
-    the table.
+    the table. Tables with columnar storage have a columns folder instead of
+    data.csv, see columnar.create, and lsm and hash tables an engine folder
+    holding the LSMTree or HashIndexDB their rows are stored in.
 
     Args:
         metadata (TableMetadata): Contains all the metadata for the given table.
@@ -39,13 +77,20 @@ def create(metadata: TableMetadata) -> None:
         raise TableExistsError(f"Table already exists at location: {metadata.location}")
 
     table_path.mkdir()
-    data_path.touch()
+    if metadata.storage == "columnar":
+        columnar.create(metadata)
+    elif metadata.storage in ENGINE_STORAGE_LAYOUTS:
+        metadata.engine_path().mkdir()
+    else:
+        data_path.touch()
 
     with open(metadata_path, "w") as f:
-        json.dump(metadata.model_dump_json(), f)
+        f.write(metadata.model_dump_json())
 
 
-def write(row: Sequence[Any], table: TableMetadata) -> None:
+def write(
+    row: Sequence[Any], table: TableMetadata, data_file: BinaryIO | None = None
+) -> None:
     """
     Take a row of arbitrary data, ensure it has the correct shape and types,
     then save to file
@@ -54,19 +99,138 @@ def write(row: Sequence[Any], table: TableMetadata) -> None:
         row (tuple[Any, ...]): arbitrary tuple which we are trying to save
                                to the database
         table (TableMetadata): table metadata for the row we are trying to save.
+        data_file: data.csv of a row table already open for unbuffered
+                   appending, to write through instead of opening it.
 
     Raises:
         e: _description_
     """
-    if validate_and_cast_row(row, table):
-        with open(table.data_path(), "a") as f:
-            row_string = ", ".join(map(str, row))
-            f.write(row_string + "\n")
+    typed_row = validate_and_cast_row(row, table)
+    if typed_row and table.storage in ENGINE_STORAGE_LAYOUTS:
+        # Replaces the row with the same primary key, if there is one.
+        _engine(table).write(*_engine_item(typed_row, table))
+
+    elif typed_row and table.storage == "columnar":
+        # Index entries point at the row number the row is about to get.
+        num_rows = columnar.row_count(table)
+        _index_row(typed_row, num_rows, table)
+        try:
+            columnar.append_rows([typed_row], table)
+        except OverflowError as e:
+            raise RowTypeError(f"Failed to write row {row}.", row) from e
+        _advance_indexed_up_to(table, num_rows, num_rows + 1)
+
+    elif typed_row and data_file is not None:
+        _append_row(typed_row, data_file, table)
+
+    elif typed_row:
+        with open(table.data_path(), "ab") as f:
+            _append_row(typed_row, f, table)
 
     else:
         raise RowTypeError(f"Failed to write row {row} due to type mismatch.", row)
 
 
+def write_many(
+    rows: Iterable[Sequence[Any]],
+    table: TableMetadata,
+    batch_size: int = WRITE_BATCH_ROWS,
+) -> int:
+    """
+    Write many rows at once, for bulk loads. Rows are validated and cast a
+    batch of batch_size at a time, a column at a time, and appended through a
+    single buffered file handle along with one index write per batch, rather
+    than opening the table and every index once per row as write does.
+
+    Every batch is validated before any of it is written, so if a row is
+    invalid the batches before it have been written and the rest have not.
+
+    Args:
+        rows (Iterable[Sequence[Any]]): rows to write, consumed lazily.
+        table (TableMetadata): table to write them to.
+        batch_size (int): number of rows validated and written together.
+
+    Returns:
+        int: the number of rows written.
+
+    Raises:
+        RowTypeError: If a row has the wrong length or types.
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1. Got {batch_size}")
+    indexes = [
+        (table.col_names.index(column), _index(table, column))
+        for column in table.indexes
+    ]
+    rows_iter = iter(rows)
+    batches = iter(lambda: list(islice(rows_iter, batch_size)), [])
+    written = 0
+
+    if table.storage in ENGINE_STORAGE_LAYOUTS:
+        engine = _engine(table)
+        for batch in batches:
+            typed_rows = validate_and_cast_rows(batch, table)
+            engine.write_batch(_engine_item(row, table) for row in typed_rows)
+            written += len(batch)
+        return written
+
+    if table.storage == "columnar":
+        for batch in batches:
+            typed_rows = validate_and_cast_rows(batch, table)
+            num_rows = columnar.row_count(table)
+            _write_index_entries(
+                indexes, list(zip(typed_rows, range(num_rows, num_rows + len(batch))))
+            )
+            try:
+                columnar.append_rows(typed_rows, table)
+            except OverflowError as e:
+                raise RowTypeError(f"Failed to write rows to {table.name}.") from e
+            _advance_indexed_up_to(table, num_rows, num_rows + len(batch))
+            written += len(batch)
+        return written
+
+    with open(table.data_path(), "ab", buffering=WRITE_BUFFER_SIZE) as f:
+        offset = f.tell()
+        for batch in batches:
+            typed_rows = validate_and_cast_rows(batch, table)
+            lines = list(map(table.codec.encode, typed_rows))
+            batch_start = offset
+            offsets = []
+            for line in lines:
+                offsets.append(offset)
+                offset += len(line)
+            # As in write, index entries go first and point at where the rows
+            # are about to be written.
+            _write_index_entries(indexes, list(zip(typed_rows, offsets)))
+            f.write(b"".join(lines))
+            # Zones may also need the rows before these, read back from disk.
+            f.flush()
+            _advance_indexed_up_to(table, batch_start, offset)
+            zone_map.update(table, offset, typed_rows, offsets)
+            written += len(batch)
+    return written
+
+
+def load_csv(
+    source: Path,
+    table: TableMetadata,
+    has_header: bool = False,
+    batch_size: int = WRITE_BATCH_ROWS,
+) -> int:
+    """
+    Bulk load the rows of a csv file with write_many, skipping its first line
+    if has_header. Fields may be separated by "," or ", " and quoted.
+
+    Returns:
+        int: the number of rows written.
+    """
+    with open(source, newline="") as f:
+        reader = csv.reader(f, skipinitialspace=True)
+        if has_header:
+            next(reader, None)
+        return write_many(reader, table, batch_size)
+
+
 def validate_and_cast_row(row: Sequence[Any], table: TableMetadata) -> tuple[Any, ...]:
     """
     Validate and cast the row's elements to their corresponding
@@ -82,25 +246,50 @@ def validate_and_cast_row(row: Sequence[Any], table: TableMetadata) -> tuple[Any
     Raises:
         RowTypeError: If the row's types or length don't match the table.
     """
+    try:
+        return table.codec.cast(row)
+    except ValueError as e:
+        error = e
+
     if len(row) != len(table.dtypes):
         raise RowTypeError(
             f"Row length {len(row)} doesn't match expected length {len(table.dtypes)}."
         )
+    raise RowTypeError(f"Type mismatch for row {row}.") from error
 
+
+def validate_and_cast_rows(
+    rows: Sequence[Sequence[Any]], table: TableMetadata
+) -> list[tuple[Any, ...]]:
+    """
+    validate_and_cast_row for many rows at once, casting them all with the
+    table's codec.
+
+    Raises:
+        RowTypeError: For the first row whose length or types don't match the
+                      table.
+    """
     try:
-        return tuple(
-            dtype(element) for dtype, element in zip(table.dtypes, row, strict=True)
-        )
-    except ValueError as e:
-        raise RowTypeError(f"Type mismatch for row {row}.") from e
+        return list(map(table.codec.cast, rows))
+    except ValueError:
+        # Find the row to report.
+        for row in rows:
+            validate_and_cast_row(row, table)
+        raise
 
 
 def read(
-    column_to_query: str, predicate: Any, table: TableMetadata
-) -> list[tuple[Any]]:
+    column_to_query: str, predicate: Any, table: TableMetadata, workers: int = 1
+) -> list[tuple[Any, ...]]:
     """
-    Currently just performs a full table scan reading row by row from the data.csv
-    file pointed to from TableMetadata.
+    If column_to_query has a secondary index only the rows it points to are
+    read, otherwise performs a full table scan reading row by row from the
+    data.csv file pointed to from TableMetadata. Columnar tables only read
+    column_to_query and compare it all at once, then read the matching rows.
+    On lsm and hash tables a query on the primary key is a single point read
+    from the storage engine, any other column scans every row in it. Full
+    scans of data.csv skip the zones whose smallest and largest value of
+    column_to_query show they can't hold predicate, see zone_map.
     Can only perform WHERE column_to_query == predicate. Will add more functionality
     in the future.
 
@@ -108,21 +297,507 @@ def read(
         column_to_query (str): Column to check
         predicate (Any): value to check column gainst
         table (TableMetadata): table to scan
+        workers (int): number of processes a full scan of data.csv is split
+                       across, see scan.
 
     Returns:
-        list[tuple[Any]]: a list of all rows that match the column_to_query == predicate
+        list[tuple[Any, ...]]: a list of all rows that match the
+                               column_to_query == predicate
+    """
+    return list(scan(column_to_query, predicate, table, workers=workers))
+
+
+def scan(
+    column_to_query: str,
+    predicate: Any,
+    table: TableMetadata,
+    limit: int | None = None,
+    workers: int = 1,
+) -> Iterator[tuple[Any, ...]]:
+    """
+    Lazily yield the rows read would return, in the same order, stopping after
+    limit rows if given. The table is read a chunk at a time as the rows are
+    consumed, so memory use does not depend on the size of the table, and
+    stopping early, or closing the iterator, stops reading.
+
+    With more than one worker a full scan of data.csv is split into newline
+    aligned byte ranges that are parsed and filtered by a pool of that many
+    processes, as parsing is CPU bound and holds the GIL. The matching rows
+    of each range are still yielded in file order, but every range is
+    scanned even if the iterator is closed early. Index lookups and tables
+    that are not stored in data.csv are not split.
+
+    Raises:
+        ValueError: If column_to_query is not a column, straight away rather
+                    than on the first row, or workers is less than 1.
     """
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1. Got {workers}")
     try:
         col_position = table.col_names.index(column_to_query)
     except ValueError as e:
         raise ValueError(f"{column_to_query} not in {table}") from e
 
-    out: list[tuple[Any, ...]] = []
-    with open(table.data_path(), "r") as f:
-        for line in f.readlines():
-            element_list = line.strip().split(", ")
-            typed_row = validate_and_cast_row(element_list, table)
-            if typed_row[col_position] == predicate:
-                out.append(typed_row)
+    rows: Iterator[tuple[Any, ...]]
+    # Index and primary keys all have the column's type, so a predicate of
+    # another type could not be compared to them. Scanning gives the same
+    # answer as ==.
+    same_type = type(predicate) is table.dtypes[col_position]
+    if same_type and column_to_query in table.indexes:
+        rows = _scan_with_index(column_to_query, predicate, table)
+    elif same_type and column_to_query == table.primary_key:
+        rows = _read_primary_key(predicate, table)
+    elif table.storage == "columnar":
+        rows = _scan_columnar(column_to_query, predicate, table)
+    elif workers > 1 and table.storage == "row":
+        rows = _scan_parallel(col_position, predicate, table, workers)
+    else:
+        may_match = _equal_may_match(col_position, predicate, table)
+        rows = (
+            row
+            for row in _iter_rows(table, may_match)
+            if row[col_position] == predicate
+        )
+
+    return islice(rows, limit)
+
+
+def scan_batches(
+    column_to_query: str,
+    predicate: Any,
+    table: TableMetadata,
+    batch_size: int,
+    limit: int | None = None,
+) -> Iterator[list[tuple[Any, ...]]]:
+    """The same as scan but yields lists of up to batch_size rows."""
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1. Got {batch_size}")
+    rows = scan(column_to_query, predicate, table, limit)
+    return iter(lambda: list(islice(rows, batch_size)), [])
+
+
+def iter_rows(
+    table: TableMetadata, limit: int | None = None
+) -> Iterator[tuple[Any, ...]]:
+    """Lazily yield every row of the table in order, like scan without a filter."""
+    return islice(_iter_rows(table), limit)
+
+
+def close(table: TableMetadata) -> None:
+    """Close the secondary indexes and storage engine of table, if open."""
+    for column in table.indexes:
+        _close_index(table.index_path(column))
+    engine = _open_engines.pop(table.engine_path(), None)
+    if engine is not None:
+        engine.close()
+
+
+@atexit.register
+def _close_all() -> None:
+    """Close every open index and engine, for processes that exit without close."""
+    for path in list(_open_indexes):
+        _close_index(path)
+    while _open_engines:
+        _open_engines.popitem()[1].close()
+
+
+def rebuild_indexes(table: TableMetadata) -> None:
+    """
+    Throw away the secondary indexes of table and build them again from
+    its rows. Use after adding an index to a table that already has rows, or
+    after an OS crash, as index writes are not synced to disk.
+    """
+    close(table)
+    for column in table.indexes:
+        shutil.rmtree(table.index_path(column), ignore_errors=True)
+        # Opening an index without an indexed_up_to file indexes every row.
+        _index(table, column)
+
+
+def select(
+    table: TableMetadata,
+    where: predicates.Expression | None = None,
+    columns: Sequence[str] | None = None,
+    limit: int | None = None,
+) -> Iterator[tuple[Any, ...]]:
+    """
+    Lazily yield the rows matching where, or every row, with only columns in
+    that order (every column by default), stopping after limit rows.
+
+    On data.csv where and the projection are each compiled once into a single
+    function over the fields of a line, so only the columns they use are cast,
+    and the zones of data.csv where rules out are not read at all.
+    On columnar tables where is evaluated as NumPy masks over a chunk of rows
+    at a time, reading only the columns it uses, and only the projected
+    columns of the matching rows are read.
+
+    Raises:
+        ValueError: If a column is not in the table.
+        TypeError: If where compares a column to a value of another type.
+    """
+    projection = table.col_names if columns is None else tuple(columns)
+    for column in projection:
+        if column not in table.col_names:
+            raise ValueError(f"{column} not in {table}")
+    if where is not None:
+        predicates.check(where, table)
+
+    if table.storage == "columnar":
+        rows = _select_columnar(table, where, projection)
+    else:
+        matches = None if where is None else predicates.compile_row_filter(where, table)
+        project = predicates.compile_projection(projection, table)
+        may_match = None if where is None else predicates.zone_may_match(where, table)
+        rows = _select_rows(table, matches, project, may_match)
+    return islice(rows, limit)
+
 
+def _select_rows(
+    table: TableMetadata,
+    matches: predicates.RowFilter | None,
+    project: predicates.RowProjection,
+    may_match: zone_map.ZoneFilter | None,
+) -> Iterator[tuple[Any, ...]]:
+    for line in _iter_lines(table, may_match):
+        fields = line.strip().split(", ")
+        if matches is None or matches(fields):
+            yield project(fields)
+
+
+def _select_columnar(
+    table: TableMetadata,
+    where: predicates.Expression | None,
+    projection: Sequence[str],
+) -> Iterator[tuple[Any, ...]]:
+    num_rows = columnar.row_count(table)
+    for start in range(0, num_rows, READ_CHUNK_ROWS):
+        stop = min(start + READ_CHUNK_ROWS, num_rows)
+        if where is None:
+            row_numbers = np.arange(start, stop)
+        else:
+            mask = predicates.evaluate_mask(
+                where, lambda column: columnar.read_column(column, table, start, stop)
+            )
+            row_numbers = start + np.flatnonzero(mask)
+        yield from columnar.read_rows(row_numbers, table, projection)
+
+
+def _iter_rows(
+    table: TableMetadata, may_match: zone_map.ZoneFilter | None = None
+) -> Iterator[tuple[Any, ...]]:
+    if table.storage == "columnar":
+        num_rows = columnar.row_count(table)
+        for start in range(0, num_rows, READ_CHUNK_ROWS):
+            row_numbers = np.arange(start, min(start + READ_CHUNK_ROWS, num_rows))
+            yield from columnar.read_rows(row_numbers, table)
+        return
+
+    for line in _iter_lines(table, may_match):
+        yield _parse_line(line, table)
+
+
+def _iter_lines(
+    table: TableMetadata, may_match: zone_map.ZoneFilter | None = None
+) -> Iterator[str]:
+    """
+    Every row of a table that is not columnar as a data.csv line, in order.
+    lsm and hash tables store the line of each row as its value, and yield
+    them in primary key order.
+
+    Row tables skip the zones of data.csv may_match rules out, if given, and
+    read every other row.
+    """
+    if table.storage in ENGINE_STORAGE_LAYOUTS:
+        for _, line in _engine(table).scan():
+            yield line
+        return
+
+    data_ranges = zone_map.ranges(table, may_match) if may_match else [(0, None)]
+    if data_ranges == [(0, None)]:
+        with open(table.data_path(), "r", buffering=READ_BUFFER_SIZE) as f:
+            yield from f
+        return
+
+    with open(table.data_path(), "rb", buffering=READ_BUFFER_SIZE) as f:
+        for start, end in data_ranges:
+            f.seek(start)
+            offset = start
+            while end is None or offset < end:
+                line = f.readline()
+                if not line:
+                    break
+                offset += len(line)
+                yield line.decode()
+
+
+def _equal_may_match(
+    col_position: int, predicate: Any, table: TableMetadata
+) -> zone_map.ZoneFilter | None:
+    """Rules out the zones where column col_position can't be predicate."""
+    # Only values of the column's type are ordered against its values.
+    if type(predicate) is not table.dtypes[col_position]:
+        return None
+    return lambda zone: (
+        zone.mins[col_position] <= predicate <= zone.maxes[col_position]
+    )
+
+
+def _scan_columnar(
+    column_to_query: str, predicate: Any, table: TableMetadata
+) -> Iterator[tuple[Any, ...]]:
+    num_rows = columnar.row_count(table)
+    for start in range(0, num_rows, READ_CHUNK_ROWS):
+        stop = min(start + READ_CHUNK_ROWS, num_rows)
+        row_numbers = columnar.filter_equal(
+            column_to_query, predicate, table, start, stop
+        )
+        yield from columnar.read_rows(row_numbers, table)
+
+
+def _scan_parallel(
+    col_position: int, predicate: Any, table: TableMetadata, workers: int
+) -> Iterator[tuple[Any, ...]]:
+    bounds = _line_aligned_bounds(table.data_path(), workers * RANGES_PER_WORKER)
+    with ProcessPoolExecutor(workers) as executor:
+        # map returns the results in the order the ranges were submitted.
+        for rows in executor.map(
+            _scan_range,
+            [table] * (len(bounds) - 1),
+            bounds[:-1],
+            bounds[1:],
+            [col_position] * (len(bounds) - 1),
+            [predicate] * (len(bounds) - 1),
+        ):
+            yield from rows
+
+
+def _scan_range(
+    table: TableMetadata, start: int, end: int, col_position: int, predicate: Any
+) -> list[tuple[Any, ...]]:
+    """Parse the lines of data.csv from byte start to end and filter them."""
+    out = []
+    with open(table.data_path(), "rb", buffering=READ_BUFFER_SIZE) as f:
+        f.seek(start)
+        offset = start
+        while offset < end:
+            line = f.readline()
+            offset += len(line)
+            row = _parse_line(line.decode(), table)
+            if row[col_position] == predicate:
+                out.append(row)
     return out
+
+
+def _line_aligned_bounds(path: Path, num_ranges: int) -> list[int]:
+    """
+    Split the file at path into up to num_ranges byte ranges of about the
+    same size that each start at the start of a line. Range i runs from
+    bounds[i] up to bounds[i + 1].
+    """
+    size = path.stat().st_size
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, num_ranges):
+            # The range starts after the end of the line byte i * size / n
+            # is in. Reading from the byte before finds it even if that byte
+            # already starts a line.
+            f.seek(max(i * size // num_ranges - 1, bounds[-1]))
+            f.readline()
+            if f.tell() > bounds[-1]:
+                bounds.append(min(f.tell(), size))
+    if bounds[-1] < size:
+        bounds.append(size)
+    return bounds
+
+
+def _rows_with_offsets(
+    table: TableMetadata, start: int = 0
+) -> Iterator[tuple[tuple[Any, ...], int]]:
+    """
+    Yield every row from start, a row number or data.csv offset, with what
+    index entries point to it by, in order.
+    """
+    if table.storage == "columnar":
+        num_rows = columnar.row_count(table)
+        for chunk_start in range(start, num_rows, READ_CHUNK_ROWS):
+            row_numbers = np.arange(
+                chunk_start, min(chunk_start + READ_CHUNK_ROWS, num_rows)
+            )
+            yield from zip(columnar.read_rows(row_numbers, table), row_numbers.tolist())
+        return
+
+    # Read as bytes as offsets have to be counted in bytes, and tell() on a
+    # text file is slow.
+    with open(table.data_path(), "rb") as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            yield _parse_line(line.decode(), table), offset
+            offset += len(line)
+
+
+def _append_row(typed_row: tuple[Any, ...], f: BinaryIO, table: TableMetadata) -> None:
+    # The index entries point at where the row is about to be written. If the
+    # row never makes it, read finds a row that does not match at that
+    # offset, or nothing at all, and skips the entry. The end of the file is
+    # looked up as other handles may have appended since f was opened.
+    if table.indexes:
+        _index_row(typed_row, f.seek(0, os.SEEK_END), table)
+    line = table.codec.encode(typed_row)
+    f.write(line)
+    f.flush()
+    end = f.tell()
+    _advance_indexed_up_to(table, end - len(line), end)
+    zone_map.update(table, end, [typed_row], [end - len(line)])
+
+
+def _index_row(typed_row: tuple[Any, ...], offset: int, table: TableMetadata) -> None:
+    for column in table.indexes:
+        value = typed_row[table.col_names.index(column)]
+        _index(table, column).write((value, offset), None)
+
+
+def _write_index_entries(
+    indexes: Iterable[tuple[int, LSMTree]], rows: list[tuple[tuple[Any, ...], int]]
+) -> None:
+    for col_position, index in indexes:
+        index.write_batch(((row[col_position], offset), None) for row, offset in rows)
+
+
+def _index(table: TableMetadata, column: str) -> LSMTree:
+    """
+    The open index of column, opening it if need be and indexing the rows
+    written since it was last closed, which it may or may not have entries
+    for already. Writing an entry again is harmless, as the keys hold the
+    offset of the row.
+    """
+    path = table.index_path(column)
+    index = _open_indexes.get(path)
+    if index is None:
+        data_end = _data_end(table)
+        indexed_up_to = _load_indexed_up_to(path)
+        if indexed_up_to > data_end:
+            # The table was emptied or replaced, so the entries point at rows
+            # that are not there any more.
+            shutil.rmtree(path, ignore_errors=True)
+            indexed_up_to = 0
+
+        index = LSMTree(
+            INDEX_MEMTABLE_SIZE, segment_folder_path=path, durability="none"
+        )
+        _open_indexes[path] = index
+        indexes = [(table.col_names.index(column), index)]
+        rows = _rows_with_offsets(table, indexed_up_to)
+        while batch := list(islice(rows, INDEX_MEMTABLE_SIZE)):
+            _write_index_entries(indexes, batch)
+        _indexed_up_to[path] = data_end
+    return index
+
+
+def _close_index(path: Path) -> None:
+    index = _open_indexes.pop(path, None)
+    if index is None:
+        return
+    index.close()
+    # Written after the index is closed, so it never claims rows whose
+    # entries are still on their way to disk, and renamed into place so it
+    # is never seen half written.
+    tmp_path = path / "indexed_up_to.tmp"
+    tmp_path.write_text(str(_indexed_up_to.pop(path)))
+    os.replace(tmp_path, path / "indexed_up_to")
+
+
+def _load_indexed_up_to(path: Path) -> int:
+    try:
+        return int((path / "indexed_up_to").read_text())
+    except FileNotFoundError:
+        return 0
+
+
+def _advance_indexed_up_to(table: TableMetadata, start: int, end: int) -> None:
+    """
+    Record that the rows from start up to end, just written, are indexed. If
+    rows were written before them without going through the open indexes,
+    such as by another process, the indexes stay where they were so those
+    rows are indexed the next time they are opened.
+    """
+    for column in table.indexes:
+        path = table.index_path(column)
+        if _indexed_up_to.get(path) == start:
+            _indexed_up_to[path] = end
+
+
+def _data_end(table: TableMetadata) -> int:
+    """Where the next row of table goes, as a row number or data.csv offset."""
+    if table.storage == "columnar":
+        return columnar.row_count(table)
+    return table.data_path().stat().st_size
+
+
+def _engine(table: TableMetadata) -> LSMTree | HashIndexDB:
+    path = table.engine_path()
+    engine = _open_engines.get(path)
+    if engine is None:
+        if table.storage == "lsm":
+            engine = LSMTree(ENGINE_MEMTABLE_SIZE, segment_folder_path=path)
+        else:
+            engine = HashIndexDB(path)
+        _open_engines[path] = engine
+    return engine
+
+
+def _engine_item(typed_row: tuple[Any, ...], table: TableMetadata) -> tuple[Any, str]:
+    """The primary key of a row and its data.csv line, without the newline."""
+    key = typed_row[table.col_names.index(table.primary_key)]
+    return key, table.codec.encode(typed_row)[:-1].decode()
+
+
+def _read_primary_key(
+    predicate: Any, table: TableMetadata
+) -> Iterator[tuple[Any, ...]]:
+    # Both engines read a missing key as None or "".
+    line = _engine(table).read(predicate)
+    if line:
+        yield _parse_line(line, table)
+
+
+def _scan_with_index(
+    column_to_query: str, predicate: Any, table: TableMetadata
+) -> Iterator[tuple[Any, ...]]:
+    col_position = table.col_names.index(column_to_query)
+    # Keys are (value, row offset) so the rows with value are one key range,
+    # in the order they were written.
+    entries = cast(
+        Iterator[tuple[tuple[Any, int], None]],
+        _index(table, column_to_query).scan((predicate,), (predicate, math.inf)),
+    )
+    offsets = (offset for (_, offset), _ in entries)
+    while chunk := list(islice(offsets, READ_CHUNK_ROWS)):
+        for row in _read_rows_at(chunk, table):
+            if row[col_position] == predicate:
+                yield row
+
+
+def _read_rows_at(offsets: list[int], table: TableMetadata) -> list[tuple[Any, ...]]:
+    """Read the rows index entries point to, skipping those past the end."""
+    if table.storage == "columnar":
+        num_rows = columnar.row_count(table)
+        row_numbers = np.array([row for row in offsets if row < num_rows], dtype=int)
+        return columnar.read_rows(row_numbers, table)
+
+    out = []
+    with open(table.data_path(), "r") as f:
+        for offset in offsets:
+            f.seek(offset)
+            line = f.readline()
+            if line:
+                out.append(_parse_line(line, table))
+    return out
+
+
+def _parse_line(line: str, table: TableMetadata) -> tuple[Any, ...]:
+    try:
+        return table.codec.decode(line)
+    except ValueError:
+        # Raise the RowTypeError validate_and_cast_row gives for the line.
+        return validate_and_cast_row(line.strip().split(", "), table)
@@ -0,0 +1,196 @@
+import json
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Sequence
+
+from sandb.tables.metadata import TableMetadata
+
+# data.csv is split into zones of at least this many bytes, ending on a line.
+ZONE_SIZE = 64 * 1024
+# Rows written before the table had zones are read back this many at a time.
+READ_CHUNK_ROWS = 65_536
+
+
+class Zone(NamedTuple):
+    """
+    The rows of data.csv from byte start up to end, and the smallest and
+    largest value of every column among them, in column order. Columns
+    can't hold nulls, so there is no null count.
+    """
+
+    start: int
+    end: int
+    row_count: int
+    mins: tuple[Any, ...]
+    maxes: tuple[Any, ...]
+
+
+# Tells from the statistics of a zone if it may have rows matching a query.
+ZoneFilter = Callable[[Zone], bool]
+
+# The zones of each zone map file, read once and appended to as rows are
+# written. Kept with the size of the file they were read from, to notice it
+# changing, and the size of its whole lines.
+_loaded: dict[Path, tuple[int, int, list[Zone]]] = {}
+# The rows after the last zone of each table that update has seen, with
+# where they end, so the next update does not have to read them back.
+_unzoned: dict[Path, tuple[list[tuple[Any, ...]], list[int]]] = {}
+
+
+def zones(table: TableMetadata) -> list[Zone]:
+    """
+    The zones of data.csv, in file order, from <table>/zones.jsonl, where
+    every zone is a JSON array of its fields on its own line. The rows after
+    the end of the last zone have no zone yet. A torn last line, from a
+    crash while it was appended, is ignored until update truncates it away.
+    """
+    return _load(table.zone_map_path())[1]
+
+
+def update(
+    table: TableMetadata,
+    data_end: int,
+    rows: Sequence[tuple[Any, ...]] = (),
+    offsets: Sequence[int] = (),
+) -> None:
+    """
+    Give zones to the rows of data.csv up to byte data_end that have none,
+    once there are at least ZONE_SIZE bytes of them. Writers call this after
+    appending, with the typed rows they just wrote and their offsets, which
+    run up to data_end. Only the rows before those are read back from
+    data.csv, at most a zone's worth, or every row written before the table
+    had a zone map the first time.
+    """
+    path = table.zone_map_path()
+    valid_size, existing = _load(path)
+    covered = existing[-1].end if existing else 0
+    if data_end - covered < ZONE_SIZE:
+        return
+
+    unzoned = _unzoned.pop(path, None)
+    if unzoned is not None and offsets and unzoned[1][-1] == offsets[0]:
+        chunks: Iterable[tuple[list[tuple[Any, ...]], list[int]]] = [
+            unzoned,
+            (list(rows), [*offsets[1:], data_end]),
+        ]
+    else:
+        chunks = _row_chunks(table, covered, data_end, rows, offsets)
+
+    new_zones = []
+    start = covered
+    pending_rows: list[tuple[Any, ...]] = []
+    pending_ends: list[int] = []
+    for chunk_rows, chunk_ends in chunks:
+        pending_rows += chunk_rows
+        pending_ends += chunk_ends
+        # Each zone ends with the first row that ends ZONE_SIZE bytes or more
+        # after the zone starts.
+        first = 0
+        while (last := bisect_left(pending_ends, start + ZONE_SIZE, first)) < len(
+            pending_ends
+        ):
+            columns = list(zip(*pending_rows[first : last + 1]))
+            new_zones.append(
+                Zone(
+                    start,
+                    pending_ends[last],
+                    last + 1 - first,
+                    tuple(map(min, columns)),
+                    tuple(map(max, columns)),
+                )
+            )
+            start, first = pending_ends[last], last + 1
+        del pending_rows[:first], pending_ends[:first]
+    if pending_ends and pending_ends[-1] == data_end:
+        _unzoned[path] = (pending_rows, pending_ends)
+    if not new_zones:
+        return
+
+    with open(path, "ab") as f:
+        # Drop a torn last line before appending after it.
+        f.truncate(valid_size)
+        f.write(b"".join(json.dumps(zone).encode() + b"\n" for zone in new_zones))
+        size = f.tell()
+    _loaded[path] = (size, size, existing + new_zones)
+
+
+def ranges(table: TableMetadata, may_match: ZoneFilter) -> list[tuple[int, int | None]]:
+    """
+    The byte ranges of data.csv that have to be read to find every row that
+    matches, given may_match, which is False only for zones that can't have
+    a matching row. Neighbouring zones are merged into one range, and the
+    rows without a zone are always read, up to the end of the file (None).
+    """
+    out: list[tuple[int, int | None]] = []
+    covered = 0
+    for zone in zones(table):
+        covered = zone.end
+        if not may_match(zone):
+            continue
+        if out and out[-1][1] == zone.start:
+            out[-1] = (out[-1][0], zone.end)
+        else:
+            out.append((zone.start, zone.end))
+    if out and out[-1][1] == covered:
+        out[-1] = (out[-1][0], None)
+    else:
+        out.append((covered, None))
+    return out
+
+
+def _row_chunks(
+    table: TableMetadata,
+    start: int,
+    data_end: int,
+    rows: Sequence[tuple[Any, ...]],
+    offsets: Sequence[int],
+) -> Iterator[tuple[list[tuple[Any, ...]], list[int]]]:
+    """
+    The rows of data.csv from byte start up to data_end and where each of
+    them ends, READ_CHUNK_ROWS rows at a time, taking the rows that start at
+    offsets from rows rather than reading them.
+    """
+    read_up_to = offsets[0] if offsets and offsets[0] >= start else data_end
+    with open(table.data_path(), "rb") as f:
+        f.seek(start)
+        offset = start
+        while offset < read_up_to:
+            lines: list[str] = []
+            ends: list[int] = []
+            while offset < read_up_to and len(lines) < READ_CHUNK_ROWS:
+                line = f.readline()
+                # A line being written by a crashed writer is left for later.
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                lines.append(line.decode())
+                ends.append(offset)
+            yield list(map(table.codec.decode, lines)), ends
+            if len(lines) < READ_CHUNK_ROWS and offset < read_up_to:
+                return
+
+    if read_up_to < data_end:
+        yield list(rows), [*offsets[1:], data_end]
+
+
+def _load(path: Path) -> tuple[int, list[Zone]]:
+    """The size of the whole lines of the zone map file at path, and their zones."""
+    try:
+        size = path.stat().st_size
+    except FileNotFoundError:
+        return 0, []
+    cached = _loaded.get(path)
+    if cached is not None and cached[0] == size:
+        return cached[1], cached[2]
+
+    valid_size = 0
+    loaded = []
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            valid_size += len(line)
+            start, end, row_count, mins, maxes = json.loads(line)
+            loaded.append(Zone(start, end, row_count, tuple(mins), tuple(maxes)))
+    _loaded[path] = (size, valid_size, loaded)
+    return valid_size, loaded
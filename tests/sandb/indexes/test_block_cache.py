@@ -0,0 +1,76 @@
+import os
+from pathlib import Path
+
+from sandb.indexes.block_cache import BlockCache
+from sandb.indexes.file_handle_pool import FileHandlePool
+
+
+def test_evicts_least_recently_used_by_size() -> None:
+    cache = BlockCache(10)
+    cache.put((Path("a"), 0), b"1234")
+    cache.put((Path("a"), 4), b"5678")
+    assert cache.get((Path("a"), 0)) == b"1234"
+
+    cache.put((Path("b"), 0), b"abcd")
+
+    assert cache.get((Path("a"), 4)) is None
+    assert cache.get((Path("a"), 0)) == b"1234"
+    assert cache.get((Path("b"), 0)) == b"abcd"
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (3, 1, 1, 8)
+    assert stats.hit_rate == 0.75
+
+
+def test_blocks_larger_than_capacity_are_not_cached() -> None:
+    cache = BlockCache(3)
+    cache.put((Path("a"), 0), b"1234")
+
+    assert cache.get((Path("a"), 0)) is None
+    assert cache.stats().size == 0
+
+
+def test_discard_drops_every_block_of_a_segment() -> None:
+    cache = BlockCache(100)
+    cache.put((Path("a"), 0), b"12")
+    cache.put((Path("a"), 2), b"34")
+    cache.put((Path("b"), 0), b"56")
+
+    cache.discard(Path("a"))
+
+    assert cache.get((Path("a"), 0)) is None
+    assert cache.get((Path("b"), 0)) == b"56"
+    assert cache.stats().size == 2
+
+
+def test_file_pool_closes_idle_handles_over_cap(tmp_path: Path) -> None:
+    paths = [tmp_path / f"segment_{i}.sst" for i in range(3)]
+    for path in paths:
+        path.write_bytes(path.name.encode())
+    pool = FileHandlePool(max_open=2)
+
+    with pool.open(paths[0]) as fd:
+        # The first file is in use so the second is closed to make room.
+        with pool.open(paths[1]):
+            pass
+        with pool.open(paths[2]):
+            pass
+        assert list(pool._handles) == [paths[0], paths[2]]
+
+    with pool.open(paths[0]) as same_fd:
+        assert same_fd == fd
+    pool.close()
+    assert len(pool) == 0
+
+
+def test_file_pool_discard_waits_for_readers(tmp_path: Path) -> None:
+    path = tmp_path / "segment_0.sst"
+    path.write_bytes(b"data")
+    pool = FileHandlePool()
+
+    with pool.open(path) as fd:
+        pool.discard(path)
+        path.unlink()
+        assert len(pool) == 0
+        assert os.pread(fd, 4, 0) == b"data"
+
+    assert len(pool) == 0
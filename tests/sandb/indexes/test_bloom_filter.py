@@ -0,0 +1,46 @@
+from pathlib import Path
+
+import pytest
+
+from sandb.indexes.bloom_filter import BloomFilter
+
+
+def test_no_false_negatives() -> None:
+    bloom_filter = BloomFilter.for_capacity(1000, 0.01)
+    for num in range(1000):
+        bloom_filter.add(num)
+
+    assert all(num in bloom_filter for num in range(1000))
+
+
+def test_false_positive_rate_roughly_respected() -> None:
+    bloom_filter = BloomFilter.for_capacity(1000, 0.01)
+    for num in range(1000):
+        bloom_filter.add(num)
+
+    false_positives = sum(num in bloom_filter for num in range(1000, 11000))
+
+    # Expect ~100, leave plenty of room so the test is not flaky.
+    assert false_positives < 300
+
+
+def test_save_and_load(tmp_path: Path) -> None:
+    bloom_filter = BloomFilter.for_capacity(10, 0.01)
+    for country in ["Bulgaria", "Cyprus", "Germany"]:
+        bloom_filter.add(country)
+
+    bloom_filter.save(tmp_path / "segment_0.bloom")
+    loaded = BloomFilter.load(tmp_path / "segment_0.bloom")
+
+    assert loaded.num_bits == bloom_filter.num_bits
+    assert loaded.num_hashes == bloom_filter.num_hashes
+    assert loaded.bits == bloom_filter.bits
+    assert "Cyprus" in loaded
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="false_positive_rate", argvalues=[0, 1, 1.5, -0.1]
+)
+def test_invalid_false_positive_rate(false_positive_rate: float) -> None:
+    with pytest.raises(ValueError):
+        BloomFilter.for_capacity(10, false_positive_rate)
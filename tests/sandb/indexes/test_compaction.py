@@ -0,0 +1,125 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+from num2words import num2words
+
+from sandb.indexes.compaction import (
+    COMPACTION_STRATEGY,
+    CompactionJob,
+    LeveledStrategy,
+    SegmentSummary,
+    SizeTieredStrategy,
+)
+from sandb.indexes.lsm_tree import LSMTree
+
+
+def summaries(*levels_and_sizes: tuple[int, int]) -> list[SegmentSummary]:
+    return [
+        SegmentSummary(Path(f"segment_{i}.sst"), level, size)
+        for i, (level, size) in enumerate(levels_and_sizes)
+    ]
+
+
+def test_size_tiered_merges_similar_sized_run() -> None:
+    segments = summaries((1, 4000), (0, 100), (0, 110), (0, 90), (0, 100))
+
+    assert SizeTieredStrategy(min_threshold=4).pick(segments) == CompactionJob(
+        tuple(Path(f"segment_{i}.sst") for i in range(1, 5)), 1
+    )
+
+
+def test_size_tiered_mixed_tiers_stay_at_highest() -> None:
+    segments = summaries((1, 100), (0, 100), (0, 110), (0, 90))
+
+    assert SizeTieredStrategy(min_threshold=4).pick(segments) == CompactionJob(
+        tuple(Path(f"segment_{i}.sst") for i in range(4)), 1
+    )
+
+
+def test_size_tiered_levels_stay_bounded_under_overwrites(tmp_path: Path) -> None:
+    lsmtree = LSMTree(10, 3, segment_folder_path=tmp_path)
+    for round_num in range(40):
+        for num in range(50):
+            lsmtree.write(num, f"{num2words(num)}_{round_num}")
+    lsmtree.wait_for_flush()
+    lsmtree.wait_for_compaction()
+
+    assert max(lsmtree.compaction_metrics().segments_per_level) <= 2
+    assert lsmtree.read(7) == "seven_39"
+    lsmtree.close()
+
+
+def test_size_tiered_waits_for_min_threshold() -> None:
+    segments = summaries((0, 100), (0, 100), (0, 100))
+
+    assert SizeTieredStrategy(min_threshold=4).pick(segments) is None
+
+
+def test_leveled_merges_level0_into_level1() -> None:
+    segments = summaries((2, 5000), (1, 500), (0, 100), (0, 100))
+
+    assert LeveledStrategy(level0_max_segments=2).pick(segments) == CompactionJob(
+        tuple(Path(f"segment_{i}.sst") for i in range(1, 4)), 1
+    )
+
+
+def test_leveled_pushes_oversized_level_down() -> None:
+    segments = summaries((2, 5000), (1, 500), (0, 100))
+
+    strategy = LeveledStrategy(
+        level0_max_segments=2, base_level_size=400, level_size_multiplier=10
+    )
+
+    assert strategy.pick(segments) == CompactionJob(
+        (Path("segment_0.sst"), Path("segment_1.sst")), 2
+    )
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="strategy", argvalues=["size_tiered", "leveled"]
+)
+def test_compaction_keeps_newest_values(
+    strategy: COMPACTION_STRATEGY, tmp_path: Path
+) -> None:
+    lsmtree = LSMTree(10, 3, segment_folder_path=tmp_path, compaction_strategy=strategy)
+    for round_num in range(3):
+        for num in range(40):
+            lsmtree.write(num, f"{num2words(num)}_{round_num}")
+    lsmtree.flush_memtable_to_disk()
+    lsmtree.wait_for_compaction()
+
+    metrics = lsmtree.compaction_metrics()
+    assert metrics.compactions > 0
+    assert metrics.write_amplification > 1
+    assert sum(metrics.segments_per_level.values()) == len(lsmtree.segments) < 12
+    # The merged inputs are deleted.
+    assert sorted(tmp_path.glob("*.sst")) == sorted(lsmtree.segments)
+    assert all(lsmtree.read(num) == f"{num2words(num)}_2" for num in range(40))
+    lsmtree.close()
+
+
+def test_compaction_in_process_pool(tmp_path: Path) -> None:
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        lsmtree = LSMTree(
+            10, 3, segment_folder_path=tmp_path, compaction_executor=executor
+        )
+        for num in range(50):
+            lsmtree.write(num, num2words(num))
+        lsmtree.wait_for_flush()
+        lsmtree.wait_for_compaction()
+
+        assert lsmtree.compaction_metrics().compactions == 1
+        assert lsmtree.read(7) == "seven"
+        lsmtree.close()
+
+
+def test_compaction_disabled(tmp_path: Path) -> None:
+    lsmtree = LSMTree(10, 3, segment_folder_path=tmp_path, compaction_strategy=None)
+    for num in range(100):
+        lsmtree.write(num, num2words(num))
+    lsmtree.wait_for_flush()
+
+    assert len(lsmtree.segments) == 9
+    assert lsmtree.compaction_metrics().segments_per_level == {0: 9}
+    lsmtree.close()
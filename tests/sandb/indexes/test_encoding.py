@@ -0,0 +1,55 @@
+import pickle
+from typing import Any
+
+import pytest
+
+from sandb.indexes.encoding import TOMBSTONE, decode, decode_entry, encode, encode_entry
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="obj",
+    argvalues=[
+        "Cyprus",
+        "",
+        10,
+        -(2**63),
+        2**70,
+        1.5,
+        b"\x00",
+        None,
+        (1, "a"),
+        True,
+    ],
+    ids=[
+        "str",
+        "empty str",
+        "int",
+        "min int",
+        "big int",
+        "float",
+        "bytes",
+        "None",
+        "tuple",
+        "bool",
+    ],
+)
+def test_round_trip(obj: Any) -> None:
+    decoded = decode(encode(obj))
+
+    assert decoded == obj
+    assert type(decoded) is type(obj)
+
+
+def test_entries_decode_in_sequence() -> None:
+    buf = encode_entry("Cyprus", 20) + encode_entry(30, "Germany")
+
+    key, value, offset = decode_entry(buf, 0)
+    assert (key, value) == ("Cyprus", 20)
+    key, value, offset = decode_entry(buf, offset)
+    assert (key, value) == (30, "Germany")
+    assert offset == len(buf)
+
+
+def test_tombstone_round_trips_to_the_same_object() -> None:
+    assert decode(encode(TOMBSTONE)) is TOMBSTONE
+    assert pickle.loads(pickle.dumps(TOMBSTONE)) is TOMBSTONE
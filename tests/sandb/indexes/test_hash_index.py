@@ -0,0 +1,135 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from sandb.indexes.hash_index import HashIndexDB
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="compact_keydir", argvalues=[False, True]
+)
+def test_read_write_delete(compact_keydir: bool, tmp_path: Path) -> None:
+    db = HashIndexDB(tmp_path, compact_keydir=compact_keydir)
+    db.write(1, "one")
+    db.write("two", 2)
+    db.write(1, "uno")
+    db.delete("two")
+
+    assert db.read(1) == "uno"
+    assert db.read("two") == ""
+    assert db.read(3) == ""
+    assert db.multi_get([3, 1, "two", 1]) == ["", "uno", "", "uno"]
+    db.close()
+
+
+def test_scan(tmp_path: Path) -> None:
+    db = HashIndexDB(tmp_path)
+    db.write_batch((key, str(key)) for key in [5, 1, 4, 2, 3])
+    db.delete(4)
+
+    assert list(db.scan()) == [(1, "1"), (2, "2"), (3, "3"), (5, "5")]
+    assert list(db.scan(2, 5)) == [(2, "2"), (3, "3")]
+    assert list(db.scan(2, limit=1)) == [(2, "2")]
+    db.close()
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="compact_keydir", argvalues=[False, True]
+)
+def test_reopen_rebuilds_keydir_from_hint_files(
+    compact_keydir: bool, tmp_path: Path
+) -> None:
+    db = HashIndexDB(
+        tmp_path,
+        max_file_size=100,
+        merge_fragmentation=None,
+        compact_keydir=compact_keydir,
+    )
+    for key in range(20):
+        db.write(key, f"value_{key}")
+    db.delete(3)
+    db.write(4, "four")
+    db.close()
+    assert len(list(tmp_path.glob("*.hint"))) == len(list(tmp_path.glob("*.data"))) > 1
+
+    reopened = HashIndexDB(tmp_path, compact_keydir=compact_keydir)
+    assert reopened.read(3) == ""
+    assert reopened.read(4) == "four"
+    assert reopened.multi_get(range(5, 20)) == [f"value_{key}" for key in range(5, 20)]
+    reopened.close()
+
+
+def test_reopen_after_crash_drops_torn_record(tmp_path: Path) -> None:
+    db = HashIndexDB(tmp_path)
+    db.write(1, "one")
+    db.write_batch([(2, "two"), (3, "three")])
+    # As if we crashed mid write, without closing or writing a hint file.
+    (data_file,) = tmp_path.glob("*.data")
+    os.truncate(data_file, data_file.stat().st_size - 3)
+
+    reopened = HashIndexDB(tmp_path)
+    assert reopened.multi_get([1, 2, 3]) == ["one", "", ""]
+    reopened.write(2, "dos")
+    reopened.close()
+
+    reopened = HashIndexDB(tmp_path)
+    assert reopened.multi_get([1, 2, 3]) == ["one", "dos", ""]
+    reopened.close()
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="compact_keydir", argvalues=[False, True]
+)
+def test_merge_drops_dead_values(compact_keydir: bool, tmp_path: Path) -> None:
+    db = HashIndexDB(
+        tmp_path,
+        max_file_size=200,
+        merge_fragmentation=None,
+        compact_keydir=compact_keydir,
+    )
+    for round in range(5):
+        for key in range(10):
+            db.write(key, f"value_{key}_{round}")
+    db.delete(0)
+    size_before = sum(path.stat().st_size for path in tmp_path.glob("*.data"))
+
+    db.merge()
+
+    assert sum(path.stat().st_size for path in tmp_path.glob("*.data")) < (
+        size_before / 2
+    )
+    expected = [""] + [f"value_{key}_4" for key in range(1, 10)]
+    assert db.multi_get(range(10)) == expected
+    db.close()
+
+    reopened = HashIndexDB(tmp_path, compact_keydir=compact_keydir)
+    assert reopened.multi_get(range(10)) == expected
+    reopened.close()
+
+
+def test_merges_in_the_background_once_fragmented(tmp_path: Path) -> None:
+    db = HashIndexDB(tmp_path, max_file_size=500, merge_fragmentation=0.5)
+    for round in range(50):
+        db.write_batch((key, f"value_{key}_{round}") for key in range(5))
+    db.wait_for_merge()
+
+    # Every value in the inactive files was overwritten, so merging leaves
+    # nothing but the active file.
+    assert len(list(tmp_path.glob("*.data"))) == 1
+    assert db.multi_get(range(5)) == [f"value_{key}_49" for key in range(5)]
+    db.close()
+
+
+def test_reads_find_values_moved_by_a_merge(tmp_path: Path) -> None:
+    db = HashIndexDB(tmp_path, max_file_size=100, merge_fragmentation=None)
+    for key in range(10):
+        db.write(key, f"value_{key}")
+    stale = db.keydir[0]
+    db.merge()
+
+    # A read that looked the key up just before the merge deleted its file.
+    assert db.keydir[0] != stale
+    assert not stale.path.exists()
+    assert db._read_value(0, stale) == "value_0"
+    db.close()
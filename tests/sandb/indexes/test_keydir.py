@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from sandb.indexes.encoding import LENGTH_PREFIX, encode
+from sandb.indexes.keydir import CompactKeyDir, KeyDirEntry
+
+
+def test_compact_keydir(tmp_path: Path) -> None:
+    files: dict[Path, bytes] = {}
+
+    def read_bytes(path: Path, offset: int, length: int) -> bytes:
+        return files[path][offset : offset + length]
+
+    def add(key: int) -> KeyDirEntry:
+        """Append a record for key to a fake data file."""
+        path = tmp_path / f"{key % 3}.data"
+        data = files.get(path, b"")
+        encoded_key = encode(key)
+        record = LENGTH_PREFIX.pack(len(encoded_key)) + encoded_key
+        record += LENGTH_PREFIX.pack(5) + b"value"
+        files[path] = data + record
+        return KeyDirEntry(path, len(data) + len(record) - 5, 5)
+
+    keydir = CompactKeyDir(read_bytes)
+    entries = {key: add(key) for key in range(-50, 1000)}
+    for key, entry in entries.items():
+        keydir[key] = entry
+    # In CPython hash(-1) == hash(-2), so -1 and -2 share a slot.
+    assert hash(-1) == hash(-2)
+    assert keydir.get(-1) == entries[-1] and keydir.get(-2) == entries[-2]
+
+    for key in range(0, 1000, 2):
+        assert keydir.pop(key) == entries[key]
+    assert keydir.pop(0) is None
+    keydir[10] = entries[10] = add(10)
+    for key in range(1000, 2000):
+        keydir[key] = entries[key] = add(key)
+
+    live = {
+        key: entry
+        for key, entry in entries.items()
+        if key < 0 or key % 2 or key == 10 or key >= 1000
+    }
+    assert len(keydir) == len(live)
+    assert sorted(keydir) == sorted(live)
+    assert all(keydir[key] == entry for key, entry in live.items())
+    assert keydir.get(0) is None and keydir.get(2000) is None
@@ -1,4 +1,7 @@
 import os
+import subprocess
+import sys
+import threading
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
@@ -8,32 +11,12 @@ from sortedcontainers import SortedDict
 
 from sandb.config import ROOT_DIR
 from sandb.indexes.abc import Comparable
+from sandb.indexes.bloom_filter import BloomFilter
+from sandb.indexes.compaction import SizeTieredStrategy
+from sandb.indexes.encoding import TOMBSTONE
 from sandb.indexes.lsm_tree import LSMTree, merge_segment_files
-
-
-@pytest.mark.parametrize(  # type: ignore
-    argnames=["input_key", "expected_output"],
-    argvalues=[
-        ("Andorra", (0, 10)),
-        ("England", (20, 30)),
-        ("Zimbabwe", (100, None)),
-        ("Cyprus", (20, 20)),
-    ],
-    ids=[
-        "Outside begining of tree",
-        "In the middle of the tree",
-        "Past the end of the tree",
-        "Hit a key",
-    ],
-)
-def test_get_floor_ceil_of_key_in_index(
-    input_key: str,
-    expected_output: tuple[int, int | None],
-    test_tree: SortedDict[Comparable, int],
-) -> None:
-    lsm = LSMTree()
-    assert lsm.get_floor_ceil_of_key_in_index(input_key, test_tree) == expected_output
-
+from sandb.indexes.sstable import COMPRESSION, SSTableReader, SSTableWriter
+from sandb.indexes.wal import WriteAheadLog
 
 LIST_OF_NUMS = [
     0,
@@ -61,13 +44,13 @@ LIST_OF_NUMS = [
 
 def test_read_from_db() -> None:
     with TemporaryDirectory(dir=ROOT_DIR) as tmp:
-        lsmtree = LSMTree(10, 3)
-        lsmtree.segment_folder_path = Path(tmp)
+        lsmtree = LSMTree(10, 3, segment_folder_path=Path(tmp))
         for num in LIST_OF_NUMS:
             lsmtree.write(num, num2words(num))
 
         assert lsmtree.read(10) == "ten"
         assert lsmtree.read(3) == ""
+        lsmtree.close()
 
 
 LONGER_LIST_OF_NUMS = [
@@ -177,13 +160,417 @@ LONGER_LIST_OF_NUMS = [
 def test_write_to_db() -> None:
     # Expect 3 files and a memtable with 25 els. as Dupes are in different segments
     with TemporaryDirectory(dir=ROOT_DIR) as tmp:
-        lsmtree = LSMTree(25, 5)
-        lsmtree.segment_folder_path = Path(tmp)
+        lsmtree = LSMTree(25, 5, segment_folder_path=Path(tmp))
         for num in LONGER_LIST_OF_NUMS:
             lsmtree.write(num, num2words(num))
+        lsmtree.wait_for_flush()
 
-        assert os.listdir(tmp) == ["segment_0.txt", "segment_1.txt", "segment_2.txt"]
+        assert sorted(os.listdir(tmp)) == [
+            "MANIFEST",
+            "segment_0.bloom",
+            "segment_0.sst",
+            "segment_1.bloom",
+            "segment_1.sst",
+            "segment_2.bloom",
+            "segment_2.sst",
+            "wal.log",
+        ]
         assert len(lsmtree.memtable) == 25
+        lsmtree.close()
+
+
+def test_read_newest_segment_wins() -> None:
+    with TemporaryDirectory(dir=ROOT_DIR) as tmp:
+        lsmtree = LSMTree(2, 1, segment_folder_path=Path(tmp))
+        lsmtree.write(1, "old")
+        lsmtree.write(2, "two")
+        lsmtree.write(1, "new")
+        lsmtree.write(3, "three")
+        lsmtree.write(4, "four")
+
+        assert lsmtree.read(1) == "new"
+        lsmtree.close()
+
+
+def test_read_skips_segments_rejected_by_bloom_filter() -> None:
+    with TemporaryDirectory(dir=ROOT_DIR) as tmp:
+        lsmtree = LSMTree(10, 3, segment_folder_path=Path(tmp))
+        for num in LIST_OF_NUMS:
+            lsmtree.write(num, num2words(num))
+        lsmtree.wait_for_flush()
+
+        # Remove the segment files, only the filters can answer now.
+        for filepath in lsmtree.segments:
+            filepath.unlink()
+
+        assert lsmtree.read(1000) == ""
+        lsmtree.close()
+
+
+def test_read_without_bloom_filters() -> None:
+    with TemporaryDirectory(dir=ROOT_DIR) as tmp:
+        lsmtree = LSMTree(
+            10, 3, bloom_filter_false_positive_rate=None, segment_folder_path=Path(tmp)
+        )
+        for num in LIST_OF_NUMS:
+            lsmtree.write(num, num2words(num))
+
+        assert not any(Path(tmp).glob("*.bloom"))
+        assert lsmtree.read(10) == "ten"
+        assert lsmtree.read(3) == ""
+        lsmtree.close()
+
+
+def test_read_value_containing_colon() -> None:
+    with TemporaryDirectory(dir=ROOT_DIR) as tmp:
+        lsmtree = LSMTree(2, 1, segment_folder_path=Path(tmp))
+        lsmtree.write("time", "12:30")
+        lsmtree.write("place", "a: b")
+        lsmtree.flush_memtable_to_disk()
+
+        assert lsmtree.read("time") == "12:30"
+        assert lsmtree.read("place") == "a: b"
+        lsmtree.close()
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="durability", argvalues=["none", "per_write", "batched"]
+)
+def test_memtable_recovered_from_wal(durability: str) -> None:
+    nums = LIST_OF_NUMS[:5]
+    with TemporaryDirectory(dir=ROOT_DIR) as tmp:
+        # Simulate a crash: the process exits without closing the tree, so
+        # the memtable is never flushed and nothing is cleaned up.
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import os\n"
+                "from pathlib import Path\n"
+                "from sandb.indexes.lsm_tree import LSMTree\n"
+                f"lsmtree = LSMTree(10, 3, segment_folder_path=Path({tmp!r}), "
+                f"durability={durability!r})\n"
+                f"for num in {nums!r}:\n"
+                "    lsmtree.write(num, str(num))\n"
+                "os._exit(0)\n",
+            ],
+            check=True,
+        )
+
+        reopened = LSMTree(10, 3, segment_folder_path=Path(tmp))
+
+        assert dict(reopened.memtable) == {num: str(num) for num in nums}
+        reopened.close()
+
+
+def test_reopen_restores_segments_from_manifest() -> None:
+    with TemporaryDirectory(dir=ROOT_DIR) as tmp:
+        lsmtree = LSMTree(
+            10, 3, segment_folder_path=Path(tmp), compaction_strategy=None
+        )
+        for num in LIST_OF_NUMS:
+            lsmtree.write(num, num2words(num))
+        lsmtree.close()
+
+        reopened = LSMTree(
+            10, 3, segment_folder_path=Path(tmp), compaction_strategy=None
+        )
+
+        assert list(reopened.segments) == list(lsmtree.segments)
+        # Nothing is read from the segment files until a lookup needs them.
+        assert all("sstable" not in vars(s) for s in reopened.segments.values())
+        assert reopened.read(10) == "ten"
+        assert reopened.read(3) == ""
+        reopened.flush_memtable_to_disk()
+        assert reopened.segment_index == lsmtree.segment_index + 1
+        reopened.close()
+
+
+def test_reopen_removes_segments_not_in_manifest() -> None:
+    with TemporaryDirectory(dir=ROOT_DIR) as tmp:
+        lsmtree = LSMTree(10, 3, segment_folder_path=Path(tmp))
+        for num in LIST_OF_NUMS:
+            lsmtree.write(num, num2words(num))
+        lsmtree.close()
+        # As if we crashed after writing a segment but before the manifest.
+        (Path(tmp) / "segment_7.sst").write_bytes(b"partial")
+
+        reopened = LSMTree(10, 3, segment_folder_path=Path(tmp))
+
+        assert not (Path(tmp) / "segment_7.sst").exists()
+        assert reopened.read(10) == "ten"
+        reopened.close()
+
+
+def test_rejected_keys_are_not_logged(tmp_path: Path) -> None:
+    lsmtree = LSMTree(10, 3, segment_folder_path=tmp_path)
+    lsmtree.write(1, "one")
+    with pytest.raises(TypeError):
+        lsmtree.write("x", "ex")
+    with pytest.raises(TypeError):
+        lsmtree.write_batch([(2, "two"), ("y", "why")])
+    assert dict(lsmtree.memtable) == {1: "one"}
+    lsmtree.close()
+
+    # Replaying the log would fail on a key that can't be compared.
+    reopened = LSMTree(10, 3, segment_folder_path=tmp_path)
+    assert reopened.read(1) == "one"
+    assert reopened.read(2) == ""
+    reopened.close()
+
+
+def test_wal_truncated_after_flush() -> None:
+    with TemporaryDirectory(dir=ROOT_DIR) as tmp:
+        lsmtree = LSMTree(10, 3, segment_folder_path=Path(tmp))
+        for num in range(10):
+            lsmtree.write(num, num2words(num))
+        assert (Path(tmp) / "wal.log").stat().st_size > 0
+
+        lsmtree.flush_memtable_to_disk()
+
+        assert (Path(tmp) / "wal.log").stat().st_size == 0
+        assert not any(Path(tmp).glob("wal_*.log"))
+        lsmtree.close()
+
+
+def test_writes_and_reads_continue_during_flush(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    lsmtree = LSMTree(10, 3, segment_folder_path=tmp_path)
+    flush_started = threading.Event()
+    release_flush = threading.Event()
+    write_segment = lsmtree._write_segment
+
+    def slow_write_segment(memtable: SortedDict[Comparable, str]) -> None:
+        flush_started.set()
+        release_flush.wait()
+        write_segment(memtable)
+
+    monkeypatch.setattr(lsmtree, "_write_segment", slow_write_segment)
+    for num in range(15):
+        lsmtree.write(num, num2words(num))
+    flush_started.wait()
+
+    # The first 10 keys are frozen and waiting on the stalled flush.
+    assert len(lsmtree.immutable_memtables) == 1
+    assert not lsmtree.segments
+    assert lsmtree.read(3) == "three"
+    assert lsmtree.read(12) == "twelve"
+
+    release_flush.set()
+    lsmtree.wait_for_flush()
+    assert len(lsmtree.segments) == 1
+    assert lsmtree.read(3) == "three"
+    lsmtree.close()
+
+
+def test_frozen_memtable_recovered_from_wal(tmp_path: Path) -> None:
+    # As if we crashed after freezing a memtable but before flushing it.
+    wal = WriteAheadLog(tmp_path / "wal_0.log", durability="none")
+    wal.append([(1, "one"), (2, "two")])
+    wal.close()
+
+    lsmtree = LSMTree(10, 3, segment_folder_path=tmp_path)
+    lsmtree.wait_for_flush()
+
+    assert len(lsmtree.segments) == 1
+    assert not (tmp_path / "wal_0.log").exists()
+    assert lsmtree.read(2) == "two"
+    lsmtree.close()
+
+
+def test_concurrent_writers_and_readers(tmp_path: Path) -> None:
+    lsmtree = LSMTree(50, 10, segment_folder_path=tmp_path, durability="none")
+    misses = []
+
+    def writer(thread_num: int) -> None:
+        for i in range(200):
+            key = thread_num * 1000 + i
+            lsmtree.write(key, str(key))
+            if lsmtree.read(key) != str(key):
+                misses.append(key)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    lsmtree.wait_for_flush()
+    lsmtree.wait_for_compaction()
+
+    assert misses == []
+    assert all(
+        lsmtree.read(n * 1000 + i) == str(n * 1000 + i)
+        for n in range(4)
+        for i in range(200)
+    )
+    lsmtree.close()
+
+
+def test_multi_get(tmp_path: Path) -> None:
+    lsmtree = LSMTree(10, 3, segment_folder_path=tmp_path)
+    for num in LONGER_LIST_OF_NUMS:
+        lsmtree.write(num, num2words(num))
+    lsmtree.write(506, "updated")
+    keys = [506, 3, 232, 601, 506, 1000, 28]
+
+    assert lsmtree.multi_get(keys) == [lsmtree.read(key) for key in keys]
+    assert lsmtree.multi_get(keys)[:3] == ["updated", "", "two hundred and thirty-two"]
+    lsmtree.close()
+
+
+def test_delete_hides_older_values(tmp_path: Path) -> None:
+    lsmtree = LSMTree(10, 3, segment_folder_path=tmp_path, compaction_strategy=None)
+    for num in range(30):
+        lsmtree.write(num, num2words(num))
+    lsmtree.flush_memtable_to_disk()
+
+    lsmtree.delete(5)
+    assert lsmtree.read(5) == ""
+    lsmtree.flush_memtable_to_disk()
+    lsmtree.delete(6)
+
+    for deleted in [5, 6]:
+        assert lsmtree.read(deleted) == ""
+    assert lsmtree.multi_get([4, 5, 6, 7]) == ["four", "", "", "seven"]
+    assert [key for key, _ in lsmtree.scan(3, 9)] == [3, 4, 7, 8]
+    assert [key for key, _ in lsmtree.reverse_scan(3, 9)] == [8, 7, 4, 3]
+
+    lsmtree.write(5, "five again")
+    assert lsmtree.read(5) == "five again"
+    lsmtree.close()
+
+    reopened = LSMTree(10, 3, segment_folder_path=tmp_path, compaction_strategy=None)
+    assert reopened.read(6) == ""
+    reopened.close()
+
+
+def test_compaction_drops_tombstones_at_the_oldest_segment(tmp_path: Path) -> None:
+    lsmtree = LSMTree(10, 3, segment_folder_path=tmp_path, compaction_strategy=None)
+    for num in range(20):
+        lsmtree.write(num, num2words(num))
+    lsmtree.flush_memtable_to_disk()
+    for num in range(0, 20, 2):
+        lsmtree.delete(num)
+    lsmtree.flush_memtable_to_disk()
+
+    lsmtree.compaction_strategy = SizeTieredStrategy(min_threshold=2, bucket_low=0)
+    lsmtree.schedule_compaction()
+    lsmtree.wait_for_compaction()
+
+    (segment,) = lsmtree.segments.values()
+    assert list(segment.sstable) == [(num, num2words(num)) for num in range(1, 20, 2)]
+    assert lsmtree.read(4) == ""
+    lsmtree.close()
+
+
+def test_repeated_reads_hit_block_cache(tmp_path: Path) -> None:
+    lsmtree = LSMTree(10, 3, segment_folder_path=tmp_path, compaction_strategy=None)
+    for num in LONGER_LIST_OF_NUMS:
+        lsmtree.write(num, num2words(num))
+    lsmtree.flush_memtable_to_disk()
+
+    assert lsmtree.read(232) == "two hundred and thirty-two"
+    misses = lsmtree.block_cache_stats().misses
+    for _ in range(10):
+        assert lsmtree.read(232) == "two hundred and thirty-two"
+
+    stats = lsmtree.block_cache_stats()
+    assert stats.misses == misses
+    assert stats.hits == 10
+    assert len(lsmtree.file_pool) > 0
+    lsmtree.close()
+    assert len(lsmtree.file_pool) == 0
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="compression", argvalues=["none", "zlib"]
+)
+def test_mmap_segments(compression: COMPRESSION, tmp_path: Path) -> None:
+    lsmtree = LSMTree(
+        10, 3, segment_folder_path=tmp_path, compression=compression, use_mmap=True
+    )
+    for num in LONGER_LIST_OF_NUMS:
+        lsmtree.write(num, num2words(num))
+    lsmtree.flush_memtable_to_disk()
+    lsmtree.wait_for_compaction()
+
+    assert all(segment.sstable.use_mmap for segment in lsmtree.segments.values())
+    for num in LONGER_LIST_OF_NUMS:
+        assert lsmtree.read(num) == num2words(num)
+    assert lsmtree.read(3) == ""
+    lsmtree.close()
+
+
+def test_compaction_discards_cached_blocks_of_inputs(tmp_path: Path) -> None:
+    lsmtree = LSMTree(10, 3, segment_folder_path=tmp_path, compaction_strategy=None)
+    for num in LONGER_LIST_OF_NUMS:
+        lsmtree.write(num, num2words(num))
+    lsmtree.flush_memtable_to_disk()
+    for num in LONGER_LIST_OF_NUMS:
+        lsmtree.read(num)
+    assert lsmtree.block_cache_stats().size > 0
+
+    lsmtree.compaction_strategy = SizeTieredStrategy(min_threshold=2)
+    lsmtree.schedule_compaction()
+    lsmtree.wait_for_compaction()
+
+    assert len(lsmtree.segments) == 1
+    assert lsmtree.block_cache_stats().size == 0
+    assert len(lsmtree.file_pool) == 0
+    lsmtree.close()
+
+
+def test_write_batch_is_one_wal_record(tmp_path: Path) -> None:
+    lsmtree = LSMTree(10, 3, segment_folder_path=tmp_path)
+    lsmtree.write_batch([(num, num2words(num)) for num in range(15)])
+
+    # The whole batch went into one memtable, past memtable_max_size.
+    assert len(lsmtree.memtable) == 15
+    lsmtree.close()
+
+    wal = WriteAheadLog(tmp_path / "wal.log", durability="none")
+    assert [len(record) for record in wal.replay()] == [15]
+    wal.close()
+
+    reopened = LSMTree(10, 3, segment_folder_path=tmp_path)
+    assert reopened.multi_get([0, 14]) == ["zero", "fourteen"]
+    reopened.close()
+
+
+def test_scan_merges_memtables_and_segments(tmp_path: Path) -> None:
+    lsmtree = LSMTree(10, 3, segment_folder_path=tmp_path, compaction_strategy=None)
+    for round_num in range(3):
+        for num in range(0, 30, round_num + 1):
+            lsmtree.write(num, f"{num}_{round_num}")
+    lsmtree.wait_for_flush()
+    # Newest value of each key: multiples of 3 from the last round, then even
+    # keys from the second round, then the rest from the first.
+    expected = [
+        (num, f"{num}_{2 if num % 3 == 0 else 1 if num % 2 == 0 else 0}")
+        for num in range(30)
+    ]
+
+    assert list(lsmtree.scan()) == expected
+    assert list(lsmtree.scan(5, 12)) == expected[5:12]
+    assert list(lsmtree.scan(5, limit=3)) == expected[5:8]
+    assert list(lsmtree.reverse_scan(5, 12)) == expected[5:12][::-1]
+    assert list(lsmtree.reverse_scan(end=12, limit=2)) == [expected[11], expected[10]]
+    lsmtree.close()
+
+
+def test_scan_prefix(tmp_path: Path) -> None:
+    lsmtree = LSMTree(2, 1, segment_folder_path=tmp_path)
+    for country in ["Germany", "Greece", "Greenland", "Guam", "Iceland", "Grenada"]:
+        lsmtree.write(country, len(country))
+
+    assert list(lsmtree.scan_prefix("Gre")) == [
+        ("Greece", 6),
+        ("Greenland", 9),
+        ("Grenada", 7),
+    ]
+    assert list(lsmtree.scan_prefix("Gre", limit=1)) == [("Greece", 6)]
+    lsmtree.close()
 
 
 @pytest.mark.parametrize(  # type: ignore
@@ -198,34 +585,34 @@ def test_write_to_db() -> None:
         (
             [[1, 2, 3, 4, 5], [1, 2, 4, 7, 8]],
             [
-                "1: one_2\n",
-                "2: two_2\n",
-                "3: three_1\n",
-                "4: four_2\n",
-                "5: five_1\n",
-                "7: seven_2\n",
-                "8: eight_2\n",
+                (1, "one_2"),
+                (2, "two_2"),
+                (3, "three_1"),
+                (4, "four_2"),
+                (5, "five_1"),
+                (7, "seven_2"),
+                (8, "eight_2"),
             ],
         ),
         (
             [[1, 2, 3, 4, 5], [1, 2, 4, 7, 8], [2, 4, 6, 8]],
             [
-                "1: one_2\n",
-                "2: two_3\n",
-                "3: three_1\n",
-                "4: four_3\n",
-                "5: five_1\n",
-                "6: six_3\n",
-                "7: seven_2\n",
-                "8: eight_3\n",
+                (1, "one_2"),
+                (2, "two_3"),
+                (3, "three_1"),
+                (4, "four_3"),
+                (5, "five_1"),
+                (6, "six_3"),
+                (7, "seven_2"),
+                (8, "eight_3"),
             ],
         ),
         (
             [[1, 2, 3], []],
             [
-                "1: one_1\n",
-                "2: two_1\n",
-                "3: three_1\n",
+                (1, "one_1"),
+                (2, "two_1"),
+                (3, "three_1"),
             ],
         ),
         (
@@ -235,22 +622,85 @@ def test_write_to_db() -> None:
     ],
 )
 def test_compact_segment_files(
-    file_contents: list[list[int]], expected_merged_file_contents: list[str]
+    file_contents: list[list[int]],
+    expected_merged_file_contents: list[tuple[int, str]],
 ) -> None:
     filepaths: list[Path] = []
     with TemporaryDirectory(dir=ROOT_DIR) as tmp:
         for index, contents in enumerate(file_contents):
-            filepath = Path(tmp) / f"segment_{index}.txt"
+            filepath = Path(tmp) / f"segment_{index}.sst"
             filepaths.append(filepath)
-            with open(filepath, "a") as f:
-                for val in contents:
-                    f.write(f"{val}: {num2words(val)}_{index + 1}\n")
+            writer = SSTableWriter(filepath, block_entries=2)
+            for val in contents:
+                writer.add(val, f"{num2words(val)}_{index + 1}")
+            writer.finish()
 
         output_filepath = merge_segment_files(
-            tuple(reversed(filepaths)), Path(tmp) / "output_file.txt"
+            tuple(reversed(filepaths)), Path(tmp) / "output_file.sst"
         )
 
-        with open(output_filepath, "r") as f:
-            actual = list(f.readlines())
+        actual = list(SSTableReader.open(output_filepath))
 
         assert actual == expected_merged_file_contents
+
+
+def test_compact_segment_files_with_string_keys(tmp_path: Path) -> None:
+    filepaths: list[Path] = []
+    for index, contents in enumerate([["Bulgaria", "Cyprus"], ["Cyprus", "Sweden"]]):
+        filepath = tmp_path / f"segment_{index}.sst"
+        filepaths.append(filepath)
+        writer = SSTableWriter(filepath)
+        for country in contents:
+            writer.add(country, index)
+        writer.finish()
+
+    merge_segment_files(tuple(reversed(filepaths)), tmp_path / "merged.sst")
+
+    assert list(SSTableReader.open(tmp_path / "merged.sst")) == [
+        ("Bulgaria", 0),
+        ("Cyprus", 1),
+        ("Sweden", 1),
+    ]
+
+
+def test_merge_segment_files_drops_tombstones(tmp_path: Path) -> None:
+    filepaths: list[Path] = []
+    for index, contents in enumerate([[(1, "one"), (2, "two")], [(1, TOMBSTONE)]]):
+        filepath = tmp_path / f"segment_{index}.sst"
+        filepaths.append(filepath)
+        writer = SSTableWriter(filepath)
+        for key, value in contents:
+            writer.add(key, value)
+        writer.finish()
+
+    merge_segment_files(tuple(reversed(filepaths)), tmp_path / "kept.sst")
+    merge_segment_files(
+        tuple(reversed(filepaths)), tmp_path / "dropped.sst", drop_tombstones=True
+    )
+
+    assert list(SSTableReader.open(tmp_path / "kept.sst")) == [
+        (1, TOMBSTONE),
+        (2, "two"),
+    ]
+    assert list(SSTableReader.open(tmp_path / "dropped.sst")) == [(2, "two")]
+
+
+def test_merge_segment_files_saves_bloom_filter() -> None:
+    with TemporaryDirectory(dir=ROOT_DIR) as tmp:
+        filepaths: list[Path] = []
+        for index, contents in enumerate([[1, 2, 3], [3, 4]]):
+            filepath = Path(tmp) / f"segment_{index}.sst"
+            filepaths.append(filepath)
+            writer = SSTableWriter(filepath)
+            for val in contents:
+                writer.add(val, num2words(val))
+            writer.finish()
+
+        merge_segment_files(
+            tuple(reversed(filepaths)),
+            Path(tmp) / "merged.sst",
+            bloom_filter_false_positive_rate=0.01,
+        )
+
+        bloom_filter = BloomFilter.load(Path(tmp) / "merged.bloom")
+        assert all(num in bloom_filter for num in [1, 2, 3, 4])
@@ -0,0 +1,52 @@
+from sandb.indexes.merge import merge_newest_first
+
+
+def test_newest_value_wins() -> None:
+    newest = [(1, "one_3"), (4, "four_3")]
+    middle = [(1, "one_2"), (2, "two_2"), (4, "four_2")]
+    oldest = [(0, "zero_1"), (1, "one_1"), (3, "three_1")]
+
+    assert list(merge_newest_first([newest, middle, oldest])) == [
+        (0, "zero_1"),
+        (1, "one_3"),
+        (2, "two_2"),
+        (3, "three_1"),
+        (4, "four_3"),
+    ]
+
+
+def test_string_and_tuple_keys() -> None:
+    newest = [("Cyprus", 2), ("Sweden", 2)]
+    oldest = [("Bulgaria", 1), ("Cyprus", 1)]
+
+    assert list(merge_newest_first([newest, oldest])) == [
+        ("Bulgaria", 1),
+        ("Cyprus", 2),
+        ("Sweden", 2),
+    ]
+    assert list(merge_newest_first([[((1, "a"), "new")], [((1, "a"), "old")]])) == [
+        ((1, "a"), "new")
+    ]
+
+
+def test_values_are_never_compared() -> None:
+    # dicts do not support <, so this would raise if values were compared.
+    assert list(merge_newest_first([[(1, {"v": 2})], [(1, {"v": 1})]])) == [
+        (1, {"v": 2})
+    ]
+
+
+def test_empty_runs() -> None:
+    assert list(merge_newest_first([])) == []
+    assert list(merge_newest_first([[], [(1, "one")], []])) == [(1, "one")]
+
+
+def test_reverse() -> None:
+    newest = [(4, "four_2"), (1, "one_2")]
+    oldest = [(4, "four_1"), (3, "three_1"), (1, "one_1")]
+
+    assert list(merge_newest_first([newest, oldest], reverse=True)) == [
+        (4, "four_2"),
+        (3, "three_1"),
+        (1, "one_2"),
+    ]
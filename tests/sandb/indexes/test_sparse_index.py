@@ -0,0 +1,18 @@
+import pytest
+
+from sandb.indexes.sparse_index import SparseIndex
+
+
+def test_append_out_of_order() -> None:
+    index = SparseIndex()
+    index.append("Cyprus", 20)
+
+    with pytest.raises(ValueError):
+        index.append("Bulgaria", 10)
+
+
+def test_offsets_are_stored_in_an_array() -> None:
+    index = SparseIndex.from_mapping({"Cyprus": 20, "Bulgaria": 10})
+
+    assert list(index.items()) == [("Bulgaria", 10), ("Cyprus", 20)]
+    assert index.offsets.typecode == "q"
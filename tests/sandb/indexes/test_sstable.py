@@ -0,0 +1,155 @@
+import mmap
+from pathlib import Path
+
+import pytest
+
+from sandb.indexes.sstable import COMPRESSION, MISSING, SSTableReader, SSTableWriter
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="compression", argvalues=["none", "zlib", "lzma"]
+)
+def test_get_and_iterate(compression: COMPRESSION, tmp_path: Path) -> None:
+    writer = SSTableWriter(
+        tmp_path / "segment_0.sst", block_size=64, compression=compression
+    )
+    for num in range(0, 200, 2):
+        writer.add(num, f"value: {num}")
+    writer.finish()
+
+    sstable = SSTableReader.open(tmp_path / "segment_0.sst")
+
+    assert len(sstable.index) > 1
+    assert sstable.compression == compression
+    assert sstable.get(42) == "value: 42"
+    assert sstable.get(43) is MISSING
+    assert sstable.get(-1) is MISSING
+    assert sstable.get(1000) is MISSING
+    assert list(sstable) == [(num, f"value: {num}") for num in range(0, 200, 2)]
+
+
+def test_block_entries_limits_block_size(tmp_path: Path) -> None:
+    writer = SSTableWriter(tmp_path / "segment_0.sst", block_entries=3)
+    for country in ["Bulgaria", "Cyprus", "Germany", "Greenland", "Hungary"]:
+        writer.add(country, None)
+    sstable = writer.finish()
+
+    assert sstable.index.keys == ["Bulgaria", "Greenland"]
+    assert sstable.get("Hungary") is None
+
+
+def test_compression_shrinks_file(tmp_path: Path) -> None:
+    for compression in ["none", "zlib"]:
+        writer = SSTableWriter(
+            tmp_path / f"{compression}.sst",
+            compression=compression,  # type: ignore
+        )
+        for num in range(1000):
+            writer.add(num, "a repetitive value")
+        writer.finish()
+
+    assert (tmp_path / "zlib.sst").stat().st_size < (
+        tmp_path / "none.sst"
+    ).stat().st_size
+
+
+def test_empty_table(tmp_path: Path) -> None:
+    SSTableWriter(tmp_path / "segment_0.sst").finish()
+
+    sstable = SSTableReader.open(tmp_path / "segment_0.sst")
+
+    assert len(sstable) == 0
+    assert sstable.get("Cyprus") is MISSING
+    assert list(sstable) == []
+
+
+def test_open_rejects_corrupt_footer(tmp_path: Path) -> None:
+    writer = SSTableWriter(tmp_path / "segment_0.sst")
+    writer.add("Cyprus", 20)
+    writer.finish()
+    # Flip a byte of the footer, which sits just before the trailer.
+    data = bytearray((tmp_path / "segment_0.sst").read_bytes())
+    data[-30] ^= 0xFF
+    (tmp_path / "segment_0.sst").write_bytes(bytes(data))
+
+    with pytest.raises(ValueError):
+        SSTableReader.open(tmp_path / "segment_0.sst")
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames=["start", "end", "expected"],
+    argvalues=[
+        (None, None, list(range(0, 100, 2))),
+        (41, 61, list(range(42, 61, 2))),
+        (42, 60, list(range(42, 60, 2))),
+        (None, 7, [0, 2, 4, 6]),
+        (93, None, [94, 96, 98]),
+        (100, None, []),
+        (None, 0, []),
+    ],
+    ids=[
+        "whole table",
+        "bounds between keys",
+        "bounds on keys",
+        "open start",
+        "open end",
+        "past the end",
+        "before the start",
+    ],
+)
+def test_scan(
+    start: int | None, end: int | None, expected: list[int], tmp_path: Path
+) -> None:
+    writer = SSTableWriter(tmp_path / "segment_0.sst", block_entries=4)
+    for num in range(0, 100, 2):
+        writer.add(num, str(num))
+    sstable = writer.finish()
+
+    assert [key for key, _ in sstable.scan(start, end)] == expected
+    assert [key for key, _ in sstable.scan(start, end, reverse=True)] == list(
+        reversed(expected)
+    )
+
+
+def test_multi_get_reads_each_block_once(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    writer = SSTableWriter(tmp_path / "segment_0.sst", block_entries=10)
+    for num in range(0, 100, 2):
+        writer.add(num, str(num))
+    sstable = writer.finish()
+    blocks_read = []
+    load_block = sstable._load_block
+
+    def counting_load_block(position: int) -> tuple[bytes | mmap.mmap, int, int]:
+        blocks_read.append(position)
+        return load_block(position)
+
+    monkeypatch.setattr(sstable, "_load_block", counting_load_block)
+
+    found = sstable.multi_get([-5, 0, 2, 3, 18, 20, 44, 200])
+
+    assert found == {0: "0", 2: "2", 18: "18", 20: "20", 44: "44"}
+    assert blocks_read == [0, 1, 2]
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="compression", argvalues=["none", "zlib"]
+)
+def test_mmap_lookups(compression: COMPRESSION, tmp_path: Path) -> None:
+    path = tmp_path / "segment_0.sst"
+    writer = SSTableWriter(path, block_entries=10, compression=compression)
+    for num in range(0, 100, 2):
+        writer.add(f"key_{num:03}", {"key": f"key_{num:03}"})
+    writer.finish()
+
+    sstable = SSTableReader.open(path, use_mmap=True)
+
+    assert sstable.get("key_042") == {"key": "key_042"}
+    assert sstable.get("key_043") is MISSING
+    assert sstable.multi_get(["key_000", "key_002", "key_003", "key_098"]) == {
+        key: {"key": key} for key in ["key_000", "key_002", "key_098"]
+    }
+    # The mapping outlives the file, as readers of a compacted segment need.
+    path.unlink()
+    assert sstable.get("key_010") == {"key": "key_010"}
@@ -0,0 +1,75 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from sandb.indexes.wal import DURABILITY_MODE, WriteAheadLog
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="durability", argvalues=["none", "per_write", "batched"]
+)
+def test_replay(durability: DURABILITY_MODE, tmp_path: Path) -> None:
+    wal = WriteAheadLog(tmp_path / "wal.log", durability=durability)
+    wal.sync(wal.append([(1, "one")]))
+    wal.sync(wal.append([("two", 2), (3.0, None)]))
+    wal.close()
+
+    reopened = WriteAheadLog(tmp_path / "wal.log", durability=durability)
+    assert list(reopened.replay()) == [[(1, "one")], [("two", 2), (3.0, None)]]
+    reopened.close()
+
+
+def test_replay_drops_torn_record(tmp_path: Path) -> None:
+    wal = WriteAheadLog(tmp_path / "wal.log", durability="none")
+    wal.append([(1, "one")])
+    wal.append([(2, "two")])
+    wal.close()
+    # Chop off the end of the last record as if we crashed mid write.
+    with open(tmp_path / "wal.log", "r+b") as f:
+        f.truncate(os.path.getsize(tmp_path / "wal.log") - 3)
+
+    reopened = WriteAheadLog(tmp_path / "wal.log", durability="none")
+    assert list(reopened.replay()) == [[(1, "one")]]
+    reopened.append([(3, "three")])
+    reopened.close()
+
+    reopened = WriteAheadLog(tmp_path / "wal.log", durability="none")
+    assert list(reopened.replay()) == [[(1, "one")], [(3, "three")]]
+    reopened.close()
+
+
+def test_group_commit_shares_fsyncs(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    fsyncs = 0
+    real_fsync = os.fsync
+
+    def counting_fsync(fd: Any) -> None:
+        nonlocal fsyncs
+        fsyncs += 1
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", counting_fsync)
+    wal = WriteAheadLog(
+        tmp_path / "wal.log", durability="batched", group_commit_interval=0.05
+    )
+
+    def writer(thread_num: int) -> None:
+        for i in range(10):
+            wal.sync(wal.append([(thread_num * 100 + i, "value")]))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wal.close()
+
+    # 80 durable writes, far fewer fsyncs.
+    assert fsyncs < 40
+    reopened = WriteAheadLog(tmp_path / "wal.log", durability="none")
+    assert sum(len(entries) for entries in reopened.replay()) == 80
+    reopened.close()
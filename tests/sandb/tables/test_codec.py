@@ -0,0 +1,38 @@
+import pickle
+
+import pytest
+
+from sandb.tables.codec import row_codec
+from sandb.tables.metadata import TableMetadata
+
+
+def test_round_trip(test_table_metadata: TableMetadata) -> None:
+    codec = test_table_metadata.codec
+
+    assert codec.cast(("Alice", "10")) == ("Alice", 10)
+    assert codec.encode(("Alice", 10)) == b"Alice, 10\n"
+    assert codec.decode("Alice, 10\n") == ("Alice", 10)
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="line", argvalues=["Alice\n", "Alice, 10, 20\n", "Alice, ten\n"]
+)
+def test_decode_invalid_line(line: str, test_table_metadata: TableMetadata) -> None:
+    with pytest.raises(ValueError):
+        test_table_metadata.codec.decode(line)
+
+
+def test_single_column() -> None:
+    codec = row_codec((int,))
+
+    assert codec.cast(["1"]) == (1,)
+    assert codec.decode("1\n") == (1,)
+    assert codec.encode((1,)) == b"1\n"
+
+
+def test_codec_is_shared_and_pickles(test_table_metadata: TableMetadata) -> None:
+    codec = test_table_metadata.codec
+
+    assert codec is row_codec((str, int))
+    assert pickle.loads(pickle.dumps(codec)) is codec
+    assert pickle.loads(pickle.dumps(test_table_metadata)).codec is codec
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from sandb.tables import columnar
+from sandb.tables.metadata import TableMetadata
+from sandb.tables.table import RowTypeError, close, create, read, write
+
+
+@pytest.fixture  # type: ignore
+def columnar_table_metadata(test_table_metadata: TableMetadata) -> TableMetadata:
+    return TableMetadata(
+        name=test_table_metadata.name,
+        columns=test_table_metadata.columns,
+        location=test_table_metadata.location,
+        storage="columnar",
+    )
+
+
+ROWS = [("Alice", 10), ("Bob, Jr", 15), ("", 10), ("Zoë", -(2**63)), ("Alice", 20)]
+
+
+def test_read(columnar_table_metadata: TableMetadata) -> None:
+    create(columnar_table_metadata)
+    for row in ROWS:
+        write(row, columnar_table_metadata)
+
+    assert not columnar_table_metadata.data_path().exists()
+    assert read("col_1", "Alice", columnar_table_metadata) == [
+        ("Alice", 10),
+        ("Alice", 20),
+    ]
+    assert read("col_1", "Bob, Jr", columnar_table_metadata) == [("Bob, Jr", 15)]
+    assert read("col_1", "", columnar_table_metadata) == [("", 10)]
+    assert read("col_1", "Zoë", columnar_table_metadata) == [("Zoë", -(2**63))]
+    assert read("col_1", "Alicf", columnar_table_metadata) == []
+    assert read("col_2", 10, columnar_table_metadata) == [("Alice", 10), ("", 10)]
+    assert read("col_2", 15.0, columnar_table_metadata) == [("Bob, Jr", 15)]
+    assert read("col_2", "10", columnar_table_metadata) == []
+
+
+def test_read_empty_table(columnar_table_metadata: TableMetadata) -> None:
+    create(columnar_table_metadata)
+
+    assert read("col_1", "Alice", columnar_table_metadata) == []
+
+
+def test_write_rejects_ints_that_do_not_fit(
+    columnar_table_metadata: TableMetadata,
+) -> None:
+    create(columnar_table_metadata)
+
+    with pytest.raises(RowTypeError):
+        write(("Alice", 2**63), columnar_table_metadata)
+    assert columnar.row_count(columnar_table_metadata) == 0
+
+
+def test_append_truncates_a_partly_written_row(
+    columnar_table_metadata: TableMetadata,
+) -> None:
+    create(columnar_table_metadata)
+    write(("Alice", 10), columnar_table_metadata)
+    # As if we crashed after writing the first column of a row.
+    with open(columnar_table_metadata.columns_path() / "col_1.data", "ab") as f:
+        f.write(b"Bob")
+    with open(columnar_table_metadata.columns_path() / "col_1.offsets", "ab") as f:
+        f.write(np.array([8], dtype=columnar.INT64).tobytes())
+    assert columnar.row_count(columnar_table_metadata) == 1
+
+    write(("Chris", 20), columnar_table_metadata)
+
+    assert columnar.read_rows(np.arange(2), columnar_table_metadata) == [
+        ("Alice", 10),
+        ("Chris", 20),
+    ]
+
+
+def test_read_with_index(columnar_table_metadata: TableMetadata) -> None:
+    indexed = columnar_table_metadata.model_copy(update={"indexes": ("col_1",)})
+    create(indexed)
+    for row in ROWS:
+        write(row, indexed)
+
+    assert read("col_1", "Alice", indexed) == [("Alice", 10), ("Alice", 20)]
+    close(indexed)
@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import pytest
+
+from sandb.tables import table
+from sandb.tables.database import Database
+from sandb.tables.metadata import STORAGE_LAYOUT, Column
+from sandb.tables.predicates import Comparison
+from sandb.tables.table import RowTypeError, TableExistsError
+
+COLUMNS = (Column(name="col_1", dtype=str), Column(name="col_2", dtype=int))
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="storage, indexes, primary_key",
+    argvalues=[
+        ("row", (), None),
+        ("row", ("col_1",), None),
+        ("columnar", ("col_1",), None),
+        ("hash", (), "col_2"),
+    ],
+)
+def test_table_handle(
+    storage: STORAGE_LAYOUT,
+    indexes: tuple[str, ...],
+    primary_key: str | None,
+    tmp_path: Path,
+) -> None:
+    database = Database(tmp_path)
+    users = database.create_table("users", COLUMNS, storage, indexes, primary_key)
+    assert database.table("users") is users
+
+    users.write(("Alice", 1))
+    users.write(("Bob", 2))
+    assert users.write_many([("Alice", "3")]) == 1
+    with pytest.raises(RowTypeError):
+        users.write(("Chris", "three"))
+
+    rows = [("Alice", 1), ("Bob", 2), ("Alice", 3)]
+    assert list(users.iter_rows()) == rows
+    assert users.read("col_1", "Alice") == [("Alice", 1), ("Alice", 3)]
+    assert list(users.scan("col_2", 2)) == [("Bob", 2)]
+    assert list(users.select(Comparison("col_2", ">", 1), ["col_2"])) == [(2,), (3,)]
+    # The table functions see everything written through the handle.
+    assert list(table.iter_rows(users.metadata)) == rows
+    database.close()
+
+    reopened = Database(tmp_path)
+    assert reopened.table_names() == ["users"]
+    assert reopened.table("users").metadata == users.metadata
+    assert list(reopened.table("users").iter_rows()) == rows
+    reopened.close()
+
+
+def test_database_catalog(tmp_path: Path) -> None:
+    database = Database(tmp_path)
+    database.create_table("a", COLUMNS)
+    database.create_table("b", COLUMNS, storage="columnar")
+
+    assert database.table_names() == ["a", "b"]
+    assert "a" in database and "c" not in database
+    with pytest.raises(KeyError):
+        database.table("c")
+    with pytest.raises(TableExistsError):
+        database.create_table("a", COLUMNS)
+    database.close()
+
+
+def test_database_moved(tmp_path: Path) -> None:
+    database = Database(tmp_path / "before")
+    database.create_table("a", COLUMNS).write(("Alice", 1))
+    database.close()
+    (tmp_path / "before").rename(tmp_path / "after")
+
+    moved = Database(tmp_path / "after")
+    assert moved.table("a").metadata.location == tmp_path / "after"
+    assert list(moved.table("a").iter_rows()) == [("Alice", 1)]
+    moved.close()
@@ -0,0 +1,84 @@
+import pytest
+
+from sandb.tables.metadata import TableMetadata
+from sandb.tables.predicates import Between, Comparison, Expression, In
+from sandb.tables.table import create, select, write
+
+ROWS = [("Alice", 10), ("Bob", 15), ("Chris", 20), ("Dave", 25), ("Eve", 30)]
+
+
+@pytest.fixture(params=["row", "columnar"])  # type: ignore
+def table(
+    request: pytest.FixtureRequest, test_table_metadata: TableMetadata
+) -> TableMetadata:
+    metadata = test_table_metadata.model_copy(update={"storage": request.param})
+    create(metadata)
+    for row in ROWS:
+        write(row, metadata)
+    return metadata
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames=["where", "expected"],
+    argvalues=[
+        (Comparison("col_2", ">", 15), ROWS[2:]),
+        (Comparison("col_2", "<=", 15), ROWS[:2]),
+        (Comparison("col_2", "!=", 20), ROWS[:2] + ROWS[3:]),
+        (Comparison("col_1", ">=", "Chris"), ROWS[2:]),
+        (Comparison("col_2", "==", 20.0), ROWS[2:3]),
+        (In("col_1", ("Bob", "Eve", "Zed")), [ROWS[1], ROWS[4]]),
+        (Between("col_2", 15, 25), ROWS[1:4]),
+        (Between("col_1", "B", "D"), ROWS[1:3]),
+        (Comparison("col_2", ">", 10) & Comparison("col_1", "<", "Dave"), ROWS[1:3]),
+        (Comparison("col_2", "==", 10) | In("col_1", ("Eve",)), [ROWS[0], ROWS[4]]),
+        (~Between("col_2", 15, 25), [ROWS[0], ROWS[4]]),
+        (Comparison("col_2", ">", 100) & Comparison("col_1", "==", "Bob"), []),
+        (Comparison("col_2", "<", 100) | Comparison("col_1", "==", "Bob"), ROWS),
+    ],
+    ids=[
+        ">",
+        "<=",
+        "!=",
+        "str >=",
+        "float ==",
+        "in",
+        "between",
+        "str between",
+        "and",
+        "or",
+        "not",
+        "and short circuits",
+        "or short circuits",
+    ],
+)
+def test_where(
+    where: Expression, expected: list[tuple[str, int]], table: TableMetadata
+) -> None:
+    assert list(select(table, where)) == expected
+
+
+def test_projection_and_limit(table: TableMetadata) -> None:
+    assert list(select(table, Comparison("col_2", ">", 10), ["col_2"])) == [
+        (15,),
+        (20,),
+        (25,),
+        (30,),
+    ]
+    assert list(select(table, columns=["col_2", "col_1"], limit=2)) == [
+        (10, "Alice"),
+        (15, "Bob"),
+    ]
+    assert list(select(table)) == ROWS
+
+
+def test_invalid_queries_raise_straight_away(table: TableMetadata) -> None:
+    with pytest.raises(ValueError):
+        select(table, Comparison("col_3", "==", 1))
+    with pytest.raises(ValueError):
+        select(table, columns=["col_3"])
+    with pytest.raises(ValueError):
+        select(table, Comparison("col_2", "=", 1))  # type: ignore
+    with pytest.raises(TypeError):
+        select(table, Comparison("col_2", "<", "10"))
+    with pytest.raises(TypeError):
+        select(table, In("col_1", ("Alice", 1)))
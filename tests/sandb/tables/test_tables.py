@@ -1,10 +1,29 @@
 import json
+import subprocess
+import sys
+from pathlib import Path
 from typing import Any
 
 import pytest
 
-from sandb.tables.metadata import TableMetadata
-from sandb.tables.table import RowTypeError, TableExistsError, create, read, write
+from sandb.tables import table
+from sandb.tables.metadata import STORAGE_LAYOUT, TableMetadata
+from sandb.tables.predicates import Comparison
+from sandb.tables.table import (
+    RowTypeError,
+    TableExistsError,
+    close,
+    create,
+    iter_rows,
+    load_csv,
+    read,
+    rebuild_indexes,
+    scan,
+    scan_batches,
+    select,
+    write,
+    write_many,
+)
 
 
 def test_create_happy_path(test_table_metadata: TableMetadata) -> None:
@@ -15,7 +34,36 @@ def test_create_happy_path(test_table_metadata: TableMetadata) -> None:
     ) as f:
         saved_metadata = json.load(f)
 
-    assert saved_metadata == test_table_metadata.model_dump_json()
+    assert saved_metadata == json.loads(test_table_metadata.model_dump_json())
+    assert (
+        TableMetadata.load(test_table_metadata.metadata_path()) == test_table_metadata
+    )
+
+
+def test_load_double_encoded_metadata(test_table_metadata: TableMetadata) -> None:
+    path = test_table_metadata.location / "metadata.json"
+    with open(path, "w") as f:
+        json.dump(test_table_metadata.model_dump_json(), f)
+
+    assert TableMetadata.load(path) == test_table_metadata
+
+
+def test_metadata_copy_does_not_keep_cached_paths(
+    test_table_metadata: TableMetadata, tmp_path: Path
+) -> None:
+    metadata = test_table_metadata.model_copy(update={"indexes": ("col_1",)})
+    assert metadata.data_path() == test_table_metadata.data_path()
+    metadata.index_path("col_1")
+
+    moved = metadata.model_copy(
+        update={"location": tmp_path, "name": "moved", "indexes": ("col_2",)}
+    )
+
+    assert moved.data_path() == tmp_path / "moved" / "data.csv"
+    assert moved.index_path("col_2") == tmp_path / "moved" / "indexes" / "col_2"
+    with pytest.raises(KeyError):
+        moved.index_path("col_1")
+    assert metadata.data_path() == test_table_metadata.data_path()
 
 
 def test_create_table_folder_already_exists(test_table_metadata: TableMetadata) -> None:
@@ -101,3 +149,332 @@ def test_read(
     actual = read(column_to_query, predicate, test_table_metadata)
 
     assert actual == expected
+
+
+@pytest.fixture  # type: ignore
+def indexed_table_metadata(test_table_metadata: TableMetadata) -> TableMetadata:
+    return TableMetadata(
+        name=test_table_metadata.name,
+        columns=test_table_metadata.columns,
+        location=test_table_metadata.location,
+        indexes=("col_1", "col_2"),
+    )
+
+
+def test_indexes_must_be_columns(test_table_metadata: TableMetadata) -> None:
+    with pytest.raises(ValueError):
+        TableMetadata(
+            name=test_table_metadata.name,
+            columns=test_table_metadata.columns,
+            location=test_table_metadata.location,
+            indexes=("col_3",),
+        )
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="storage, primary_key, indexes",
+    argvalues=[
+        ("lsm", None, ()),
+        ("hash", "col_3", ()),
+        ("hash", "col_2", ("col_1",)),
+        ("row", "col_2", ()),
+    ],
+)
+def test_primary_key_only_on_engine_tables(
+    storage: STORAGE_LAYOUT,
+    primary_key: str | None,
+    indexes: tuple[str, ...],
+    test_table_metadata: TableMetadata,
+) -> None:
+    with pytest.raises(ValueError):
+        TableMetadata(
+            name=test_table_metadata.name,
+            columns=test_table_metadata.columns,
+            location=test_table_metadata.location,
+            storage=storage,
+            primary_key=primary_key,
+            indexes=indexes,
+        )
+
+
+def test_read_uses_index(
+    indexed_table_metadata: TableMetadata, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    create(indexed_table_metadata)
+    rows = [("Alice", 10), ("Bob", 15), ("Alice", 20), ("Chris", 10)]
+    for row in rows:
+        write(row, indexed_table_metadata)
+
+    def no_full_scan(line: str, table: TableMetadata) -> tuple[Any, ...]:
+        assert line.split(", ")[0] in {"Alice", "Chris"}
+        return parse_line(line, table)
+
+    parse_line = table._parse_line
+    monkeypatch.setattr(table, "_parse_line", no_full_scan)
+
+    assert read("col_1", "Alice", indexed_table_metadata) == [
+        ("Alice", 10),
+        ("Alice", 20),
+    ]
+    assert read("col_2", 10, indexed_table_metadata) == [("Alice", 10), ("Chris", 10)]
+    assert read("col_1", "Dave", indexed_table_metadata) == []
+    close(indexed_table_metadata)
+
+
+def test_read_with_index_skips_rows_that_were_not_written(
+    indexed_table_metadata: TableMetadata,
+) -> None:
+    create(indexed_table_metadata)
+    write(("Alice", 10), indexed_table_metadata)
+    # As if we crashed after the index was updated but before the row was.
+    offset = indexed_table_metadata.data_path().stat().st_size
+    table._index(indexed_table_metadata, "col_1").write(("Bob", offset), None)
+
+    assert read("col_1", "Bob", indexed_table_metadata) == []
+    write(("Chris", 15), indexed_table_metadata)
+    assert read("col_1", "Bob", indexed_table_metadata) == []
+    assert read("col_1", "Chris", indexed_table_metadata) == [("Chris", 15)]
+    close(indexed_table_metadata)
+
+
+def test_rebuild_indexes(
+    test_table_metadata: TableMetadata, indexed_table_metadata: TableMetadata
+) -> None:
+    create(test_table_metadata)
+    for row in [("Alice", 10), ("Bob", 15), ("Alice", 20)]:
+        write(row, test_table_metadata)
+
+    rebuild_indexes(indexed_table_metadata)
+
+    assert read("col_1", "Alice", indexed_table_metadata) == [
+        ("Alice", 10),
+        ("Alice", 20),
+    ]
+    assert read("col_2", 15, indexed_table_metadata) == [("Bob", 15)]
+    close(indexed_table_metadata)
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="storage", argvalues=["row", "columnar"]
+)
+def test_index_entries_kept_when_exiting_without_close(
+    storage: STORAGE_LAYOUT, indexed_table_metadata: TableMetadata
+) -> None:
+    metadata = indexed_table_metadata.model_copy(update={"storage": storage})
+    create(metadata)
+    # The process exits normally without closing the table, leaving the
+    # index entries in the memtables of the indexes.
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys\n"
+            "from pathlib import Path\n"
+            "from sandb.tables.metadata import TableMetadata\n"
+            "from sandb.tables.table import write, write_many\n"
+            f"table = TableMetadata.load(Path({str(metadata.metadata_path())!r}))\n"
+            "for num in range(100):\n"
+            "    write(('Alice', num), table)\n"
+            "write_many([('Bob', num) for num in range(50)], table)\n"
+            "sys.exit(0)\n",
+        ],
+        check=True,
+    )
+
+    assert read("col_1", "Alice", metadata) == [("Alice", num) for num in range(100)]
+    assert read("col_1", "Bob", metadata) == [("Bob", num) for num in range(50)]
+    assert read("col_2", 7, metadata) == [("Alice", 7), ("Bob", 7)]
+    close(metadata)
+
+
+def test_index_catches_up_with_rows_written_while_closed(
+    test_table_metadata: TableMetadata, indexed_table_metadata: TableMetadata
+) -> None:
+    create(indexed_table_metadata)
+    write(("Alice", 10), indexed_table_metadata)
+    close(indexed_table_metadata)
+    assert (indexed_table_metadata.index_path("col_1") / "indexed_up_to").exists()
+    # Written without the indexes, as if their entries had been lost.
+    write(("Bob", 15), test_table_metadata)
+    write_many([("Alice", 20)], test_table_metadata)
+
+    assert read("col_1", "Alice", indexed_table_metadata) == [
+        ("Alice", 10),
+        ("Alice", 20),
+    ]
+    assert read("col_2", 15, indexed_table_metadata) == [("Bob", 15)]
+    close(indexed_table_metadata)
+
+
+def test_scan_is_lazy(
+    test_table_metadata: TableMetadata, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    create(test_table_metadata)
+    for num in range(10):
+        write(("Alice" if num % 2 else "Bob", num), test_table_metadata)
+    parsed = []
+    parse_line = table._parse_line
+
+    def counting_parse_line(line: str, metadata: TableMetadata) -> tuple[Any, ...]:
+        parsed.append(line)
+        return parse_line(line, metadata)
+
+    monkeypatch.setattr(table, "_parse_line", counting_parse_line)
+
+    rows = scan("col_1", "Alice", test_table_metadata, limit=2)
+    assert not parsed
+    assert list(rows) == [("Alice", 1), ("Alice", 3)]
+    assert len(parsed) == 4
+
+
+def test_scan_unknown_column_raises_straight_away(
+    test_table_metadata: TableMetadata,
+) -> None:
+    create(test_table_metadata)
+
+    with pytest.raises(ValueError):
+        scan("col_3", "Alice", test_table_metadata)
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="storage", argvalues=["row", "columnar"]
+)
+def test_scan_batches_and_iter_rows(
+    storage: STORAGE_LAYOUT,
+    test_table_metadata: TableMetadata,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    metadata = test_table_metadata.model_copy(update={"storage": storage})
+    # Small chunks so the columnar scan crosses chunk boundaries.
+    monkeypatch.setattr(table, "READ_CHUNK_ROWS", 3)
+    create(metadata)
+    rows = [("Alice" if num % 3 else "Bob", num) for num in range(10)]
+    for row in rows:
+        write(row, metadata)
+    alices = [row for row in rows if row[0] == "Alice"]
+
+    assert list(scan("col_1", "Alice", metadata)) == alices
+    assert list(scan_batches("col_1", "Alice", metadata, 4)) == [
+        alices[:4],
+        alices[4:],
+    ]
+    assert list(scan_batches("col_1", "Alice", metadata, 4, limit=5)) == [
+        alices[:4],
+        alices[4:5],
+    ]
+    assert list(iter_rows(metadata)) == rows
+    assert list(iter_rows(metadata, limit=4)) == rows[:4]
+
+
+@pytest.mark.parametrize(  # type: ignore
+    argnames="storage", argvalues=["row", "columnar"]
+)
+def test_write_many(
+    storage: STORAGE_LAYOUT, indexed_table_metadata: TableMetadata
+) -> None:
+    metadata = indexed_table_metadata.model_copy(update={"storage": storage})
+    create(metadata)
+    write(("Alice", 1), metadata)
+    rows = [("Alice" if num % 3 else "Bob", str(num)) for num in range(10)]
+
+    assert write_many(iter(rows), metadata, batch_size=4) == 10
+
+    written = [("Alice", 1)] + [(name, int(num)) for name, num in rows]
+    assert list(iter_rows(metadata)) == written
+    assert read("col_1", "Bob", metadata) == [
+        ("Bob", 0),
+        ("Bob", 3),
+        ("Bob", 6),
+        ("Bob", 9),
+    ]
+    assert read("col_2", 1, metadata) == [("Alice", 1), ("Alice", 1)]
+    close(metadata)
+
+
+def test_write_many_stops_at_the_batch_with_an_invalid_row(
+    test_table_metadata: TableMetadata,
+) -> None:
+    create(test_table_metadata)
+    rows = [("Alice", 1), ("Bob", 2), ("Chris", 3), ("Dave", "four"), ("Eve", 5)]
+
+    with pytest.raises(RowTypeError, match="four"):
+        write_many(rows, test_table_metadata, batch_size=2)
+    with pytest.raises(RowTypeError):
+        write_many([("Alice",)], test_table_metadata)
+
+    assert list(iter_rows(test_table_metadata)) == [("Alice", 1), ("Bob", 2)]
+
+
+def test_load_csv(test_table_metadata: TableMetadata, tmp_path: Path) -> None:
+    create(test_table_metadata)
+    source = tmp_path / "users.csv"
+    source.write_text('name,age\nAlice,10\n"Bob", 15\n')
+
+    assert load_csv(source, test_table_metadata, has_header=True) == 2
+    assert list(iter_rows(test_table_metadata)) == [("Alice", 10), ("Bob", 15)]
+
+
+@pytest.mark.parametrize(argnames="num_rows", argvalues=[0, 1, 50])  # type: ignore
+def test_read_in_parallel(
+    num_rows: int, test_table_metadata: TableMetadata, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    create(test_table_metadata)
+    rows = [("Alice" if num % 3 else "Bob", num) for num in range(num_rows)]
+    write_many(rows, test_table_metadata)
+    # More ranges than rows, so some bounds fall on the same line.
+    monkeypatch.setattr(table, "RANGES_PER_WORKER", 40)
+
+    assert read("col_1", "Alice", test_table_metadata, workers=2) == [
+        row for row in rows if row[0] == "Alice"
+    ]
+    assert list(scan("col_2", 7, test_table_metadata, workers=2)) == rows[7:8]
+
+
+def test_line_aligned_bounds(tmp_path: Path) -> None:
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"a\nbb\nccc\n\ndddd\n")
+
+    for num_ranges in range(1, 20):
+        bounds = table._line_aligned_bounds(path, num_ranges)
+        assert bounds[0] == 0 and bounds[-1] == path.stat().st_size
+        assert bounds == sorted(set(bounds))
+        assert len(bounds) <= num_ranges + 1
+        assert all(bound in {0, 2, 5, 9, 10, 15} for bound in bounds)
+
+
+@pytest.mark.parametrize(argnames="storage", argvalues=["lsm", "hash"])  # type: ignore
+def test_engine_tables(
+    storage: STORAGE_LAYOUT, test_table_metadata: TableMetadata
+) -> None:
+    metadata = TableMetadata(
+        name=test_table_metadata.name,
+        columns=test_table_metadata.columns,
+        location=test_table_metadata.location,
+        storage=storage,
+        primary_key="col_2",
+    )
+    create(metadata)
+    assert metadata.engine_path().is_dir()
+    assert not metadata.data_path().exists()
+
+    write(("Bob", 2), metadata)
+    write(("Alice", 1), metadata)
+    assert write_many([("Chris", "3"), ("Dave", 4), ("Alice", 5)], metadata) == 3
+    # A row with the same primary key replaces the old one.
+    write(("Bobby", 2), metadata)
+
+    rows = [("Alice", 1), ("Bobby", 2), ("Chris", 3), ("Dave", 4), ("Alice", 5)]
+    assert list(iter_rows(metadata)) == rows
+    assert read("col_2", 2, metadata) == [("Bobby", 2)]
+    assert read("col_2", 6, metadata) == []
+    assert read("col_2", "2", metadata) == []
+    assert read("col_1", "Alice", metadata) == [("Alice", 1), ("Alice", 5)]
+    assert list(select(metadata, Comparison("col_2", ">", 3), ["col_1"])) == [
+        ("Dave",),
+        ("Alice",),
+    ]
+
+    # The rows are still there after the engine is closed and opened again.
+    close(metadata)
+    assert list(iter_rows(metadata)) == rows
+    close(metadata)
@@ -0,0 +1,126 @@
+from typing import Callable
+
+import pytest
+
+from sandb.tables import zone_map
+from sandb.tables.metadata import TableMetadata
+from sandb.tables.predicates import Between, Comparison, Expression, In, zone_may_match
+from sandb.tables.table import create, read, scan, select, write, write_many
+from sandb.tables.zone_map import Zone
+
+# Time ordered rows, so every zone covers a narrow range of col_2.
+ROWS = [(f"user_{num % 7}", num) for num in range(200)]
+
+
+@pytest.fixture  # type: ignore
+def zoned_table(
+    test_table_metadata: TableMetadata, monkeypatch: pytest.MonkeyPatch
+) -> TableMetadata:
+    # About ten rows per zone.
+    monkeypatch.setattr(zone_map, "ZONE_SIZE", 100)
+    create(test_table_metadata)
+    for row in ROWS[:50]:
+        write(row, test_table_metadata)
+    write_many(ROWS[50:], test_table_metadata, batch_size=30)
+    return test_table_metadata
+
+
+def test_zones(zoned_table: TableMetadata) -> None:
+    zones = zone_map.zones(zoned_table)
+
+    assert zones[0].start == 0
+    assert all(zone.end == after.start for zone, after in zip(zones, zones[1:]))
+    assert all(100 <= zone.end - zone.start < 120 for zone in zones)
+    # The rows after the last zone do not fill one yet.
+    assert zoned_table.data_path().stat().st_size - zones[-1].end < 100
+
+    row = 0
+    for zone in zones:
+        rows = ROWS[row : row + zone.row_count]
+        assert zone.mins == ("user_0", rows[0][1])
+        assert zone.maxes == ("user_6", rows[-1][1])
+        row += zone.row_count
+
+
+def test_scans_skip_zones(zoned_table: TableMetadata) -> None:
+    zones = zone_map.zones(zoned_table)
+    data_ranges = zone_map.ranges(
+        zoned_table, zone_may_match(Comparison("col_2", "==", 42), zoned_table)
+    )
+    # The zone with 42 and the rows without a zone.
+    assert len(data_ranges) == 2
+    assert data_ranges[1] == (zones[-1].end, None)
+
+    assert read("col_2", 42, zoned_table) == [("user_0", 42)]
+    assert read("col_2", 199, zoned_table) == [("user_3", 199)]
+    assert read("col_2", 200, zoned_table) == []
+    assert read("col_2", 42.0, zoned_table) == [("user_0", 42)]
+    assert list(scan("col_1", "user_1", zoned_table, limit=2)) == [
+        ("user_1", 1),
+        ("user_1", 8),
+    ]
+    queries: list[tuple[Expression, Callable[[tuple[str, int]], bool]]] = [
+        (Comparison("col_2", "<", 15), lambda row: row[1] < 15),
+        (Comparison("col_2", ">=", 150.5), lambda row: row[1] >= 150.5),
+        (
+            Comparison("col_2", "!=", 3) & Comparison("col_1", "==", "user_3"),
+            lambda row: row[1] != 3 and row[0] == "user_3",
+        ),
+        (
+            In("col_2", (3, 97, 500)) | Between("col_2", 120, 125),
+            lambda row: row[1] in (3, 97, 500) or 120 <= row[1] <= 125,
+        ),
+        (~Between("col_2", 10, 190), lambda row: not 10 <= row[1] <= 190),
+    ]
+    for where, matches in queries:
+        expected = [row for row in ROWS if matches(row)]
+        assert list(select(zoned_table, where)) == expected
+
+
+def test_zone_may_match(test_table_metadata: TableMetadata) -> None:
+    zone = Zone(0, 100, 10, ("b", 10), ("d", 20))
+
+    def may_match(where: object) -> bool:
+        return zone_may_match(where, test_table_metadata)(zone)  # type: ignore
+
+    assert may_match(Comparison("col_2", "==", 10))
+    assert not may_match(Comparison("col_2", "==", 21))
+    assert not may_match(Comparison("col_2", "<", 10))
+    assert may_match(Comparison("col_2", "<=", 10))
+    assert not may_match(Comparison("col_2", ">", 20))
+    assert may_match(Comparison("col_2", "!=", 15))
+    assert not may_match(Comparison("col_1", ">=", "e"))
+    assert may_match(In("col_1", ("a", "c")))
+    assert not may_match(In("col_1", ("a", "e")))
+    assert not may_match(Between("col_2", 21, 30))
+    assert not may_match(Comparison("col_2", "==", 15) & Comparison("col_1", "==", "a"))
+    assert may_match(Comparison("col_2", "==", 15) | Comparison("col_1", "==", "a"))
+    assert may_match(~Comparison("col_2", "==", 15))
+    assert not zone_may_match(Comparison("col_2", "!=", 10), test_table_metadata)(
+        Zone(0, 100, 10, ("b", 10), ("b", 10))
+    )
+
+
+def test_torn_zone_is_truncated(zoned_table: TableMetadata) -> None:
+    zones = zone_map.zones(zoned_table)
+    with open(zoned_table.zone_map_path(), "ab") as f:
+        f.write(b"[12345, 6")
+
+    assert zone_map.zones(zoned_table) == zones
+    write_many(ROWS, zoned_table)
+    assert zone_map.zones(zoned_table)[: len(zones)] == zones
+    assert len(zone_map.zones(zoned_table)) > len(zones)
+    assert read("col_2", 42, zoned_table) == [("user_0", 42), ("user_0", 42)]
+
+
+def test_zones_for_rows_written_before(
+    test_table_metadata: TableMetadata, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    create(test_table_metadata)
+    write_many(ROWS, test_table_metadata)
+    assert zone_map.zones(test_table_metadata) == []
+
+    monkeypatch.setattr(zone_map, "ZONE_SIZE", 100)
+    write(("user_0", 200), test_table_metadata)
+    zones = zone_map.zones(test_table_metadata)
+    assert sum(zone.row_count for zone in zones) > 190